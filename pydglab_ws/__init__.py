@@ -1,10 +1,54 @@
-from .client import *
-from .enums import *
-from .exceptions import *
-from .models import *
-from .server import *
-from .typing import *
-from .utils import *
-from .ble import *
+from typing import TYPE_CHECKING
+
+from ._lazy import attach
 
 __version__ = "1.2.0"
+
+# 各子模块在首次访问其中的名称时才导入，只使用 WebSocket 功能时不会导入 bleak
+__getattr__, __dir__, __all__ = attach(__name__, {
+    "client": (
+        "DGLabClient", "DGLabConflatedReceiver", "PulseStream", "PulseStreamStats", "PULSE_OPERATION_DURATION",
+        "APP_PULSE_QUEUE_MAX_LENGTH", "DGLabWSConnect", "DGLabLocalClient", "DGLabWSClient", "TelemetryStream",
+        "TelemetrySample", "TelemetryStats", "TelemetryWindow", "YCYBLEClient", "WaveformPolicy",
+        "WaveformPlayerStats", "BLEWriteStats", "BLEConnectionStats", "YCYDeviceManager", "YCYManagedClient",
+        "YCYManagedClientStats",
+    ),
+    "codec": ("encode_message", "decode_message"),
+    "enums": ("MessageType", "RetCode", "MessageDataHead", "StrengthOperationType", "FeedbackButton", "Channel"),
+    "exceptions": ("InvalidStrengthData", "InvalidFeedbackData", "InvalidPulseOperation", "PulseDataTooLong"),
+    "models": ("WS_MESSAGE_MAX_LENGTH", "WebSocketMessage", "StrengthData"),
+    "server": (
+        "DGLabWSServer", "HeartbeatStats", "SendQueuePolicy", "SendQueueStats", "DGLabShardedWSServer",
+        "DGLabBLEServer", "DGLabBLEMultiServer", "SERVER_BACKEND_ENV", "DEFAULT_SERVER_BACKEND", "DGLabServer", "register_server_backend",
+        "get_server_backend", "server_backends",
+    ),
+    "typing": (
+        "WaveformFrequency", "WaveformStrength", "WaveformFrequencyOperation", "WaveformStrengthOperation",
+        "PulseOperation",
+    ),
+    "utils": (
+        "PULSE_DATA_MAX_LENGTH", "dump_pulse_operation", "dg_lab_client_qrcode", "dump_strength_operation",
+        "parse_strength_data", "dump_add_pulses", "dump_add_pulses_chunked", "dump_clear_pulses",
+        "parse_feedback_data",
+    ),
+    "pulse_library": ("PulseLibrary", "write_pulse_library"),
+    "ble": (
+        "YCYDeviceCache", "YCYChannel", "YCYMode", "YCYCommand", "YCYQueryType", "YCYError", "MotorState",
+        "ElectrodeStatus", "BLEError", "DisconnectedError", "DeviceNotFoundError", "ChecksumError", "YCYDevice",
+        "YCYChannelStatus", "YCYResponse", "YCYAngleBatch", "YCYBLEProtocol", "YCYScanner", "BLETransport",
+        "BleakTransport", "TransportFactory", "map_strength_to_ycy", "map_strength_to_dglab", "convert_pulse",
+        "dglab_preset_to_ycy_mode", "DGLAB_PRESET_TO_YCY",
+    ),
+})
+
+if TYPE_CHECKING:
+    from .client import *
+    from .codec import *
+    from .enums import *
+    from .exceptions import *
+    from .models import *
+    from .server import *
+    from .typing import *
+    from .utils import *
+    from .pulse_library import *
+    from .ble import *
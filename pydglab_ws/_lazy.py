@@ -0,0 +1,55 @@
+"""
+包属性的延迟导入 (PEP 562)
+
+包的 ``__init__`` 只声明各个子模块导出的名称，首次访问名称时才导入对应的子模块，
+使只使用 WebSocket 功能的程序不必在启动时导入 bleak 等依赖
+"""
+import importlib
+import sys
+from typing import Any, Callable, Dict, List, Mapping, Sequence, Tuple
+
+__all__ = ("attach",)
+
+
+def attach(
+        package: str,
+        submodules: Mapping[str, Sequence[str]],
+        aliases: Mapping[str, Tuple[str, str]] = None
+) -> Tuple[Callable[[str], Any], Callable[[], List[str]], Tuple[str, ...]]:
+    """
+    为包创建延迟导入的 ``__getattr__`` 与 ``__dir__``
+
+    示例：
+    ```python3
+    __getattr__, __dir__, __all__ = attach(__name__, {"ws": ("DGLabWSClient",)})
+    ```
+
+    :param package: 包名，即包的 ``__name__``
+    :param submodules: 子模块名 (相对于包) 到其导出名称的映射
+    :param aliases: 别名到 (子模块名, 名称) 的映射
+    :return: ``__getattr__``、``__dir__`` 与包的 ``__all__``
+    """
+    attributes: Dict[str, Tuple[str, str]] = {
+        name: (submodule, name)
+        for submodule, names in submodules.items()
+        for name in names
+    }
+    attributes.update(aliases or {})
+    exported = tuple(attributes)
+
+    def __getattr__(name: str) -> Any:
+        if name in attributes:
+            submodule, attribute = attributes[name]
+            value = getattr(importlib.import_module(f"{package}.{submodule}"), attribute)
+        elif name in submodules:
+            value = importlib.import_module(f"{package}.{name}")
+        else:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        # 之后的访问不再经过 __getattr__
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(vars(sys.modules[package])) | set(exported))
+
+    return __getattr__, __dir__, exported
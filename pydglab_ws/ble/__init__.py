@@ -4,37 +4,31 @@
 此模块提供役次元设备的蓝牙直连功能。
 """
 
-from .enums import *
-from .exceptions import *
-from .models import *
-from .protocol import *
-from .scanner import *
-from .utils import *
+from typing import TYPE_CHECKING
 
-__all__ = (
-    # enums
-    "YCYChannel",
-    "YCYMode",
-    "YCYCommand",
-    "YCYQueryType",
-    "YCYError",
-    "MotorState",
-    "ElectrodeStatus",
-    # exceptions
-    "BLEError",
-    "DisconnectedError",
-    "DeviceNotFoundError",
-    "ChecksumError",
-    # models
-    "YCYDevice",
-    "YCYChannelStatus",
-    "YCYResponse",
-    # protocol
-    "YCYBLEProtocol",
-    # scanner
-    "YCYScanner",
-    # utils
-    "map_strength_to_ycy",
-    "map_strength_to_dglab",
-    "convert_pulse",
-)
+from .._lazy import attach
+
+# scanner 与 transport 依赖 bleak，在首次访问时才导入
+__getattr__, __dir__, __all__ = attach(__name__, {
+    "cache": ("YCYDeviceCache",),
+    "enums": ("YCYChannel", "YCYMode", "YCYCommand", "YCYQueryType", "YCYError", "MotorState", "ElectrodeStatus"),
+    "exceptions": ("BLEError", "DisconnectedError", "DeviceNotFoundError", "ChecksumError"),
+    "models": ("YCYDevice", "YCYChannelStatus", "YCYResponse", "YCYAngleBatch"),
+    "protocol": ("YCYBLEProtocol",),
+    "scanner": ("YCYScanner",),
+    "transport": ("BLETransport", "BleakTransport", "TransportFactory"),
+    "utils": (
+        "map_strength_to_ycy", "map_strength_to_dglab", "convert_pulse", "dglab_preset_to_ycy_mode",
+        "DGLAB_PRESET_TO_YCY",
+    ),
+})
+
+if TYPE_CHECKING:
+    from .cache import *
+    from .enums import *
+    from .exceptions import *
+    from .models import *
+    from .protocol import *
+    from .scanner import *
+    from .transport import *
+    from .utils import *
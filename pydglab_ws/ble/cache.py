@@ -0,0 +1,157 @@
+"""
+役次元设备缓存
+
+在磁盘上记录最近发现或连接过的设备，启动时优先尝试连接缓存的设备，无需等待完整的扫描
+"""
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from .models import YCYDevice
+
+__all__ = ("YCYDeviceCache",)
+
+logger = logging.getLogger(__name__)
+
+_CACHE_VERSION = 1
+
+
+def _default_cache_path() -> Path:
+    cache_home = os.environ.get("XDG_CACHE_HOME")
+    return Path(cache_home) if cache_home else Path.home() / ".cache"
+
+
+class YCYDeviceCache:
+    """
+    役次元设备缓存
+
+    记录设备的地址、名称、信号强度与最近发现时间，保存为 JSON 文件。
+    读写失败时只记录日志，缓存视为空，不影响扫描与连接。
+
+    :param path: 缓存文件路径，默认为 ``$XDG_CACHE_HOME/pydglab_ws/ycy_devices.json``
+    :param max_entries: 最多记录的设备数，超出时淘汰最久未发现的设备
+    :param max_age: 设备的有效期 (秒)，超过有效期未发现的设备不再返回，为 ``None`` 时不过期
+    """
+
+    def __init__(
+            self,
+            path: Optional[Union[str, os.PathLike]] = None,
+            max_entries: int = 16,
+            max_age: Optional[float] = 30 * 24 * 3600
+    ):
+        self._path = Path(path) if path is not None else _default_cache_path() / "pydglab_ws" / "ycy_devices.json"
+        self._max_entries = max_entries
+        self._max_age = max_age
+        self._entries: Dict[str, Tuple[YCYDevice, float]] = {}
+        """按地址 (小写) 记录的设备及其最近发现时间"""
+        self.load()
+
+    @property
+    def path(self) -> Path:
+        """缓存文件路径"""
+        return self._path
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def load(self):
+        """从缓存文件读取，文件不存在或内容无效时缓存为空"""
+        self._entries.clear()
+        try:
+            with open(self._path, encoding="utf-8") as f:
+                content = json.load(f)
+            if content.get("version") != _CACHE_VERSION:
+                return
+            for item in content["devices"]:
+                device = YCYDevice(address=item["address"], name=item.get("name"), rssi=item.get("rssi"))
+                self._entries[device.address.lower()] = device, float(item["last_seen"])
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.warning(f"设备缓存读取失败: {self._path}: {type(e).__name__}: {e}")
+            self._entries.clear()
+
+    def save(self):
+        """写入缓存文件，先写入临时文件再替换，中途失败不会留下不完整的文件"""
+        content = {
+            "version": _CACHE_VERSION,
+            "devices": [
+                {"address": device.address, "name": device.name, "rssi": device.rssi, "last_seen": last_seen}
+                for device, last_seen in self._entries.values()
+            ]
+        }
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self._path.parent, prefix=self._path.name, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(content, f, ensure_ascii=False, indent=2)
+                os.replace(temp_path, self._path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except OSError as e:
+            logger.warning(f"设备缓存写入失败: {self._path}: {type(e).__name__}: {e}")
+
+    def update(self, *devices: YCYDevice, timestamp: Optional[float] = None):
+        """
+        记录发现或连接的设备，未知的名称与信号强度保留之前的记录
+
+        :param devices: 设备
+        :param timestamp: 发现时间 (``time.time()``)，默认为当前时间
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        for device in devices:
+            key = device.address.lower()
+            if (previous := self._entries.pop(key, None)) is not None:
+                device = YCYDevice(
+                    address=device.address,
+                    name=device.name if device.name is not None else previous[0].name,
+                    rssi=device.rssi if device.rssi is not None else previous[0].rssi
+                )
+            self._entries[key] = device, timestamp
+        while len(self._entries) > self._max_entries:
+            oldest = min(self._entries, key=lambda address: self._entries[address][1])
+            del self._entries[oldest]
+
+    def remove(self, address: str):
+        """
+        移除设备
+
+        :param address: 设备地址
+        """
+        self._entries.pop(address.lower(), None)
+
+    def clear(self):
+        """清空缓存"""
+        self._entries.clear()
+
+    def last_seen(self, address: str) -> Optional[float]:
+        """
+        获取设备的最近发现时间
+
+        :param address: 设备地址
+        :return: 最近发现时间 (``time.time()``)，不在缓存中时为 ``None``
+        """
+        entry = self._entries.get(address.lower())
+        return None if entry is None else entry[1]
+
+    def devices(self, now: Optional[float] = None) -> List[YCYDevice]:
+        """
+        获取有效期内的设备
+
+        :param now: 当前时间 (``time.time()``)，默认为当前时间
+        :return: 设备，最近发现的在前
+        """
+        if now is None:
+            now = time.time()
+        entries = sorted(self._entries.values(), key=lambda entry: entry[1], reverse=True)
+        return [
+            device for device, last_seen in entries
+            if self._max_age is None or now - last_seen <= self._max_age
+        ]
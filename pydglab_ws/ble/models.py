@@ -1,7 +1,8 @@
 """
 役次元 BLE 数据模型定义
 """
-from dataclasses import dataclass
+from array import array
+from dataclasses import dataclass, field
 from typing import Optional, Union
 
 from .enums import YCYQueryType, YCYError, YCYMode, ElectrodeStatus, MotorState
@@ -10,6 +11,7 @@ __all__ = (
     "YCYDevice",
     "YCYChannelStatus",
     "YCYResponse",
+    "YCYAngleBatch",
 )
 
 
@@ -105,3 +107,37 @@ class YCYResponse:
         if self.response_type == YCYQueryType.ANGLE_DATA:
             return self.data
         return None
+
+
+@dataclass
+class YCYAngleBatch:
+    """
+    批量解析的角度数据，按列存储，每列为一个 ``array``，第 i 个元素对应第 i 条角度数据
+
+    :ivar timestamps: 接收时间，未提供时为 ``nan``
+    :ivar acc_x: X 轴加速度
+    :ivar acc_y: Y 轴加速度
+    :ivar acc_z: Z 轴加速度
+    :ivar gyro_x: X 轴角速度
+    :ivar gyro_y: Y 轴角速度
+    :ivar gyro_z: Z 轴角速度
+    :ivar skipped: 跳过的其他类型的通知数
+    :ivar checksum_errors: 校验和错误而丢弃的角度数据数
+    """
+    timestamps: array = field(default_factory=lambda: array("d"))
+    acc_x: array = field(default_factory=lambda: array("H"))
+    acc_y: array = field(default_factory=lambda: array("H"))
+    acc_z: array = field(default_factory=lambda: array("H"))
+    gyro_x: array = field(default_factory=lambda: array("H"))
+    gyro_y: array = field(default_factory=lambda: array("H"))
+    gyro_z: array = field(default_factory=lambda: array("H"))
+    skipped: int = 0
+    checksum_errors: int = 0
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def columns(self) -> tuple:
+        """数据列 (acc_x, acc_y, acc_z, gyro_x, gyro_y, gyro_z)"""
+        return self.acc_x, self.acc_y, self.acc_z, self.gyro_x, self.gyro_y, self.gyro_z
@@ -1,14 +1,16 @@
 """
 役次元 BLE 协议编解码
 """
-from typing import Optional
+import struct
+from collections import OrderedDict
+from typing import Optional, Dict, Tuple, Callable, Any, Sequence, Union
 
 from .enums import (
     YCYChannel, YCYMode, YCYCommand, YCYQueryType, YCYError,
     MotorState, ElectrodeStatus
 )
 from .exceptions import ChecksumError
-from .models import YCYResponse, YCYChannelStatus
+from .models import YCYResponse, YCYChannelStatus, YCYAngleBatch
 
 __all__ = ("YCYBLEProtocol",)
 
@@ -16,6 +18,105 @@ __all__ = ("YCYBLEProtocol",)
 PACKET_HEADER = 0x35
 
 
+class _ChannelControlFrameBuilder:
+    """
+    通道控制命令的构建器，结果与逐字节构建完全一致
+
+    每个 (通道, 模式) 保留一个可复用的 ``bytearray`` 模板，其中包头、命令字、通道号与模式固定，
+    校验和的固定部分预先求和，构建时只写入开关、强度、频率与脉冲宽度并累加校验和。
+    最近构建的命令按参数缓存，波形播放等重复参数的场景直接返回缓存的命令。
+
+    :param max_size: 缓存的命令数量上限，超出时淘汰最久未使用的命令
+    """
+
+    def __init__(self, max_size: int = 2 ** 10):
+        self._max_size = max_size
+        self._templates: Dict[Tuple[int, int], Tuple[bytearray, int]] = {}
+        """(通道, 模式) 到模板及其固定部分校验和的映射"""
+        self._frames: "OrderedDict[tuple, bytes]" = OrderedDict()
+
+    def _template(self, channel: int, mode: int) -> Tuple[bytearray, int]:
+        if (template := self._templates.get((channel, mode))) is None:
+            frame = bytearray((PACKET_HEADER, YCYCommand.CHANNEL_CONTROL, channel, 0, 0, 0, mode, 0, 0, 0))
+            template = self._templates[(channel, mode)] = frame, sum(frame)
+        return template
+
+    def build(
+        self,
+        channel: int,
+        enabled: bool,
+        strength: int,
+        mode: int,
+        frequency: int,
+        pulse_width: int
+    ) -> bytes:
+        """参数与 [`YCYBLEProtocol.build_channel_control`][pydglab_ws.ble.protocol.YCYBLEProtocol.build_channel_control] 相同"""
+        key = (channel, enabled, strength, mode, frequency, pulse_width)
+        frames = self._frames
+        if (frame := frames.get(key)) is not None:
+            frames.move_to_end(key)
+            return frame
+
+        strength = max(1, min(276, strength))
+        if mode != YCYMode.CUSTOM:
+            frequency = 0
+            pulse_width = 0
+        else:
+            frequency = max(1, min(100, frequency))
+            pulse_width = max(0, min(100, pulse_width))
+
+        template, checksum = self._template(channel, mode)
+        switch = 0x01 if enabled else 0x00
+        strength_high = (strength >> 8) & 0xFF
+        strength_low = strength & 0xFF
+        template[3] = switch
+        template[4] = strength_high
+        template[5] = strength_low
+        template[7] = frequency
+        template[8] = pulse_width
+        template[9] = (checksum + switch + strength_high + strength_low + frequency + pulse_width) & 0xFF
+        frame = bytes(template)
+
+        frames[key] = frame
+        if len(frames) > self._max_size:
+            frames.popitem(last=False)
+        return frame
+
+
+_channel_control_frames = _ChannelControlFrameBuilder()
+
+_CHANNEL_STATUS = struct.Struct(">BBHB")
+"""通道状态应答的数据部分: 电极状态、开关、强度、模式"""
+_STEP_COUNT = struct.Struct(">H")
+_ANGLE_DATA = struct.Struct(">6H")
+_ANGLE_PACKET = struct.Struct(">3B6HB")
+"""完整的角度数据应答: 包头、命令字、查询类型、六轴数据、校验和"""
+
+_QUERY_TYPES: Dict[int, YCYQueryType] = {member.value: member for member in YCYQueryType}
+
+
+def _parse_channel_status(data: bytes) -> YCYChannelStatus:
+    electrode_status, enabled, strength, mode = _CHANNEL_STATUS.unpack_from(data, 3)
+    return YCYChannelStatus(
+        electrode_status=ElectrodeStatus(electrode_status),
+        enabled=enabled == 0x01,
+        strength=strength,
+        mode=YCYMode(mode),
+    )
+
+
+_RESPONSE_LAYOUTS: Dict[YCYQueryType, Tuple[int, Callable[[bytes], Any]]] = {
+    YCYQueryType.CHANNEL_A_STATUS: (9, _parse_channel_status),
+    YCYQueryType.CHANNEL_B_STATUS: (9, _parse_channel_status),
+    YCYQueryType.MOTOR_STATUS: (5, lambda data: MotorState(data[3])),
+    YCYQueryType.BATTERY: (5, lambda data: data[3]),  # 0-100
+    YCYQueryType.STEP_COUNT: (6, lambda data: _STEP_COUNT.unpack_from(data, 3)[0]),
+    YCYQueryType.ANGLE_DATA: (16, lambda data: _ANGLE_DATA.unpack_from(data, 3)),
+    YCYQueryType.ERROR: (5, lambda data: YCYError(data[3])),
+}
+"""各响应类型的应答长度与数据解析函数"""
+
+
 class YCYBLEProtocol:
     """
     役次元 BLE 协议编解码器
@@ -68,33 +169,9 @@ class YCYBLEProtocol:
         :param mode: 模式
         :param frequency: 频率 (1-100Hz, 仅自定义模式有效)
         :param pulse_width: 脉冲宽度 (0-100us, 仅自定义模式有效)
-        :return: 命令字节
+        :return: 命令字节，相同参数的命令会复用最近构建的结果
         """
-        # 强度限制
-        strength = max(1, min(276, strength))
-
-        # 非自定义模式时，频率和脉冲宽度固定为 0
-        if mode != YCYMode.CUSTOM:
-            frequency = 0
-            pulse_width = 0
-        else:
-            frequency = max(1, min(100, frequency))
-            pulse_width = max(0, min(100, pulse_width))
-
-        data = bytes([
-            PACKET_HEADER,
-            YCYCommand.CHANNEL_CONTROL,
-            channel,
-            0x01 if enabled else 0x00,
-            (strength >> 8) & 0xFF,  # 强度高字节
-            strength & 0xFF,          # 强度低字节
-            mode,
-            frequency,
-            pulse_width,
-        ])
-
-        checksum = YCYBLEProtocol.calculate_checksum(data)
-        return data + bytes([checksum])
+        return _channel_control_frames.build(channel, enabled, strength, mode, frequency, pulse_width)
 
     @staticmethod
     def build_motor_control(state: MotorState) -> bytes:
@@ -175,7 +252,7 @@ class YCYBLEProtocol:
     @staticmethod
     def parse_response(data: bytes, verify_checksum: bool = True) -> Optional[YCYResponse]:
         """
-        解析响应数据
+        解析响应数据，按响应类型查表得到应答长度与预编译的解析格式
 
         :param data: 原始响应字节
         :param verify_checksum: 是否验证校验和
@@ -200,71 +277,106 @@ class YCYBLEProtocol:
         if data[1] != YCYCommand.QUERY:
             return None
 
-        response_type = YCYQueryType(data[2])
+        if (response_type := _QUERY_TYPES.get(data[2])) is None:
+            response_type = YCYQueryType(data[2])
 
         # 根据响应类型解析数据
-        if response_type in (YCYQueryType.CHANNEL_A_STATUS, YCYQueryType.CHANNEL_B_STATUS):
-            # 通道状态应答 (9 字节)
-            if len(data) < 9:
-                return None
-            channel_status = YCYChannelStatus(
-                electrode_status=ElectrodeStatus(data[3]),
-                enabled=data[4] == 0x01,
-                strength=(data[5] << 8) | data[6],
-                mode=YCYMode(data[7]),
-            )
-            return YCYResponse(response_type=response_type, data=channel_status)
-
-        elif response_type == YCYQueryType.MOTOR_STATUS:
-            # 马达状态应答 (5 字节)
-            if len(data) < 5:
-                return None
-            return YCYResponse(
-                response_type=response_type,
-                data=MotorState(data[3])
-            )
-
-        elif response_type == YCYQueryType.BATTERY:
-            # 电池电量应答 (5 字节)
-            if len(data) < 5:
-                return None
-            return YCYResponse(
-                response_type=response_type,
-                data=data[3]  # 0-100
-            )
-
-        elif response_type == YCYQueryType.STEP_COUNT:
-            # 计步数据应答 (6 字节)
-            if len(data) < 6:
-                return None
-            step_count = (data[3] << 8) | data[4]
-            return YCYResponse(
-                response_type=response_type,
-                data=step_count
-            )
-
-        elif response_type == YCYQueryType.ANGLE_DATA:
-            # 角度数据应答 (16 字节)
-            if len(data) < 16:
-                return None
-            acc_x = (data[3] << 8) | data[4]
-            acc_y = (data[5] << 8) | data[6]
-            acc_z = (data[7] << 8) | data[8]
-            gyro_x = (data[9] << 8) | data[10]
-            gyro_y = (data[11] << 8) | data[12]
-            gyro_z = (data[13] << 8) | data[14]
-            return YCYResponse(
-                response_type=response_type,
-                data=(acc_x, acc_y, acc_z, gyro_x, gyro_y, gyro_z)
-            )
-
-        elif response_type == YCYQueryType.ERROR:
-            # 异常上报 (5 字节)
-            if len(data) < 5:
-                return None
-            return YCYResponse(
-                response_type=response_type,
-                data=YCYError(data[3])
-            )
-
-        return YCYResponse(response_type=response_type, data=None)
+        length, parse = _RESPONSE_LAYOUTS[response_type]
+        if len(data) < length:
+            return None
+        return YCYResponse(response_type=response_type, data=parse(data))
+
+    @staticmethod
+    def parse_angle_data(data: bytes, verify_checksum: bool = True) -> Optional[Tuple[int, ...]]:
+        """
+        解析单条角度数据通知，不创建响应对象
+
+        :param data: 原始通知字节
+        :param verify_checksum: 是否验证校验和
+        :return: (acc_x, acc_y, acc_z, gyro_x, gyro_y, gyro_z)，不是角度数据或校验和错误时为 ``None``
+        """
+        if len(data) < _ANGLE_PACKET.size or data[0] != PACKET_HEADER or data[1] != YCYCommand.QUERY \
+                or data[2] != YCYQueryType.ANGLE_DATA:
+            return None
+        row = _ANGLE_PACKET.unpack_from(data)
+        if verify_checksum and sum(data[:_ANGLE_PACKET.size - 1]) & 0xFF != row[9]:
+            return None
+        return row[3:9]
+
+    @staticmethod
+    def parse_angle_batch(
+        data: Union[bytes, bytearray, memoryview],
+        timestamps: Optional[Sequence[float]] = None,
+        verify_checksum: bool = True
+    ) -> YCYAngleBatch:
+        """
+        批量解析首尾相连的多条通知中的角度数据，结果按列存储，不为每条数据创建响应对象
+
+        其他类型的通知会被跳过，校验和错误的角度数据会被丢弃，两者均计入结果的统计
+
+        :param data: 首尾相连的多条完整通知
+        :param timestamps: 每条通知 (包括被跳过的) 的接收时间
+        :param verify_checksum: 是否验证校验和
+        :return: 按列存储的角度数据
+        :raises ValueError: 数据中存在无法识别或不完整的通知，或接收时间少于通知条数
+        """
+        data = bytes(data)
+        size = len(data)
+        packet_size = _ANGLE_PACKET.size
+        batch = YCYAngleBatch()
+        if timestamps is None:
+            timestamps = (float("nan"),) * (size // 4)
+
+        count = size // packet_size
+        if size % packet_size == 0 and all(
+            data[i::packet_size].count(value) == count
+            for i, value in enumerate((PACKET_HEADER, YCYCommand.QUERY, YCYQueryType.ANGLE_DATA))
+        ):
+            # 全部为角度数据时整体解包
+            if len(timestamps) < count:
+                raise ValueError(f"Got {len(timestamps)} timestamps for {count} notifications")
+            rows = list(_ANGLE_PACKET.iter_unpack(data))
+            row_timestamps = list(timestamps[:count])
+            if verify_checksum:
+                valid = [
+                    sum(data[offset:offset + packet_size - 1]) & 0xFF == row[9]
+                    for offset, row in zip(range(0, size, packet_size), rows)
+                ]
+                if not all(valid):
+                    batch.checksum_errors = valid.count(False)
+                    rows = [row for row, ok in zip(rows, valid) if ok]
+                    row_timestamps = [timestamp for timestamp, ok in zip(row_timestamps, valid) if ok]
+        else:
+            rows = []
+            row_timestamps = []
+            offset = 0
+            index = 0
+            while offset < size:
+                if size - offset < 4 or data[offset] != PACKET_HEADER or data[offset + 1] != YCYCommand.QUERY:
+                    raise ValueError(f"Invalid notification at offset {offset}")
+                response_type = data[offset + 2]
+                if (layout := _RESPONSE_LAYOUTS.get(response_type)) is None:
+                    raise ValueError(f"Unknown response type {response_type:#04x} at offset {offset}")
+                end = offset + layout[0]
+                if end > size:
+                    raise ValueError(f"Truncated notification at offset {offset}")
+                if index >= len(timestamps):
+                    raise ValueError(f"Got {len(timestamps)} timestamps for more notifications")
+
+                if response_type != YCYQueryType.ANGLE_DATA:
+                    batch.skipped += 1
+                else:
+                    row = _ANGLE_PACKET.unpack_from(data, offset)
+                    if verify_checksum and sum(data[offset:end - 1]) & 0xFF != row[9]:
+                        batch.checksum_errors += 1
+                    else:
+                        rows.append(row)
+                        row_timestamps.append(timestamps[index])
+                offset = end
+                index += 1
+
+        if rows:
+            batch.timestamps.extend(row_timestamps)
+            for column, values in zip(batch.columns, list(zip(*rows))[3:9]):
+                column.extend(values)
+        return batch
@@ -1,11 +1,12 @@
 """
 役次元 BLE 设备扫描器
 """
-from typing import List, Optional
+from typing import List, Optional, Iterable, Union
 
 from bleak import BleakScanner
 from bleak.backends.device import BLEDevice
 
+from .cache import YCYDeviceCache
 from .models import YCYDevice
 
 __all__ = ("YCYScanner",)
@@ -14,6 +15,22 @@ __all__ = ("YCYScanner",)
 SERVICE_UUID = "0000ff30-0000-1000-8000-00805f9b34fb"
 
 
+def _has_service(service_uuids: Optional[Iterable[str]]) -> bool:
+    """广播的服务 UUID 中是否包含役次元服务，bleak 通常已给出小写的 UUID，不必逐个转换"""
+    if not service_uuids:
+        return False
+    return SERVICE_UUID in service_uuids or any(uuid.lower() == SERVICE_UUID for uuid in service_uuids)
+
+
+def _matches(device: Union[BLEDevice, YCYDevice], address: Optional[str], name: Optional[str]) -> bool:
+    """设备是否满足查找条件，未指定条件时任意设备均满足"""
+    if not address and not name:
+        return True
+    if address and device.address.lower() == address.lower():
+        return True
+    return bool(name and device.name and name.lower() in device.name.lower())
+
+
 class YCYScanner:
     """
     役次元 BLE 设备扫描器
@@ -22,11 +39,12 @@ class YCYScanner:
     """
 
     @staticmethod
-    async def scan(timeout: float = 5.0) -> List[YCYDevice]:
+    async def scan(timeout: float = 5.0, cache: Optional[YCYDeviceCache] = None) -> List[YCYDevice]:
         """
         扫描役次元 BLE 设备
 
         :param timeout: 扫描超时时间 (秒)
+        :param cache: 设备缓存，发现的设备会记录到缓存中
         :return: 发现的役次元设备列表
         """
         devices = await BleakScanner.discover(timeout=timeout, return_adv=True)
@@ -34,40 +52,69 @@ class YCYScanner:
         ycy_devices = []
         for device, adv_data in devices.values():
             # 检查服务 UUID
-            service_uuids = adv_data.service_uuids or []
-            if SERVICE_UUID.lower() in [uuid.lower() for uuid in service_uuids]:
+            if _has_service(adv_data.service_uuids):
                 ycy_devices.append(YCYDevice(
                     address=device.address,
                     name=device.name,
                     rssi=adv_data.rssi
                 ))
 
+        if cache is not None and ycy_devices:
+            cache.update(*ycy_devices)
+            cache.save()
         return ycy_devices
 
     @staticmethod
     async def find_device(
         address: Optional[str] = None,
         name: Optional[str] = None,
-        timeout: float = 5.0
+        timeout: float = 5.0,
+        cache: Optional[YCYDeviceCache] = None
     ) -> Optional[YCYDevice]:
         """
-        查找指定的役次元设备
+        查找指定的役次元设备，发现第一个满足条件的设备后立即停止扫描
 
         :param address: 设备地址
         :param name: 设备名称
         :param timeout: 扫描超时时间 (秒)
-        :return: 找到的设备，未找到返回 None
+        :param cache: 设备缓存，找到的设备会记录到缓存中
+        :return: 找到的设备，未找到返回 None；未指定条件时返回第一个发现的役次元设备
         """
-        devices = await YCYScanner.scan(timeout=timeout)
+        rssi = {}
 
-        for device in devices:
-            if address and device.address.lower() == address.lower():
-                return device
-            if name and device.name and name.lower() in device.name.lower():
-                return device
+        def match(device: BLEDevice, adv_data) -> bool:
+            if not _has_service(adv_data.service_uuids) or not _matches(device, address, name):
+                return False
+            rssi[device.address] = adv_data.rssi
+            return True
 
-        # 如果没有指定条件，返回第一个设备
-        if not address and not name and devices:
-            return devices[0]
+        device = await BleakScanner.find_device_by_filter(match, timeout=timeout)
+        if device is None:
+            return None
 
-        return None
+        ycy_device = YCYDevice(address=device.address, name=device.name, rssi=rssi.get(device.address))
+        if cache is not None:
+            cache.update(ycy_device)
+            cache.save()
+        return ycy_device
+
+    @staticmethod
+    def cached_devices(
+        address: Optional[str] = None,
+        name: Optional[str] = None,
+        cache: Optional[YCYDeviceCache] = None
+    ) -> List[YCYDevice]:
+        """
+        获取缓存中满足条件的设备，不进行扫描
+
+        :param address: 设备地址
+        :param name: 设备名称
+        :param cache: 设备缓存，默认读取默认路径的缓存文件
+        :return: 设备，最近发现的在前
+        """
+        if cache is None:
+            cache = YCYDeviceCache()
+        return [
+            device for device in cache.devices()
+            if _matches(device, address, name)
+        ]
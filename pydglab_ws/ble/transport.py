@@ -0,0 +1,103 @@
+"""
+役次元 BLE 传输层
+
+[`YCYBLEClient`][pydglab_ws.client.ble.YCYBLEClient] 通过传输层写入命令与接收通知，
+默认使用 bleak 连接真实设备，也可以替换为其他实现 (例如测试中的模拟设备)
+"""
+from abc import ABC, abstractmethod
+from typing import Callable, Optional
+
+from bleak import BleakClient
+
+__all__ = ("BLETransport", "BleakTransport", "TransportFactory")
+
+# BLE 特征 UUID
+WRITE_CHAR_UUID = "0000ff31-0000-1000-8000-00805f9b34fb"
+NOTIFY_CHAR_UUID = "0000ff32-0000-1000-8000-00805f9b34fb"
+
+NotificationCallback = Callable[[int, bytearray], None]
+"""通知回调，参数为 ``(sender, data)``"""
+
+
+class BLETransport(ABC):
+    """
+    BLE 传输层接口
+
+    一个实例对应一台设备的一次连接，设备断开时调用创建时传入的断开回调
+    """
+
+    @property
+    @abstractmethod
+    def is_connected(self) -> bool:
+        """是否已连接"""
+
+    @abstractmethod
+    async def connect(self):
+        """
+        连接设备
+
+        :raise Exception: 连接失败
+        """
+
+    @abstractmethod
+    async def disconnect(self):
+        """断开连接"""
+
+    @abstractmethod
+    async def write(self, data: bytes):
+        """
+        写入命令 (无应答写入)
+
+        :param data: 命令字节
+        :raise Exception: 写入失败
+        """
+
+    @abstractmethod
+    async def start_notify(self, callback: NotificationCallback):
+        """
+        开始接收通知
+
+        :param callback: 通知回调，参数为 ``(sender, data)``
+        """
+
+
+TransportFactory = Callable[[str, Callable[[], None]], BLETransport]
+"""传输层工厂，参数为设备地址与断开回调"""
+
+
+class BleakTransport(BLETransport):
+    """
+    基于 bleak 的传输层，连接真实的役次元设备
+
+    :param address: 设备地址
+    :param disconnected_callback: 设备断开时的回调
+    :param timeout: 连接超时时间 (秒)，包括按地址查找设备的时间，为 ``None`` 时使用 bleak 的默认值
+    """
+
+    def __init__(
+            self,
+            address: str,
+            disconnected_callback: Optional[Callable[[], None]] = None,
+            timeout: Optional[float] = None
+    ):
+        self._client = BleakClient(
+            address,
+            disconnected_callback=None if disconnected_callback is None else lambda _: disconnected_callback(),
+            **({} if timeout is None else {"timeout": timeout})
+        )
+
+    @property
+    def is_connected(self) -> bool:
+        return self._client.is_connected
+
+    async def connect(self):
+        await self._client.connect()
+
+    async def disconnect(self):
+        await self._client.disconnect()
+
+    async def write(self, data: bytes):
+        await self._client.write_gatt_char(WRITE_CHAR_UUID, data, response=False)
+
+    async def start_notify(self, callback: NotificationCallback):
+        await self._client.start_notify(NOTIFY_CHAR_UUID, callback)
@@ -1,5 +1,27 @@
-from .base import *
-from .connect import *
-from .local import *
-from .ws import *
-from .ble import *
+from typing import TYPE_CHECKING
+
+from .._lazy import attach
+
+# ble 与 manager 依赖 bleak，ws 与 connect 依赖 websockets，均在首次访问时才导入
+__getattr__, __dir__, __all__ = attach(__name__, {
+    "base": ("DGLabClient",),
+    "conflate": ("DGLabConflatedReceiver",),
+    "stream": ("PulseStream", "PulseStreamStats", "PULSE_OPERATION_DURATION", "APP_PULSE_QUEUE_MAX_LENGTH"),
+    "connect": ("DGLabWSConnect",),
+    "local": ("DGLabLocalClient",),
+    "ws": ("DGLabWSClient",),
+    "telemetry": ("TelemetryStream", "TelemetrySample", "TelemetryStats", "TelemetryWindow"),
+    "ble": ("YCYBLEClient", "WaveformPolicy", "WaveformPlayerStats", "BLEWriteStats", "BLEConnectionStats"),
+    "manager": ("YCYDeviceManager", "YCYManagedClient", "YCYManagedClientStats"),
+})
+
+if TYPE_CHECKING:
+    from .base import *
+    from .conflate import *
+    from .stream import *
+    from .connect import *
+    from .local import *
+    from .ws import *
+    from .telemetry import *
+    from .ble import *
+    from .manager import *
@@ -5,33 +5,307 @@
 """
 import asyncio
 import logging
+import random
+import time
 import uuid
-from typing import AsyncGenerator, Any, Optional, Type, TypeVar, Union
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import AsyncGenerator, Any, Optional, Type, TypeVar, Union, Dict, Deque, Tuple, Callable, Awaitable, List
 
 logger = logging.getLogger(__name__)
 
-from bleak import BleakClient
 from bleak.backends.device import BLEDevice
 from pydantic import UUID4
 
 from ..enums import Channel, StrengthOperationType, RetCode
 from ..models import StrengthData
 from ..typing import PulseOperation
-from ..ble.enums import YCYChannel, YCYMode, YCYQueryType, MotorState, ElectrodeStatus
-from ..ble.exceptions import DisconnectedError, BLEError
+from ..ble.enums import YCYChannel, YCYMode, YCYQueryType, MotorState, ElectrodeStatus, YCYCommand
+from ..ble.exceptions import DisconnectedError, BLEError, ChecksumError
 from ..ble.models import YCYDevice, YCYChannelStatus, YCYResponse
 from ..ble.protocol import YCYBLEProtocol
 from ..ble.scanner import YCYScanner, SERVICE_UUID
+from ..ble.transport import BLETransport, BleakTransport, TransportFactory
 from ..ble.utils import map_strength_to_ycy, map_strength_to_dglab, convert_pulse
+from .telemetry import TelemetryStream
 
-__all__ = ("YCYBLEClient",)
-
-# BLE 特征 UUID
-WRITE_CHAR_UUID = "0000ff31-0000-1000-8000-00805f9b34fb"
-NOTIFY_CHAR_UUID = "0000ff32-0000-1000-8000-00805f9b34fb"
+__all__ = ("YCYBLEClient", "WaveformPolicy", "WaveformPlayerStats", "BLEWriteStats", "BLEConnectionStats")
 
 _DataType = TypeVar("_DataType", Type[StrengthData], Type[RetCode])
 
+_EVENT_QUEUE_MAX_SIZE = 2 ** 8
+"""未匹配通知队列的最大长度，超出时丢弃最早的通知"""
+
+WAVEFORM_TICK_INTERVAL = 0.1
+"""每条波形的播放时长 (秒)"""
+WAVEFORM_QUEUE_MAX_LENGTH = 500
+"""软件波形队列的最大长度，与 DG-Lab App 一致"""
+
+
+class WaveformPolicy(str, Enum):
+    """
+    波形播放落后于预定时间时的处理策略
+
+    :ivar SKIP: 跳过已经错过播放时间的波形，保持与时间同步
+    :ivar CATCH_UP: 不跳过波形，连续发送直至追上预定时间
+    """
+    SKIP = "skip"
+    CATCH_UP = "catch_up"
+
+
+@dataclass
+class WaveformPlayerStats:
+    """
+    波形播放器的统计数据
+
+    每条波形的抖动为实际发送时间与预定时间之差
+
+    :ivar ticks: 已播放的波形条数
+    :ivar skipped: 因落后而跳过的波形条数
+    :ivar overruns: 发送耗时超过播放间隔的次数
+    :ivar mean_jitter: 平均抖动 (秒)
+    :ivar max_jitter: 最大抖动 (秒)
+    """
+    ticks: int = 0
+    skipped: int = 0
+    overruns: int = 0
+    mean_jitter: float = 0.0
+    max_jitter: float = 0.0
+
+
+@dataclass
+class BLEWriteStats:
+    """
+    BLE 写入的统计数据
+
+    :ivar written: 实际写入设备的命令数
+    :ivar coalesced: 在合并窗口内被同一通道更新的命令替换而未写入的通道控制命令数
+    :ivar deduplicated: 与该通道上一次写入的内容完全相同而未写入的预设模式通道控制命令数
+    """
+    written: int = 0
+    coalesced: int = 0
+    deduplicated: int = 0
+
+    @property
+    def saved(self) -> int:
+        """节省的写入次数"""
+        return self.coalesced + self.deduplicated
+
+
+@dataclass
+class BLEConnectionStats:
+    """
+    BLE 连接的统计数据
+
+    重连耗时为从意外断开到重新连接并恢复通道状态的时间
+
+    :ivar connects: 连接成功的次数，包括自动重连
+    :ivar disconnects: 意外断开的次数，不包括主动断开
+    :ivar reconnects: 自动重连成功的次数
+    :ivar failed_attempts: 自动重连失败的尝试次数
+    :ivar uptime: 当前连接已持续的时间 (秒)，未连接时为 0
+    :ivar total_uptime: 所有连接累计持续的时间 (秒)
+    :ivar last_reconnect_latency: 最近一次重连耗时 (秒)
+    :ivar mean_reconnect_latency: 平均重连耗时 (秒)
+    :ivar max_reconnect_latency: 最大重连耗时 (秒)
+    """
+    connects: int = 0
+    disconnects: int = 0
+    reconnects: int = 0
+    failed_attempts: int = 0
+    uptime: float = 0.0
+    total_uptime: float = 0.0
+    last_reconnect_latency: float = 0.0
+    mean_reconnect_latency: float = 0.0
+    max_reconnect_latency: float = 0.0
+
+
+def _overlapped_channels(channel: int) -> Tuple[int, ...]:
+    """获取与该通道的通道控制命令互相覆盖的通道，包括自身"""
+    if channel == YCYChannel.AB:
+        return YCYChannel.A, YCYChannel.B, YCYChannel.AB
+    return channel, YCYChannel.AB
+
+
+class _WriteCoalescer:
+    """
+    通道控制命令的写入合并器
+
+    通道控制命令按通道合并：预设模式的命令与该通道上一次写入的内容完全相同时不再写入；
+    距该通道上一次写入不足合并窗口时暂缓写入，窗口结束时只写入其中最新的一条，
+    被替换的命令与最新一条共享写入结果。马达、查询等其他命令直接写入。
+
+    :param write: 实际写入设备的函数
+    :param window: 合并窗口 (秒)，为 0 时只去除重复的命令
+    """
+
+    def __init__(self, write: Callable[[bytes], Awaitable[bool]], window: float = 0.0):
+        self._write = write
+        self._window = window
+        self._last_frames: Dict[int, bytes] = {}
+        """各通道上一次成功写入的命令"""
+        self._last_write_times: Dict[int, float] = {}
+        self._pending: Dict[int, Tuple[bytes, asyncio.Future]] = {}
+        """各通道暂缓写入的最新命令及其写入结果"""
+        self._flush_tasks: Dict[int, asyncio.Task] = {}
+        self._stats = BLEWriteStats()
+
+    @property
+    def stats(self) -> BLEWriteStats:
+        """统计数据"""
+        return BLEWriteStats(**vars(self._stats))
+
+    def forget(self, channel: Optional[int] = None):
+        """
+        忘记通道上一次写入的命令，下一条命令即使内容相同也会写入
+
+        :param channel: 通道号，为 ``None`` 时忘记所有通道
+        """
+        if channel is None:
+            self._last_frames.clear()
+        else:
+            self._last_frames.pop(channel, None)
+
+    def reset(self):
+        """取消暂缓写入的命令并忘记所有通道上一次写入的命令，用于连接断开或重新连接时"""
+        for task in self._flush_tasks.values():
+            task.cancel()
+        self._flush_tasks.clear()
+        for _, future in self._pending.values():
+            if not future.done():
+                future.set_result(False)
+        self._pending.clear()
+        self._last_frames.clear()
+        self._last_write_times.clear()
+
+    async def send(self, command: bytes, coalesce: bool = True) -> bool:
+        """
+        写入命令
+
+        :param command: 命令字节
+        :param coalesce: 是否允许合并与去重，为 ``False`` 时立即写入并替换该通道暂缓写入的命令。
+            其他通道中会覆盖该命令的暂缓写入的命令 (AB 通道与单通道之间) 先被替换或写入，不会在之后覆盖该命令
+        :return: 是否写入成功，被合并或去重的命令与实际写入的命令结果相同
+        """
+        if len(command) < 3 or command[1] != YCYCommand.CHANNEL_CONTROL:
+            return await self._write_counted(command)
+        channel = command[2]
+
+        superseded = await self._settle_overlapped(channel)
+        if not coalesce:
+            # 替换该通道暂缓写入的命令
+            if (pending := self._pending.pop(channel, None)) is not None:
+                superseded.append(pending[1])
+            if (task := self._flush_tasks.pop(channel, None)) is not None:
+                task.cancel()
+        try:
+            if coalesce:
+                result = await self._send_coalesced(channel, command)
+            else:
+                result = await self._write_frame(channel, command)
+        except BaseException:
+            for future in superseded:
+                if not future.done():
+                    future.set_result(False)
+            raise
+        self._stats.coalesced += len(superseded)
+        for future in superseded:
+            if not future.done():
+                future.set_result(result)
+        return result
+
+    async def _send_coalesced(self, channel: int, command: bytes) -> bool:
+        """按合并窗口写入命令"""
+        if (pending := self._pending.get(channel)) is not None:
+            # 替换暂缓写入的命令，等待窗口结束时的写入结果
+            self._pending[channel] = (command, pending[1])
+            self._stats.coalesced += 1
+            return await asyncio.shield(pending[1])
+
+        if self._is_duplicate(channel, command):
+            self._stats.deduplicated += 1
+            return True
+
+        loop = asyncio.get_running_loop()
+        last_write_time = self._last_write_times.get(channel)
+        if last_write_time is None or (delay := last_write_time + self._window - loop.time()) <= 0:
+            return await self._write_frame(channel, command)
+
+        future = loop.create_future()
+        self._pending[channel] = (command, future)
+        self._flush_tasks[channel] = asyncio.create_task(self._flush(channel, delay))
+        return await asyncio.shield(future)
+
+    async def _settle_overlapped(self, channel: int) -> List[asyncio.Future]:
+        """
+        处理其他通道中与该通道互相覆盖的暂缓写入的命令，避免其在之后写入而覆盖该通道的新命令
+
+        被新命令完全覆盖的命令 (写入 AB 通道时暂缓的单通道命令) 被替换，返回其写入结果，
+        由调用方以新命令的写入结果完成；只被覆盖一部分的命令 (写入单通道时暂缓的 AB 通道命令) 立即写入
+
+        :param channel: 新命令的通道
+        :return: 被替换的命令的写入结果
+        """
+        superseded = []
+        for overlapped in _overlapped_channels(channel):
+            if overlapped == channel or (pending := self._pending.pop(overlapped, None)) is None:
+                continue
+            if (task := self._flush_tasks.pop(overlapped, None)) is not None:
+                task.cancel()
+            command, future = pending
+            if channel == YCYChannel.AB:
+                superseded.append(future)
+            else:
+                await self._write_pending(overlapped, command, future)
+        return superseded
+
+    def _is_duplicate(self, channel: int, command: bytes) -> bool:
+        """
+        是否与该通道上一次写入的命令完全相同
+
+        自定义模式的命令每条只触发一次输出，需要持续写入，不去重
+        """
+        return command[6] != YCYMode.CUSTOM and command == self._last_frames.get(channel)
+
+    async def _flush(self, channel: int, delay: float):
+        """合并窗口结束时写入该通道最新的命令"""
+        await asyncio.sleep(delay)
+        self._flush_tasks.pop(channel, None)
+        command, future = self._pending.pop(channel)
+        await self._write_pending(channel, command, future)
+
+    async def _write_pending(self, channel: int, command: bytes, future: asyncio.Future):
+        """写入暂缓写入的命令，结果设置到其写入结果中"""
+        try:
+            if self._is_duplicate(channel, command):
+                self._stats.deduplicated += 1
+                result = True
+            else:
+                result = await self._write_frame(channel, command)
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+    async def _write_frame(self, channel: int, command: bytes) -> bool:
+        self._last_write_times[channel] = asyncio.get_running_loop().time()
+        # AB 通道命令与单通道命令互相覆盖，写入后对方上一次写入的命令不再代表设备状态
+        for overlapped in _overlapped_channels(channel):
+            if overlapped != channel:
+                self._last_frames.pop(overlapped, None)
+        result = await self._write_counted(command)
+        if result:
+            self._last_frames[channel] = command
+        else:
+            # 写入失败时设备状态未知，下一条命令不去重
+            self._last_frames.pop(channel, None)
+        return result
+
+    async def _write_counted(self, command: bytes) -> bool:
+        self._stats.written += 1
+        return await self._write(command)
+
 
 class YCYBLEClient:
     """
@@ -46,12 +320,30 @@ class YCYBLEClient:
 
     :param device: 设备地址、BLEDevice 对象或 YCYDevice 对象
     :param strength_limit: 虚拟强度上限 (DG-Lab 兼容, 默认 200)
+    :param waveform_policy: 波形播放落后于预定时间时的处理策略
+    :param write_coalesce_window: 通道控制命令的合并窗口 (秒)，距同一通道上一次写入不足该时间的命令
+        只写入窗口内最新的一条，为 0 时只去除与上一次写入完全相同的命令
+    :param shared_waveform_clock: 两个通道的波形播放器是否共用一个时钟，
+        同一时刻两个通道的波形参数相同时合并为一条 AB 通道命令
+    :param transport_factory: 传输层工厂，参数为设备地址与断开回调，默认使用 bleak 连接真实设备
+    :param auto_reconnect: 意外断开后是否自动重连，重连期间波形播放暂停，重连后恢复通道状态并继续播放
+    :param reconnect_delay: 自动重连的初始等待时间 (秒)，每次失败后加倍，实际等待时间带有随机抖动
+    :param reconnect_max_delay: 自动重连的最大等待时间 (秒)
+    :param reconnect_max_attempts: 自动重连的最大尝试次数，为 ``None`` 时一直重试直至主动断开
     """
 
     def __init__(
         self,
         device: Union[str, BLEDevice, YCYDevice],
-        strength_limit: int = 200
+        strength_limit: int = 200,
+        waveform_policy: WaveformPolicy = WaveformPolicy.SKIP,
+        write_coalesce_window: float = 0.0,
+        shared_waveform_clock: bool = True,
+        transport_factory: Optional[TransportFactory] = None,
+        auto_reconnect: bool = False,
+        reconnect_delay: float = 0.5,
+        reconnect_max_delay: float = 30.0,
+        reconnect_max_attempts: Optional[int] = None
     ):
         # 设备信息
         if isinstance(device, YCYDevice):
@@ -61,12 +353,32 @@ class YCYBLEClient:
         else:
             self._device_address = device
 
-        # BLE 客户端
-        self._client: Optional[BleakClient] = None
+        # BLE 传输层
+        self._transport_factory: TransportFactory = transport_factory or BleakTransport
+        self._transport: Optional[BLETransport] = None
         self._connected = False
 
-        # 通知队列
-        self._notification_queue: asyncio.Queue[bytes] = asyncio.Queue()
+        # 自动重连
+        self._auto_reconnect = auto_reconnect
+        self._reconnect_delay = reconnect_delay
+        self._reconnect_max_delay = reconnect_max_delay
+        self._reconnect_max_attempts = reconnect_max_attempts
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._connection_stats = BLEConnectionStats()
+        self._connected_since: Optional[float] = None
+        self._reconnect_latency_sum = 0.0
+
+        # 等待应答的查询，同一类型的查询按发送顺序依次匹配应答
+        self._pending_queries: Dict[YCYQueryType, Deque[asyncio.Future]] = {}
+        # 未匹配到查询的通知（主动上报的状态、异常等）
+        self._event_queue: asyncio.Queue[YCYResponse] = asyncio.Queue(_EVENT_QUEUE_MAX_SIZE)
+
+        # 角度、计步数据流，收到对应类型的通知时直接交给数据流，不解析为响应对象
+        self._telemetry_listeners: Dict[int, List[Callable[[bytes], None]]] = {}
+
+        # 通道控制命令的写入合并
+        self._writer = _WriteCoalescer(self._write, write_coalesce_window)
 
         # 通道状态缓存 (役次元原始强度 1-276)
         self._channel_a_strength = 1
@@ -82,6 +394,9 @@ class YCYBLEClient:
         self._strength_limit = strength_limit
 
         # 波形播放器
+        self._waveform_policy = WaveformPolicy(waveform_policy)
+        self._shared_waveform_clock = shared_waveform_clock
+        self._waveform_clock: Optional[_WaveformClock] = None
         self._waveform_player_a: Optional[_WaveformPlayer] = None
         self._waveform_player_b: Optional[_WaveformPlayer] = None
 
@@ -152,7 +467,21 @@ class YCYBLEClient:
     @property
     def connected(self) -> bool:
         """是否已连接"""
-        return self._connected and self._client is not None and self._client.is_connected
+        return self._connected and self._transport is not None and self._transport.is_connected
+
+    @property
+    def reconnecting(self) -> bool:
+        """是否正在自动重连"""
+        return self._reconnect_task is not None and not self._reconnect_task.done()
+
+    @property
+    def connection_stats(self) -> BLEConnectionStats:
+        """BLE 连接的统计数据，包括连接时长与重连耗时"""
+        stats = BLEConnectionStats(**vars(self._connection_stats))
+        if self._connected_since is not None:
+            stats.uptime = time.monotonic() - self._connected_since
+            stats.total_uptime += stats.uptime
+        return stats
 
     async def connect(self) -> bool:
         """
@@ -163,47 +492,171 @@ class YCYBLEClient:
         if self.connected:
             return True
 
-        self._client = BleakClient(
-            self._device_address,
-            disconnected_callback=self._on_disconnect
-        )
+        # 手动连接代替正在进行的自动重连，避免同时建立两个连接
+        await self._stop_reconnect()
+        self._closing = False
+        if not await self._open():
+            return False
+
+        # 初始化波形播放器，意外断开后重新连接时继续播放暂停的波形
+        if self._waveform_player_a is None:
+            if self._shared_waveform_clock:
+                self._waveform_clock = _WaveformClock(self, self._waveform_policy)
+            self._waveform_player_a = _WaveformPlayer(
+                self, Channel.A, self._waveform_policy, clock=self._waveform_clock
+            )
+            self._waveform_player_b = _WaveformPlayer(
+                self, Channel.B, self._waveform_policy, clock=self._waveform_clock
+            )
+        elif await self._replay_state():
+            self._resume_waveforms()
+        return self.connected
+
+    async def _open(self) -> bool:
+        """
+        建立连接并开始接收通知
+
+        :return: 是否连接成功
+        """
+        transport = self._transport = self._transport_factory(self._device_address, self._on_disconnect)
         try:
-            await self._client.connect()
+            await transport.connect()
             self._connected = True
+            self._writer.reset()
             logger.info(f"BLE 设备已连接: {self._device_address}")
 
             # 启动通知
-            await self._client.start_notify(NOTIFY_CHAR_UUID, self._notification_handler)
-
-            # 初始化波形播放器
-            self._waveform_player_a = _WaveformPlayer(self, Channel.A)
-            self._waveform_player_b = _WaveformPlayer(self, Channel.B)
-
-            return True
-        except Exception as e:
-            logger.error(f"BLE 连接失败: {type(e).__name__}: {e}")
+            await transport.start_notify(self._notification_handler)
+        except BaseException as e:
+            # 已建立的连接需要断开，否则每次重试都会遗留一个连接
             self._connected = False
+            if transport.is_connected:
+                try:
+                    await transport.disconnect()
+                except Exception:
+                    pass
+            if not isinstance(e, Exception):
+                raise
+            logger.error(f"BLE 连接失败: {type(e).__name__}: {e}")
             return False
+        self._connected_since = time.monotonic()
+        self._connection_stats.connects += 1
+        return True
 
-    def _on_disconnect(self, client: BleakClient):
+    def _on_disconnect(self):
         """BLE 设备断开连接回调"""
-        logger.warning(f"BLE 设备已断开连接: {self._device_address}")
+        if not self._connected:
+            return
         self._connected = False
+        self._writer.reset()
+        if self._connected_since is not None:
+            self._connection_stats.total_uptime += time.monotonic() - self._connected_since
+            self._connected_since = None
+        if self._closing:
+            return
+
+        logger.warning(f"BLE 设备已断开连接: {self._device_address}")
+        self._connection_stats.disconnects += 1
+        self._pause_waveforms()
+        if self._auto_reconnect and not self.reconnecting:
+            self._reconnect_task = asyncio.get_running_loop().create_task(self._reconnect_loop())
+
+    async def _reconnect_loop(self):
+        """自动重连，等待时间按指数增长并带有随机抖动，连接后恢复通道状态与数据流并继续播放波形"""
+        started = time.monotonic()
+        delay = self._reconnect_delay
+        attempts = 0
+        while not self._closing:
+            # 随机抖动避免多台设备同时重连
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            if self._closing:
+                return
+            attempts += 1
+            if await self._open() and await self._replay_state():
+                self._resume_waveforms()
+                latency = time.monotonic() - started
+                stats = self._connection_stats
+                stats.reconnects += 1
+                stats.last_reconnect_latency = latency
+                stats.max_reconnect_latency = max(stats.max_reconnect_latency, latency)
+                self._reconnect_latency_sum += latency
+                stats.mean_reconnect_latency = self._reconnect_latency_sum / stats.reconnects
+                logger.info(f"BLE 设备已重新连接: {self._device_address}, 耗时 {latency:.2f} 秒, 尝试 {attempts} 次")
+                return
+            self._connection_stats.failed_attempts += 1
+            if self._reconnect_max_attempts is not None and attempts >= self._reconnect_max_attempts:
+                logger.error(f"BLE 设备重连失败，已尝试 {attempts} 次: {self._device_address}")
+                return
+            delay = min(self._reconnect_max_delay, delay * 2)
+
+    async def _stop_reconnect(self):
+        """停止自动重连，等待其结束"""
+        if self.reconnecting:
+            self._reconnect_task.cancel()
+            try:
+                await self._reconnect_task
+            except asyncio.CancelledError:
+                pass
+        self._reconnect_task = None
+
+    async def _replay_state(self) -> bool:
+        """
+        重新连接后恢复缓存的通道强度与模式，并重新开启正在接收的数据流的上报
+
+        :return: 是否恢复成功，期间再次断开时为 ``False``
+        """
+        try:
+            await self._replay_commands()
+        except DisconnectedError:
+            return False
+        return self.connected
+
+    async def _replay_commands(self):
+        for channel, enabled, strength, mode in (
+            (YCYChannel.A, self._channel_a_enabled, self._channel_a_strength, self._channel_a_mode),
+            (YCYChannel.B, self._channel_b_enabled, self._channel_b_strength, self._channel_b_mode),
+        ):
+            # 自定义模式的输出由继续播放的波形发送
+            if enabled and mode != YCYMode.CUSTOM:
+                await self._send_command(
+                    YCYBLEProtocol.build_channel_control(channel, enabled, strength, mode), coalesce=False
+                )
+        if self._telemetry_listeners.get(YCYQueryType.ANGLE_DATA):
+            await self._send_command(YCYBLEProtocol.build_angle_control(True))
+        if self._telemetry_listeners.get(YCYQueryType.STEP_COUNT):
+            await self._send_command(YCYBLEProtocol.build_step_control(0x01))
+
+    def _pause_waveforms(self):
+        for player in self._waveform_player_a, self._waveform_player_b:
+            if player is not None:
+                player.pause()
+
+    def _resume_waveforms(self):
+        for player in self._waveform_player_a, self._waveform_player_b:
+            if player is not None:
+                player.resume()
 
     async def disconnect(self):
-        """断开 BLE 连接"""
+        """断开 BLE 连接，停止自动重连，波形队列被丢弃"""
+        self._closing = True
+        await self._stop_reconnect()
+
         # 停止波形播放器
         if self._waveform_player_a:
             await self._waveform_player_a.stop()
         if self._waveform_player_b:
             await self._waveform_player_b.stop()
+        if self._waveform_clock:
+            await self._waveform_clock.stop()
+        self._waveform_player_a = self._waveform_player_b = self._waveform_clock = None
 
-        if self._client:
+        if self._transport:
             try:
-                await self._client.disconnect()
+                await self._transport.disconnect()
             except Exception:
                 pass
-        self._connected = False
+        self._on_disconnect()
+        self._writer.reset()
 
     async def __aenter__(self) -> "YCYBLEClient":
         await self.connect()
@@ -215,35 +668,172 @@ class YCYBLEClient:
         await self.disconnect()
 
     def _notification_handler(self, sender: int, data: bytearray):
-        """BLE 通知处理"""
-        self._notification_queue.put_nowait(bytes(data))
+        """
+        BLE 通知处理
 
-    async def _send_command(self, command: bytes) -> bool:
+        每条通知只解析一次，优先交给等待该类型应答的查询，否则放入事件队列；
+        有数据流接收的角度、计步数据直接交给数据流
         """
-        发送命令到设备
+        if len(data) > 2 and (listeners := self._telemetry_listeners.get(data[2])) \
+                and data[1] == YCYCommand.QUERY and not self._pending_queries.get(data[2]):
+            for listener in listeners:
+                listener(data)
+            return
+
+        verified = True
+        try:
+            response = self._parse_notification(data)
+        except ChecksumError as e:
+            # 校验失败的通知不作为查询应答，只放入事件队列
+            logger.warning(f"BLE 通知校验失败: {e}")
+            response = self._parse_notification(data, verify_checksum=False)
+            verified = False
+        if response is None:
+            logger.debug(f"无法解析的 BLE 通知: {bytes(data).hex()}")
+            return
+
+        self._update_channel_cache(response)
+        if verified:
+            futures = self._pending_queries.get(response.response_type)
+            while futures:
+                future = futures.popleft()
+                if not future.done():
+                    future.set_result(response)
+                    return
+
+        if self._event_queue.full():
+            self._event_queue.get_nowait()
+        self._event_queue.put_nowait(response)
+
+    @staticmethod
+    def _parse_notification(data: bytearray, verify_checksum: bool = True) -> Optional[YCYResponse]:
+        """
+        解析通知，无法解析时返回 ``None``
+
+        :raises ChecksumError: 校验和错误
+        """
+        try:
+            return YCYBLEProtocol.parse_response(data, verify_checksum=verify_checksum)
+        except (ValueError, IndexError):
+            return None
+
+    def _update_channel_cache(self, response: YCYResponse):
+        """根据通道状态应答更新缓存"""
+        if (status := response.channel_status) is None:
+            return
+        # 设备上报的状态可能已与上一次写入的命令不同
+        if response.response_type == YCYQueryType.CHANNEL_A_STATUS:
+            self._channel_a_strength = status.strength
+            self._channel_a_enabled = status.enabled
+            self._writer.forget(YCYChannel.A)
+        else:
+            self._channel_b_strength = status.strength
+            self._channel_b_enabled = status.enabled
+            self._writer.forget(YCYChannel.B)
+
+    @property
+    def write_stats(self) -> BLEWriteStats:
+        """BLE 写入的统计数据，包括合并与去重节省的写入次数"""
+        return self._writer.stats
+
+    async def _send_command(self, command: bytes, coalesce: bool = True) -> bool:
+        """
+        发送命令到设备，通道控制命令经过合并与去重
 
         :param command: 命令字节
+        :param coalesce: 是否允许合并与去重，停止输出等必须立即送达的命令应为 ``False``
         :return: 是否发送成功
         """
         if not self.connected:
             raise DisconnectedError()
+        return await self._writer.send(command, coalesce)
+
+    async def _write(self, command: bytes) -> bool:
+        """
+        写入命令到设备
+
+        :param command: 命令字节
+        :return: 是否写入成功
+        """
+        if not self.connected:
+            return False
 
         try:
-            await self._client.write_gatt_char(WRITE_CHAR_UUID, command, response=False)
+            await self._transport.write(command)
             return True
         except Exception:
             return False
 
-    async def _wait_response(self, timeout: float = 1.0) -> Optional[YCYResponse]:
+    async def _query(self, query_type: YCYQueryType, timeout: float = 1.0) -> Optional[YCYResponse]:
         """
-        等待设备响应
+        发送查询并等待对应类型的应答，不同类型的查询可以并发进行
 
+        :param query_type: 查询类型
         :param timeout: 超时时间 (秒)
-        :return: 响应对象
+        :return: 响应对象，超时或发送失败时为 ``None``
+        """
+        if not self.connected:
+            raise DisconnectedError()
+
+        # 先登记再发送，避免应答早于登记到达
+        future = asyncio.get_running_loop().create_future()
+        futures = self._pending_queries.setdefault(query_type, deque())
+        futures.append(future)
+        try:
+            if not await self._send_command(YCYBLEProtocol.build_query(query_type)):
+                return None
+            return await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            if not future.done():
+                future.cancel()
+            try:
+                futures.remove(future)
+            except ValueError:
+                pass
+
+    def _add_telemetry_listener(self, query_type: YCYQueryType, listener: Callable[[bytes], None]):
+        """添加角度、计步数据的接收函数"""
+        self._telemetry_listeners.setdefault(query_type, []).append(listener)
+
+    def _remove_telemetry_listener(self, query_type: YCYQueryType, listener: Callable[[bytes], None]):
+        """移除角度、计步数据的接收函数"""
+        listeners = self._telemetry_listeners.get(query_type, [])
+        if listener in listeners:
+            listeners.remove(listener)
+        if not listeners:
+            self._telemetry_listeners.pop(query_type, None)
+
+    def angle_stream(self, buffer_size: int = 2 ** 10, history_size: int = 2 ** 10) -> TelemetryStream:
+        """
+        创建角度 (IMU) 数据流，开始后设备持续上报六轴数据
+
+        :param buffer_size: 未取走的数据的缓冲区大小，超出时丢弃最早的数据
+        :param history_size: 用于按时间窗口聚合的最近数据的保留条数
+        :return: 数据流，需要通过 ``async with`` 或 ``start()`` 开始
+        """
+        return TelemetryStream(self, YCYQueryType.ANGLE_DATA, buffer_size, history_size)
+
+    def step_stream(self, buffer_size: int = 2 ** 10, history_size: int = 2 ** 10) -> TelemetryStream:
+        """
+        创建计步数据流，开始后设备持续上报步数
+
+        :param buffer_size: 未取走的数据的缓冲区大小，超出时丢弃最早的数据
+        :param history_size: 用于按时间窗口聚合的最近数据的保留条数
+        :return: 数据流，需要通过 ``async with`` 或 ``start()`` 开始
+        """
+        return TelemetryStream(self, YCYQueryType.STEP_COUNT, buffer_size, history_size)
+
+    async def recv_event(self, timeout: Optional[float] = None) -> Optional[YCYResponse]:
+        """
+        接收未匹配到查询的通知，例如设备主动上报的通道状态、异常上报等
+
+        :param timeout: 超时时间 (秒)，为 ``None`` 时一直等待
+        :return: 响应对象，超时时为 ``None``
         """
         try:
-            data = await asyncio.wait_for(self._notification_queue.get(), timeout=timeout)
-            return YCYBLEProtocol.parse_response(data)
+            return await asyncio.wait_for(self._event_queue.get(), timeout=timeout)
         except asyncio.TimeoutError:
             return None
 
@@ -336,6 +926,16 @@ class YCYBLEClient:
             return True
         return False
 
+    def waveform_stats(self, channel: Channel) -> Optional[WaveformPlayerStats]:
+        """
+        获取波形播放器的统计数据，可用于确认长时间播放时仍保持 10Hz 输出
+
+        :param channel: 通道选择
+        :return: 统计数据，尚未连接时为 ``None``
+        """
+        player = self._waveform_player_a if channel == Channel.A else self._waveform_player_b
+        return player.stats if player else None
+
     async def clear_pulses(self, channel: Channel) -> bool:
         """
         清空波形队列 (DG-Lab 兼容接口)
@@ -361,34 +961,11 @@ class YCYBLEClient:
         if not self.connected:
             raise DisconnectedError()
 
-        try:
-            data = await asyncio.wait_for(self._notification_queue.get(), timeout=1.0)
-            response = YCYBLEProtocol.parse_response(data, verify_checksum=False)
-
-            if response and response.response_type in (
-                YCYQueryType.CHANNEL_A_STATUS,
-                YCYQueryType.CHANNEL_B_STATUS
-            ):
-                # 更新缓存
-                status = response.channel_status
-                if response.response_type == YCYQueryType.CHANNEL_A_STATUS:
-                    self._channel_a_strength = status.strength
-                    self._channel_a_enabled = status.enabled
-                else:
-                    self._channel_b_strength = status.strength
-                    self._channel_b_enabled = status.enabled
-
-                # 返回 DG-Lab 格式的强度数据
-                return StrengthData(
-                    a=map_strength_to_dglab(self._channel_a_strength) if self._channel_a_enabled else 0,
-                    b=map_strength_to_dglab(self._channel_b_strength) if self._channel_b_enabled else 0,
-                    a_limit=self._strength_limit,
-                    b_limit=self._strength_limit
-                )
-
-            return RetCode.SUCCESS
-        except asyncio.TimeoutError:
-            return RetCode.SUCCESS
+        response = await self.recv_event(timeout=1.0)
+        if response is not None and response.channel_status is not None:
+            # 返回 DG-Lab 格式的强度数据，通道状态缓存已在收到通知时更新
+            return self.strength_data
+        return RetCode.SUCCESS
 
     async def data_generator(
         self,
@@ -424,19 +1001,14 @@ class YCYBLEClient:
 
     # ==================== 役次元扩展接口 ====================
 
-    async def get_battery(self) -> int:
+    async def get_battery(self, timeout: float = 1.0) -> int:
         """
         获取电池电量
 
-        :return: 电量百分比 (0-100)
+        :param timeout: 等待应答的超时时间 (秒)
+        :return: 电量百分比 (0-100)，超时时为 -1
         """
-        if not self.connected:
-            raise DisconnectedError()
-
-        command = YCYBLEProtocol.build_query(YCYQueryType.BATTERY)
-        await self._send_command(command)
-
-        response = await self._wait_response()
+        response = await self._query(YCYQueryType.BATTERY, timeout)
         if response and response.battery is not None:
             return response.battery
         return -1
@@ -454,44 +1026,50 @@ class YCYBLEClient:
         command = YCYBLEProtocol.build_motor_control(state)
         return await self._send_command(command)
 
-    async def get_electrode_status(self, channel: Channel) -> ElectrodeStatus:
+    async def get_electrode_status(self, channel: Channel, timeout: float = 1.0) -> ElectrodeStatus:
         """
         获取电极连接状态
 
         :param channel: 通道选择
+        :param timeout: 等待应答的超时时间 (秒)
         :return: 电极状态
         """
-        if not self.connected:
-            raise DisconnectedError()
-
-        query_type = YCYQueryType.CHANNEL_A_STATUS if channel == Channel.A else YCYQueryType.CHANNEL_B_STATUS
-        command = YCYBLEProtocol.build_query(query_type)
-        await self._send_command(command)
-
-        response = await self._wait_response()
-        if response and response.channel_status:
-            return response.channel_status.electrode_status
+        status = await self.get_channel_status(channel, timeout)
+        if status:
+            return status.electrode_status
         return ElectrodeStatus.NOT_CONNECTED
 
-    async def get_channel_status(self, channel: Channel) -> Optional[YCYChannelStatus]:
+    async def get_channel_status(self, channel: Channel, timeout: float = 1.0) -> Optional[YCYChannelStatus]:
         """
         获取通道完整状态
 
         :param channel: 通道选择
-        :return: 通道状态
+        :param timeout: 等待应答的超时时间 (秒)
+        :return: 通道状态，超时时为 ``None``
         """
-        if not self.connected:
-            raise DisconnectedError()
-
         query_type = YCYQueryType.CHANNEL_A_STATUS if channel == Channel.A else YCYQueryType.CHANNEL_B_STATUS
-        command = YCYBLEProtocol.build_query(query_type)
-        await self._send_command(command)
-
-        response = await self._wait_response()
+        response = await self._query(query_type, timeout)
         if response:
             return response.channel_status
         return None
 
+    async def get_device_status(
+        self,
+        timeout: float = 1.0
+    ) -> Tuple[int, Optional[YCYChannelStatus], Optional[YCYChannelStatus]]:
+        """
+        同时查询电池电量与 A, B 通道状态
+
+        :param timeout: 等待应答的超时时间 (秒)
+        :return: 电量百分比 (超时时为 -1)、A 通道状态、B 通道状态
+        """
+        battery, status_a, status_b = await asyncio.gather(
+            self.get_battery(timeout),
+            self.get_channel_status(Channel.A, timeout),
+            self.get_channel_status(Channel.B, timeout),
+        )
+        return battery, status_a, status_b
+
     async def set_mode(self, channel: Channel, mode: YCYMode) -> bool:
         """
         设置通道模式 (16 种预设模式)
@@ -634,6 +1212,40 @@ class YCYBLEClient:
 
         return await self._send_command(command)
 
+    async def _set_custom_waves(self, waves: Dict[Channel, Tuple[int, int]]) -> bool:
+        """
+        同时设置两个通道的自定义波形，供共用时钟的波形播放器使用
+
+        两个通道均已启用、强度相同且波形参数相同时合并为一条 AB 通道命令，否则逐个通道发送
+
+        :param waves: 各通道的 (频率, 脉冲宽度)
+        :return: 是否全部成功
+        """
+        if (
+            len(waves) == 2
+            and waves[Channel.A] == waves[Channel.B]
+            and self._channel_a_enabled and self._channel_b_enabled
+            and self._channel_a_strength == self._channel_b_strength > 1
+        ):
+            if not self.connected:
+                raise DisconnectedError()
+            frequency, pulse_width = waves[Channel.A]
+            command = YCYBLEProtocol.build_channel_control(
+                channel=YCYChannel.AB,
+                enabled=True,
+                strength=self._channel_a_strength,
+                mode=YCYMode.CUSTOM,
+                frequency=frequency,
+                pulse_width=pulse_width
+            )
+            return await self._send_command(command)
+
+        results = [
+            await self.set_custom_wave(channel, frequency, pulse_width)
+            for channel, (frequency, pulse_width) in waves.items()
+        ]
+        return all(results)
+
     async def set_ycy_strength(
         self,
         channel: Channel,
@@ -713,7 +1325,7 @@ class YCYBLEClient:
             pulse_width=0
         )
 
-        return await self._send_command(command)
+        return await self._send_command(command, coalesce=False)
 
     async def stop_all(self) -> bool:
         """
@@ -736,27 +1348,17 @@ class YCYBLEClient:
         self._channel_a_enabled = False
         self._channel_b_enabled = False
 
-        # 停止 A 通道
-        cmd_a = YCYBLEProtocol.build_channel_control(
-            channel=YCYChannel.A,
-            enabled=False,
-            strength=1,
-            mode=YCYMode.PRESET_1,
-            frequency=0,
-            pulse_width=0
-        )
-        await self._send_command(cmd_a)
-
-        # 停止 B 通道
-        cmd_b = YCYBLEProtocol.build_channel_control(
-            channel=YCYChannel.B,
+        # 一条 AB 通道命令同时停止两个通道
+        # 注意: mode 必须是有效值 (0x01-0x10 或 0x11), 不能用 0x00
+        cmd_ab = YCYBLEProtocol.build_channel_control(
+            channel=YCYChannel.AB,
             enabled=False,
             strength=1,
             mode=YCYMode.PRESET_1,
             frequency=0,
             pulse_width=0
         )
-        await self._send_command(cmd_b)
+        await self._send_command(cmd_ab, coalesce=False)
 
         # 停止马达
         cmd_motor = YCYBLEProtocol.build_motor_control(MotorState.OFF)
@@ -782,48 +1384,93 @@ class _WaveformPlayer:
     波形播放器 - 软件模拟 DG-Lab 波形队列
 
     将 DG-Lab 波形数据转换为役次元自定义模式并播放。
+    按绝对的单调时钟截止时间调度，发送耗时不会累积为播放时长的偏移；队列为空时挂起等待，不进行轮询。
+
+    :param client: 役次元 BLE 客户端
+    :param channel: 通道选择
+    :param policy: 播放落后于预定时间时的处理策略
+    :param tick_interval: 每条波形的播放时长 (秒)
+    :param clock: 共用的时钟，为 ``None`` 时使用独立的播放循环
     """
 
-    def __init__(self, client: YCYBLEClient, channel: Channel):
+    def __init__(
+        self,
+        client: YCYBLEClient,
+        channel: Channel,
+        policy: WaveformPolicy = WaveformPolicy.SKIP,
+        tick_interval: float = WAVEFORM_TICK_INTERVAL,
+        clock: Optional["_WaveformClock"] = None
+    ):
         self._client = client
         self._channel = channel
-        self._queue: asyncio.Queue = asyncio.Queue(maxsize=500)
+        self._policy = policy
+        self._tick_interval = tick_interval
+        self._clock = clock
+        self._queue: Deque[Tuple[int, int]] = deque()
+        self._wakeup = asyncio.Event()
         self._running = False
         self._task: Optional[asyncio.Task] = None
+        self._stats = WaveformPlayerStats()
+        self._jitter_sum = 0.0
+        self._paused = False
+        if clock is not None:
+            clock.attach(self)
+
+    @property
+    def channel(self) -> Channel:
+        """通道"""
+        return self._channel
+
+    @property
+    def active(self) -> bool:
+        """是否正在播放且队列中有待播放的波形"""
+        return self._running and not self._paused and bool(self._queue)
+
+    @property
+    def paused(self) -> bool:
+        """是否已暂停"""
+        return self._paused
+
+    @property
+    def stats(self) -> WaveformPlayerStats:
+        """统计数据"""
+        return WaveformPlayerStats(**vars(self._stats))
+
+    @property
+    def queue_size(self) -> int:
+        """队列中待播放的波形条数"""
+        return len(self._queue)
 
     async def add(self, *pulses: PulseOperation):
         """添加波形到队列"""
         added_count = 0
         for pulse in pulses:
-            freq, pulse_width = convert_pulse(pulse)
-            try:
-                self._queue.put_nowait((freq, pulse_width))
-                added_count += 1
-            except asyncio.QueueFull:
-                # 队列满时丢弃
-                pass
+            # 队列满时丢弃
+            if len(self._queue) >= WAVEFORM_QUEUE_MAX_LENGTH:
+                break
+            self._queue.append(convert_pulse(pulse))
+            added_count += 1
+        self._wake()
 
-        logger.info(f"波形队列 {self._channel}: 添加了 {added_count} 条波形, 队列大小: {self._queue.qsize()}, 播放器运行中: {self._running}")
+        logger.debug(f"波形队列 {self._channel}: 添加了 {added_count} 条波形, 队列大小: {len(self._queue)}")
 
         # 确保播放器在运行
         if not self._running:
-            logger.info(f"波形播放器 {self._channel} 未运行，正在启动...")
             await self.start()
 
     async def clear(self):
         """清空队列"""
-        while not self._queue.empty():
-            try:
-                self._queue.get_nowait()
-            except asyncio.QueueEmpty:
-                break
+        self._queue.clear()
 
     async def start(self):
         """启动播放"""
         if self._running:
             return
         self._running = True
-        self._task = asyncio.create_task(self._playback_loop())
+        if self._clock is not None:
+            self._wake()
+        else:
+            self._task = asyncio.create_task(self._playback_loop())
 
     async def stop(self):
         """停止播放"""
@@ -836,26 +1483,81 @@ class _WaveformPlayer:
                 pass
             self._task = None
 
+    def pause(self):
+        """暂停播放，队列中的波形保留，恢复后从暂停处继续播放"""
+        self._paused = True
+
+    def resume(self):
+        """恢复播放"""
+        self._paused = False
+        if self._queue:
+            self._wake()
+
+    def _wake(self):
+        """唤醒等待波形的播放循环"""
+        if self._clock is not None:
+            self._clock.wake()
+        else:
+            self._wakeup.set()
+
+    def _take(self, missed: int) -> Tuple[Tuple[int, int], int]:
+        """
+        取出当前应播放的波形，队列不能为空
+
+        :param missed: 错过播放时间的波形条数，视为已播放，至少保留当前一条
+        :return: 波形 (频率, 脉冲宽度) 与实际跳过的条数
+        """
+        queue = self._queue
+        missed = min(missed, len(queue) - 1)
+        for _ in range(missed):
+            queue.popleft()
+        self._stats.skipped += missed
+        return queue.popleft(), missed
+
+    def _record(self, jitter: float, elapsed: float):
+        """记录一次播放的抖动与发送耗时"""
+        stats = self._stats
+        stats.ticks += 1
+        self._jitter_sum += jitter
+        stats.mean_jitter = self._jitter_sum / stats.ticks
+        stats.max_jitter = max(stats.max_jitter, jitter)
+        if elapsed > self._tick_interval:
+            stats.overruns += 1
+
     async def _playback_loop(self):
-        """播放循环 - 每 100ms 下发一次"""
+        """播放循环 - 按截止时间每 100ms 下发一次"""
         logger.info(f"波形播放器 {self._channel} 已启动")
-        play_count = 0
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+        interval = self._tick_interval
+        deadline: Optional[float] = None
         while self._running:
             try:
-                freq, pulse_width = await asyncio.wait_for(
-                    self._queue.get(), timeout=0.1
-                )
-                play_count += 1
-                if play_count % 10 == 1:  # 每10次记录一次
-                    logger.info(f"播放波形 {self._channel}: freq={freq}, pulse_width={pulse_width}, 已播放{play_count}次")
-                result = await self._client.set_custom_wave(
-                    self._channel, freq, pulse_width
-                )
+                if not queue or self._paused:
+                    # 队列为空或暂停时重新开始计时
+                    deadline = None
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                if deadline is None:
+                    deadline = loop.time()
+                elif (delay := deadline - loop.time()) > 0:
+                    await asyncio.sleep(delay)
+
+                now = loop.time()
+                missed = 0
+                if self._policy == WaveformPolicy.SKIP:
+                    missed = max(0, int((now - deadline) / interval))
+                if not queue or self._paused:
+                    continue
+                (freq, pulse_width), skipped = self._take(missed)
+                deadline += skipped * interval
+
+                result = await self._client.set_custom_wave(self._channel, freq, pulse_width)
+                self._record(now - deadline, loop.time() - now)
                 if not result:
                     logger.warning(f"波形播放器 {self._channel}: set_custom_wave 返回 False")
-                await asyncio.sleep(0.1)  # 100ms 间隔
-            except asyncio.TimeoutError:
-                continue
+                deadline += interval
             except asyncio.CancelledError:
                 logger.info(f"波形播放器 {self._channel} 被取消")
                 break
@@ -864,4 +1566,98 @@ class _WaveformPlayer:
                 import traceback
                 logger.error(traceback.format_exc())
                 continue
-        logger.info(f"波形播放器 {self._channel} 已停止, 共播放 {play_count} 次")
+        logger.info(f"波形播放器 {self._channel} 已停止, 共播放 {self._stats.ticks} 次")
+
+
+class _WaveformClock:
+    """
+    两个通道的波形播放器共用的时钟
+
+    每个时刻从所有正在播放的播放器中各取出一条波形，通过 ``_set_custom_waves`` 一次下发，
+    两个通道的波形参数相同时合并为一条 AB 通道命令。
+    调度方式与独立的播放循环相同，所有播放器都没有待播放的波形时挂起等待。
+
+    :param client: 役次元 BLE 客户端
+    :param policy: 播放落后于预定时间时的处理策略
+    :param tick_interval: 每条波形的播放时长 (秒)
+    """
+
+    def __init__(
+        self,
+        client: YCYBLEClient,
+        policy: WaveformPolicy = WaveformPolicy.SKIP,
+        tick_interval: float = WAVEFORM_TICK_INTERVAL
+    ):
+        self._client = client
+        self._policy = policy
+        self._tick_interval = tick_interval
+        self._players: List[_WaveformPlayer] = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def attach(self, player: _WaveformPlayer):
+        """加入播放器"""
+        self._players.append(player)
+
+    def wake(self):
+        """有播放器添加了波形或开始播放，需要时启动时钟"""
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._playback_loop())
+
+    async def stop(self):
+        """停止时钟"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _playback_loop(self):
+        """播放循环 - 按截止时间每 100ms 为所有播放器下发一次"""
+        loop = asyncio.get_running_loop()
+        interval = self._tick_interval
+        deadline: Optional[float] = None
+        while True:
+            try:
+                if not any(player.active for player in self._players):
+                    deadline = None
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                if deadline is None:
+                    deadline = loop.time()
+                elif (delay := deadline - loop.time()) > 0:
+                    await asyncio.sleep(delay)
+
+                now = loop.time()
+                missed = 0
+                if self._policy == WaveformPolicy.SKIP:
+                    missed = max(0, int((now - deadline) / interval))
+                # 等待期间播放器可能已停止或被清空
+                players = [player for player in self._players if player.active]
+                if not players:
+                    continue
+                waves: Dict[Channel, Tuple[int, int]] = {}
+                skipped = 0
+                for player in players:
+                    waves[player.channel], player_skipped = player._take(missed)
+                    skipped = max(skipped, player_skipped)
+                deadline += skipped * interval
+
+                result = await self._client._set_custom_waves(waves)
+                elapsed = loop.time() - now
+                for player in players:
+                    player._record(now - deadline, elapsed)
+                if not result:
+                    logger.warning(f"波形时钟: _set_custom_waves 返回 False")
+                deadline += interval
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"波形时钟异常: {type(e).__name__}: {e}")
+                import traceback
+                logger.error(traceback.format_exc())
+                continue
@@ -0,0 +1,152 @@
+import asyncio
+import itertools
+from collections import OrderedDict
+from typing import Optional, Union, Any, AsyncGenerator, Hashable, Type, TypeVar
+
+from .base import DGLabClient
+from ..enums import RetCode, FeedbackButton
+from ..models import StrengthData
+
+__all__ = ["DGLabConflatedReceiver"]
+
+_DataType = TypeVar("_DataType", Type[StrengthData], Type[FeedbackButton], Type[RetCode])
+
+_STRENGTH_KEY = ("strength",)
+_RET_CODE_KEY = ("ret_code",)
+
+
+class DGLabConflatedReceiver:
+    """
+    DG-Lab 终端的最新值接收器
+
+    在后台持续接收终端的数据，未被取走的 **强度数据** 只保留最新一条，
+    **App 断开连接** - ``RetCode.CLIENT_DISCONNECTED`` 则每条都会保留。
+    适合界面刷新等只关心当前状态的场景，处理速度较慢时不会积压过时的数据。
+
+    接收器运行期间，不应再直接调用终端的 ``recv_data``, ``bind`` 等接收消息的方法
+
+    示例：
+    ```python3
+    async with DGLabConflatedReceiver(client) as receiver:
+        async for data in receiver.data_generator(StrengthData):
+            print(f"Current strength: {data}")
+    ```
+
+    :param client: DG-Lab 终端，可以是 [`DGLabWSClient`][pydglab_ws.client.ws.DGLabWSClient] 或
+        [`DGLabLocalClient`][pydglab_ws.client.local.DGLabLocalClient]
+    :param conflate_feedback: 是否对 **App 反馈数据** 按按钮只保留最新一条，否则每条都会保留
+    """
+
+    def __init__(self, client: DGLabClient, conflate_feedback: bool = False):
+        self._client = client
+        self._conflate_feedback = conflate_feedback
+        self._pending: "OrderedDict[Hashable, Union[StrengthData, FeedbackButton, RetCode]]" = OrderedDict()
+        """待取走的数据，键相同的数据只保留最新一条"""
+        self._event_ids = itertools.count()
+        self._updated = asyncio.Event()
+        self._latest_strength: Optional[StrengthData] = None
+        self._conflated = 0
+        self._exception: Optional[BaseException] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> "DGLabConflatedReceiver":
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    @property
+    def client(self) -> DGLabClient:
+        """DG-Lab 终端"""
+        return self._client
+
+    @property
+    def latest_strength(self) -> Optional[StrengthData]:
+        """收到的最新强度数据，无论是否已被取走，尚未收到时为 ``None``"""
+        return self._latest_strength
+
+    @property
+    def conflated(self) -> int:
+        """被更新的数据替换而未被取走的数据数"""
+        return self._conflated
+
+    def start(self):
+        """开始在后台接收数据"""
+        if self._task is None or self._task.done():
+            self._exception = None
+            self._task = asyncio.create_task(self._receiver())
+
+    async def close(self):
+        """停止接收数据，尚未取走的数据仍然可以获取"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._updated.set()
+
+    def _key(self, data: Union[StrengthData, FeedbackButton, RetCode]) -> Hashable:
+        """获取数据的合并键，每条都需要保留的数据使用唯一的键"""
+        if isinstance(data, StrengthData):
+            return _STRENGTH_KEY
+        if isinstance(data, FeedbackButton):
+            return ("feedback", data) if self._conflate_feedback else ("event", next(self._event_ids))
+        if data == RetCode.CLIENT_DISCONNECTED:
+            return "event", next(self._event_ids)
+        return _RET_CODE_KEY
+
+    def _put(self, data: Union[StrengthData, FeedbackButton, RetCode]):
+        key = self._key(data)
+        if key in self._pending:
+            self._conflated += 1
+            # 替换后移动到末尾，与其他数据的先后顺序与最新一条保持一致
+            self._pending.move_to_end(key)
+        self._pending[key] = data
+        if isinstance(data, StrengthData):
+            self._latest_strength = data
+        self._updated.set()
+
+    async def _receiver(self):
+        try:
+            while True:
+                self._put(await self._client.recv_data())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._exception = e
+            self._updated.set()
+
+    async def recv_data(self) -> Union[StrengthData, FeedbackButton, RetCode]:
+        """
+        获取尚未取走的最早一条数据，同类数据只会获取到最新的
+
+        :return: 与 [`DGLabClient.recv_data`][pydglab_ws.client.base.DGLabClient.recv_data] 相同
+        :raise Exception: 后台接收数据时的异常，在已接收的数据全部取走后抛出
+        """
+        while not self._pending:
+            if self._exception is not None:
+                raise self._exception
+            if self._task is None:
+                raise RuntimeError("Conflated receiver is not running")
+            self._updated.clear()
+            await self._updated.wait()
+        _, data = self._pending.popitem(last=False)
+        return data
+
+    async def data_generator(
+            self,
+            *targets: _DataType,
+    ) -> AsyncGenerator[_DataType, Any]:
+        """
+        数据异步生成器，同类数据只会获取到最新的
+
+        :param targets: 目标类型，只有为目标类型的数据会被返回，为空即默认值时则不进行限制
+        :return: 与 [`DGLabClient.data_generator`][pydglab_ws.client.base.DGLabClient.data_generator] 相同
+        """
+        while True:
+            data = await self.recv_data()
+            if not targets or type(data) in targets:
+                yield data
@@ -0,0 +1,384 @@
+"""
+役次元多设备管理
+
+使用一个持续运行的扫描器发现设备，并行连接多台设备，每台设备使用独立的写入队列
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Optional, Dict, List, Callable, Iterable, Coroutine, Any, Set
+from uuid import UUID
+
+from bleak import BleakScanner
+
+from .ble import YCYBLEClient
+from ..ble.models import YCYDevice
+from ..ble.scanner import SERVICE_UUID
+from ..enums import Channel, StrengthOperationType
+from ..models import StrengthData
+from ..typing import PulseOperation
+
+__all__ = ("YCYDeviceManager", "YCYManagedClient", "YCYManagedClientStats")
+
+logger = logging.getLogger(__name__)
+
+ScannerFactory = Callable[[Callable[[Any, Any], None]], Any]
+"""扫描器工厂，参数为检测回调 ``callback(device, advertisement_data)``，返回具有 ``start()`` 与 ``stop()`` 的扫描器"""
+ClientFactory = Callable[[YCYDevice], YCYBLEClient]
+"""客户端工厂，参数为发现的设备"""
+
+
+def _default_scanner_factory(callback: Callable[[Any, Any], None]) -> BleakScanner:
+    return BleakScanner(detection_callback=callback, service_uuids=[SERVICE_UUID])
+
+
+@dataclass
+class YCYManagedClientStats:
+    """
+    设备写入队列的统计数据
+
+    :ivar queued: 队列中等待执行的命令数
+    :ivar completed: 已执行完毕的命令数
+    :ivar failed: 执行失败 (返回 ``False`` 或抛出异常) 的命令数
+    :ivar rejected: 队列已满而被拒绝的命令数
+    """
+    queued: int = 0
+    completed: int = 0
+    failed: int = 0
+    rejected: int = 0
+
+
+class YCYManagedClient:
+    """
+    由 [`YCYDeviceManager`][pydglab_ws.client.manager.YCYDeviceManager] 管理的设备
+
+    提供与 DG-Lab 终端相同的控制接口，命令进入该设备独立的写入队列按顺序执行，
+    某台设备写入较慢时不会影响其他设备
+
+    :param client: 役次元 BLE 客户端
+    :param queue_size: 写入队列的最大长度，队列已满时拒绝新的命令
+    """
+
+    def __init__(self, client: YCYBLEClient, queue_size: int = 64):
+        self._client = client
+        self._queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self._worker: Optional[asyncio.Task] = None
+        self._stats = YCYManagedClientStats()
+
+    @property
+    def client(self) -> YCYBLEClient:
+        """役次元 BLE 客户端，可用于役次元扩展接口，但不经过写入队列"""
+        return self._client
+
+    @property
+    def client_id(self) -> UUID:
+        return self._client.client_id
+
+    @property
+    def target_id(self) -> UUID:
+        return self._client.target_id
+
+    @property
+    def connected(self) -> bool:
+        return self._client.connected
+
+    @property
+    def not_registered(self) -> bool:
+        return self._client.not_registered
+
+    @property
+    def not_bind(self) -> bool:
+        return self._client.not_bind
+
+    @property
+    def strength_data(self) -> StrengthData:
+        return self._client.strength_data
+
+    @property
+    def stats(self) -> YCYManagedClientStats:
+        """写入队列的统计数据"""
+        return YCYManagedClientStats(
+            queued=self._queue.qsize(),
+            completed=self._stats.completed,
+            failed=self._stats.failed,
+            rejected=self._stats.rejected
+        )
+
+    def start(self):
+        """启动写入队列"""
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def close(self):
+        """停止写入队列，尚未执行的命令被取消"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        self._cancel_pending()
+
+    def _cancel_pending(self):
+        """取消队列中尚未执行的命令"""
+        while not self._queue.empty():
+            coro, future = self._queue.get_nowait()
+            coro.close()
+            if not future.done():
+                future.set_result(False)
+
+    async def _run(self):
+        while True:
+            coro, future = await self._queue.get()
+            if future.done():
+                coro.close()
+                continue
+            try:
+                result = await coro
+            except asyncio.CancelledError:
+                future.set_result(False)
+                raise
+            except Exception as e:
+                logger.error(f"设备 {self.client_id} 命令执行失败: {type(e).__name__}: {e}")
+                self._stats.failed += 1
+                future.set_result(False)
+            else:
+                self._stats.completed += 1
+                if result is False:
+                    self._stats.failed += 1
+                future.set_result(result)
+
+    async def _submit(self, coro: Coroutine, wait: bool) -> Any:
+        """
+        提交命令到写入队列
+
+        :param coro: 命令协程
+        :param wait: 是否等待执行结果，否则提交后立即返回 ``True``
+        :return: 执行结果，队列已满时为 ``False``
+        """
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((coro, future))
+        except asyncio.QueueFull:
+            coro.close()
+            self._stats.rejected += 1
+            logger.warning(f"设备 {self.client_id} 写入队列已满，命令被拒绝")
+            return False
+        if wait:
+            return await asyncio.shield(future)
+        return True
+
+    async def set_strength(
+            self,
+            channel: Channel,
+            operation_type: StrengthOperationType,
+            value: int,
+            wait: bool = False
+    ) -> bool:
+        """
+        设置强度
+
+        :param wait: 是否等待命令执行完毕并返回其结果
+        """
+        return await self._submit(self._client.set_strength(channel, operation_type, value), wait)
+
+    async def add_pulses(self, channel: Channel, *pulses: PulseOperation, wait: bool = False) -> bool:
+        """
+        添加波形
+
+        :param wait: 是否等待命令执行完毕并返回其结果
+        """
+        return await self._submit(self._client.add_pulses(channel, *pulses), wait)
+
+    async def clear_pulses(self, channel: Channel, wait: bool = False) -> bool:
+        """
+        清空波形
+
+        :param wait: 是否等待命令执行完毕并返回其结果
+        """
+        return await self._submit(self._client.clear_pulses(channel), wait)
+
+    async def set_pulse_preset(self, channel: Channel, preset_index: int, wait: bool = False) -> bool:
+        """
+        设置通道波形预设
+
+        :param wait: 是否等待命令执行完毕并返回其结果
+        """
+        return await self._submit(self._client.set_pulse_preset(channel, preset_index), wait)
+
+    async def stop_all(self) -> bool:
+        """停止所有输出，队列中尚未执行的命令被取消，并等待停止命令执行完毕"""
+        self._cancel_pending()
+        return await self._submit(self._client.stop_all(), wait=True)
+
+
+class YCYDeviceManager:
+    """
+    役次元多设备管理器
+
+    使用一个持续运行的扫描器发现设备，并行连接多台设备，按 ``client_id`` 提供与 DG-Lab 终端相同的控制接口
+
+    示例：
+    ```python3
+    async with YCYDeviceManager() as manager:
+        clients = await manager.connect(count=2, timeout=10)
+        for client in clients:
+            await client.set_strength(Channel.A, StrengthOperationType.SET_TO, 20)
+    ```
+
+    :param addresses: 只连接这些地址的设备，为 ``None`` 时连接任意发现的役次元设备
+    :param strength_limit: 虚拟强度上限
+    :param queue_size: 每台设备写入队列的最大长度
+    :param scanner_factory: 扫描器工厂，默认使用 ``BleakScanner``
+    :param client_factory: 客户端工厂，默认使用 ``YCYBLEClient``
+    """
+
+    def __init__(
+            self,
+            addresses: Optional[Iterable[str]] = None,
+            strength_limit: int = 200,
+            queue_size: int = 64,
+            scanner_factory: Optional[ScannerFactory] = None,
+            client_factory: Optional[ClientFactory] = None
+    ):
+        self._addresses: Optional[Set[str]] = None if addresses is None else {a.lower() for a in addresses}
+        self._queue_size = queue_size
+        self._scanner_factory = scanner_factory or _default_scanner_factory
+        self._client_factory = client_factory or (lambda device: YCYBLEClient(device, strength_limit=strength_limit))
+        self._scanner = None
+        self._discovered: Dict[str, YCYDevice] = {}
+        """按地址 (小写) 记录的已发现设备"""
+        self._discovered_event = asyncio.Event()
+        self._connecting: Set[str] = set()
+        self._clients: Dict[UUID, YCYManagedClient] = {}
+        self._client_addresses: Dict[UUID, str] = {}
+
+    async def __aenter__(self) -> "YCYDeviceManager":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    @property
+    def scanning(self) -> bool:
+        """扫描器是否正在运行"""
+        return self._scanner is not None
+
+    @property
+    def discovered(self) -> List[YCYDevice]:
+        """已发现的设备"""
+        return list(self._discovered.values())
+
+    @property
+    def clients(self) -> Dict[UUID, YCYManagedClient]:
+        """已连接的设备，键为 ``client_id``"""
+        return dict(self._clients)
+
+    def get_client(self, client_id: UUID) -> Optional[YCYManagedClient]:
+        """
+        获取已连接的设备
+
+        :param client_id: 设备的 ``client_id``
+        :return: 设备，不存在时为 ``None``
+        """
+        return self._clients.get(client_id)
+
+    async def start(self):
+        """启动扫描器，之后持续发现设备"""
+        if self._scanner is None:
+            scanner = self._scanner_factory(self._on_detection)
+            await scanner.start()
+            self._scanner = scanner
+
+    async def stop_scan(self):
+        """停止扫描器"""
+        if self._scanner is not None:
+            scanner, self._scanner = self._scanner, None
+            await scanner.stop()
+
+    async def close(self):
+        """停止扫描器并断开所有设备"""
+        await self.stop_scan()
+        await asyncio.gather(*(self.disconnect(client_id) for client_id in list(self._clients)))
+
+    def _on_detection(self, device, advertisement_data):
+        """扫描器的检测回调"""
+        service_uuids = [uuid.lower() for uuid in (getattr(advertisement_data, "service_uuids", None) or [])]
+        if SERVICE_UUID not in service_uuids:
+            return
+        address = device.address.lower()
+        if self._addresses is not None and address not in self._addresses:
+            return
+        if address not in self._discovered:
+            logger.info(f"发现役次元设备: {device.name} ({device.address})")
+        self._discovered[address] = YCYDevice(
+            address=device.address,
+            name=device.name,
+            rssi=getattr(advertisement_data, "rssi", None)
+        )
+        self._discovered_event.set()
+
+    def _available(self) -> List[YCYDevice]:
+        """已发现但尚未连接且不在连接中的设备"""
+        unavailable = self._connecting.union(self._client_addresses.values())
+        return [device for address, device in self._discovered.items() if address not in unavailable]
+
+    async def connect(self, count: Optional[int] = None, timeout: float = 10.0) -> List[YCYManagedClient]:
+        """
+        等待发现设备并并行连接
+
+        :param count: 要连接的设备数，为 ``None`` 时连接 ``addresses`` 中的全部设备，
+            未指定 ``addresses`` 时连接超时前发现的全部设备
+        :param timeout: 等待发现设备的超时时间 (秒)
+        :return: 本次连接成功的设备
+        """
+        if self._scanner is None:
+            await self.start()
+        if count is None and self._addresses is not None:
+            count = len(self._addresses)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while count is None or len(self._available()) < count:
+            self._discovered_event.clear()
+            try:
+                await asyncio.wait_for(self._discovered_event.wait(), max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                break
+
+        devices = self._available()[:count]
+        results = await asyncio.gather(*(self._connect_device(device) for device in devices))
+        return [managed for managed in results if managed is not None]
+
+    async def _connect_device(self, device: YCYDevice) -> Optional[YCYManagedClient]:
+        address = device.address.lower()
+        self._connecting.add(address)
+        try:
+            client = self._client_factory(device)
+            if not await client.connect():
+                logger.error(f"设备连接失败: {device}")
+                return None
+            managed = YCYManagedClient(client, self._queue_size)
+            managed.start()
+            self._clients[client.client_id] = managed
+            self._client_addresses[client.client_id] = address
+            return managed
+        except Exception as e:
+            logger.error(f"设备连接失败: {device}: {type(e).__name__}: {e}")
+            return None
+        finally:
+            self._connecting.discard(address)
+
+    async def disconnect(self, client_id: UUID):
+        """
+        断开设备
+
+        :param client_id: 设备的 ``client_id``
+        """
+        if (managed := self._clients.pop(client_id, None)) is None:
+            return
+        self._client_addresses.pop(client_id, None)
+        await managed.close()
+        await managed.client.disconnect()
@@ -0,0 +1,253 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Optional, Union, AsyncIterable, Iterable, AsyncIterator, List
+
+from .base import DGLabClient
+from ..enums import Channel
+from ..typing import PulseOperation
+from ..utils import PULSE_DATA_MAX_LENGTH
+
+__all__ = ["PulseStream", "PulseStreamStats", "PULSE_OPERATION_DURATION", "APP_PULSE_QUEUE_MAX_LENGTH"]
+
+PULSE_OPERATION_DURATION = 0.1
+"""每条波形操作数据的播放时长（秒）"""
+APP_PULSE_QUEUE_MAX_LENGTH = 500
+"""App 中波形队列的最大长度，超出部分会被 App 丢弃"""
+
+PulseSource = Union[AsyncIterable[PulseOperation], Iterable[PulseOperation]]
+
+
+@dataclass
+class PulseStreamStats:
+    """
+    波形流的统计数据
+
+    :ivar sent: 已发送的波形操作数据条数
+    :ivar batches: 已发送的消息数
+    :ivar underruns: App 波形队列被播放完而出现间断的次数（估算）
+    :ivar overruns: 超出 App 波形队列长度而被丢弃的波形操作数据条数（估算）
+    :ivar estimated_depth: 当前估算的 App 波形队列长度
+    """
+    sent: int
+    batches: int
+    underruns: int
+    overruns: int
+    estimated_depth: int
+
+
+async def _as_async_iterator(source: PulseSource) -> AsyncIterator[PulseOperation]:
+    if isinstance(source, AsyncIterable):
+        async for pulse in source:
+            yield pulse
+    else:
+        for pulse in source:
+            yield pulse
+
+
+class PulseStream:
+    """
+    波形流，持续从数据源读取波形操作数据，按 App 波形队列的估算长度分批下发，
+    使 App 的波形队列既不会播放完出现间断，也不会超出长度而丢弃数据
+
+    App 不会报告波形队列的长度，这里按每条波形操作数据播放 100ms 由发送时间进行估算，
+    因此在波形流运行期间，不应再对同一通道调用 ``add_pulses``
+
+    示例：
+    ```python3
+    async def pulses():
+        while True:
+            yield (10, 10, 10, 10), (0, 50, 100, 50)
+
+    async with PulseStream(client, Channel.A, pulses()) as stream:
+        await asyncio.sleep(60)
+    print(stream.stats)
+    ```
+
+    :param client: 已绑定 App 的 DG-Lab 终端
+    :param channel: 通道选择
+    :param source: 波形操作数据源，可以是异步迭代器、异步生成器或普通的可迭代对象
+    :param buffer_time: App 波形队列中保持的目标播放时长（秒），不超过 App 波形队列的最大长度
+    :param refill_interval: 检查并补充 App 波形队列的间隔（秒），需要小于 ``buffer_time``
+    :param batch_size: 每条消息中波形操作数据的最大条数，不超过
+        [`PULSE_DATA_MAX_LENGTH`][pydglab_ws.utils.PULSE_DATA_MAX_LENGTH]
+    :raise ValueError: 参数取值不合法
+    """
+
+    def __init__(
+            self,
+            client: DGLabClient,
+            channel: Channel,
+            source: Optional[PulseSource] = None,
+            buffer_time: float = 3.0,
+            refill_interval: float = 1.0,
+            batch_size: int = PULSE_DATA_MAX_LENGTH
+    ):
+        if not 0 < refill_interval < buffer_time:
+            raise ValueError("refill_interval should be positive and less than buffer_time")
+        if not 0 < batch_size <= PULSE_DATA_MAX_LENGTH:
+            raise ValueError(f"batch_size should be in (0, {PULSE_DATA_MAX_LENGTH}]")
+        self._client = client
+        self._channel = channel
+        self._target_depth = min(round(buffer_time / PULSE_OPERATION_DURATION), APP_PULSE_QUEUE_MAX_LENGTH)
+        self._refill_interval = refill_interval
+        self._batch_size = batch_size
+        self._source: Optional[AsyncIterator[PulseOperation]] = None
+        self._pending: List[PulseOperation] = []
+        """已从数据源读取但尚未发送的数据"""
+        self._queued_until: Optional[float] = None
+        """估算的 App 波形队列播放完的时间，尚未发送过时为 ``None``"""
+        self._next_pulse: Optional[asyncio.Future] = None
+        """正在从数据源读取的下一条数据"""
+        self._task: Optional[asyncio.Task] = None
+        self._sent = 0
+        self._batches = 0
+        self._underruns = 0
+        self._overruns = 0
+        if source is not None:
+            self._source = _as_async_iterator(source)
+
+    async def __aenter__(self) -> "PulseStream":
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    @property
+    def channel(self) -> Channel:
+        """通道"""
+        return self._channel
+
+    @property
+    def running(self) -> bool:
+        """是否正在读取数据源并下发"""
+        return self._task is not None and not self._task.done()
+
+    @property
+    def estimated_depth(self) -> int:
+        """当前估算的 App 波形队列长度"""
+        if self._queued_until is None:
+            return 0
+        remaining = self._queued_until - asyncio.get_running_loop().time()
+        return max(0, round(remaining / PULSE_OPERATION_DURATION))
+
+    @property
+    def stats(self) -> PulseStreamStats:
+        """波形流的统计数据"""
+        return PulseStreamStats(
+            sent=self._sent,
+            batches=self._batches,
+            underruns=self._underruns,
+            overruns=self._overruns,
+            estimated_depth=self.estimated_depth
+        )
+
+    def start(self):
+        """开始下发数据源中的波形"""
+        if not self.running and self._source is not None:
+            self._task = asyncio.create_task(self._feeder())
+
+    async def wait(self):
+        """等待数据源中的波形全部下发，不包括 App 播放完毕"""
+        if self._task is not None:
+            await self._task
+
+    async def stop(self, clear: bool = True):
+        """
+        停止下发，之后可以调用 ``start()`` 从数据源中断处继续下发
+
+        正在从数据源读取的数据不会被取消，以免异步生成器被关闭，
+        该数据与已读取但尚未发送的数据在继续下发时依次发送
+
+        :param clear: 是否同时清空 App 的波形队列
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if clear:
+            await self._client.clear_pulses(self._channel)
+            self._queued_until = None
+
+    async def replace(self, source: PulseSource):
+        """
+        清空 App 的波形队列，立即改为下发新的数据源
+
+        :param source: 新的波形操作数据源
+        """
+        await self.stop(clear=True)
+        if self._next_pulse is not None:
+            self._next_pulse.cancel()
+            self._next_pulse = None
+        self._pending.clear()
+        self._source = _as_async_iterator(source)
+        self.start()
+
+    def _account(self, count: int):
+        """按发送的数据条数更新估算的 App 波形队列长度"""
+        now = asyncio.get_running_loop().time()
+        if self._queued_until is None or self._queued_until < now:
+            self._queued_until = now
+        if (overflow := self.estimated_depth + count - APP_PULSE_QUEUE_MAX_LENGTH) > 0:
+            self._overruns += overflow
+            count -= overflow
+        self._queued_until += count * PULSE_OPERATION_DURATION
+        self._sent += count
+        self._batches += 1
+
+    async def _fill(self, count: int, deadline: float) -> bool:
+        """
+        从数据源读取数据直至待发送数据达到指定条数，或到达截止时间
+
+        数据源产生数据较慢时，到达截止时间后先发送已读取的部分，正在读取的数据留待下次
+
+        :param count: 目标条数
+        :param deadline: 截止时间（事件循环时间）
+        :return: 数据源是否仍有数据
+        """
+        loop = asyncio.get_running_loop()
+        while len(self._pending) < count:
+            if self._next_pulse is None:
+                self._next_pulse = asyncio.ensure_future(self._source.__anext__())
+            done, _ = await asyncio.wait((self._next_pulse,), timeout=max(0.0, deadline - loop.time()))
+            if not done:
+                return True
+            next_pulse, self._next_pulse = self._next_pulse, None
+            try:
+                self._pending.append(next_pulse.result())
+            except StopAsyncIteration:
+                return False
+        return True
+
+    async def _feeder(self):
+        loop = asyncio.get_running_loop()
+        has_more = True
+        while has_more or self._pending:
+            # 已发送过数据且 App 的波形队列已经播放完，说明出现了间断
+            if self._queued_until is not None and self._queued_until < loop.time():
+                self._underruns += 1
+                self._queued_until = None
+
+            deadline = loop.time() + self._refill_interval
+            need = self._target_depth - self.estimated_depth
+            while need > 0:
+                batch_size = min(need, self._batch_size)
+                if has_more:
+                    has_more = await self._fill(batch_size, deadline)
+                batch = self._pending[:batch_size]
+                if not batch:
+                    break
+                # 尚未绑定时保留数据，下次再发送
+                if not await self._client.add_pulses(self._channel, *batch):
+                    break
+                del self._pending[:len(batch)]
+                self._account(len(batch))
+                need -= len(batch)
+                if len(batch) < batch_size:
+                    break
+
+            if has_more or self._pending:
+                await asyncio.sleep(max(0.0, deadline - loop.time()))
@@ -0,0 +1,262 @@
+"""
+役次元设备的角度 (IMU) 与计步数据流
+"""
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional, Tuple, Deque, AsyncIterator, TYPE_CHECKING
+
+from ..ble.enums import YCYQueryType
+from ..ble.exceptions import ChecksumError
+from ..ble.protocol import YCYBLEProtocol
+
+if TYPE_CHECKING:
+    from .ble import YCYBLEClient
+
+__all__ = ("TelemetryStream", "TelemetrySample", "TelemetryStats", "TelemetryWindow")
+
+_STEP_ON = 0x01
+_STEP_OFF = 0x00
+
+
+@dataclass(frozen=True)
+class TelemetrySample:
+    """
+    带时间的上报数据
+
+    :ivar timestamp: 接收时间 (``time.monotonic()``)
+    :ivar values: 角度数据为 (acc_x, acc_y, acc_z, gyro_x, gyro_y, gyro_z)，计步数据为 (step_count,)
+    """
+    timestamp: float
+    values: Tuple[int, ...]
+
+
+@dataclass
+class TelemetryStats:
+    """
+    数据流的统计数据
+
+    :ivar received: 已接收的数据条数
+    :ivar dropped: 缓冲区已满而被丢弃的未取走的数据条数
+    :ivar checksum_errors: 校验和错误而被丢弃的通知数
+    :ivar buffered: 缓冲区中尚未取走的数据条数
+    """
+    received: int = 0
+    dropped: int = 0
+    checksum_errors: int = 0
+    buffered: int = 0
+
+
+@dataclass
+class TelemetryWindow:
+    """
+    一段时间内数据的聚合结果
+
+    :ivar count: 数据条数
+    :ivar mean: 各分量的平均值
+    :ivar peak: 各分量的最大值
+    :ivar start: 第一条数据的接收时间
+    :ivar end: 最后一条数据的接收时间
+    """
+    count: int
+    mean: Tuple[float, ...]
+    peak: Tuple[int, ...]
+    start: float
+    end: float
+
+
+class TelemetryStream:
+    """
+    角度 (IMU) 或计步数据流
+
+    开始后开启设备的上报，收到的数据带上接收时间放入有界的环形缓冲区，
+    处理速度跟不上上报速度时丢弃最早的未取走的数据并计数。
+    另外保留最近收到的数据用于按时间窗口聚合，无论是否已被取走。
+
+    通常通过 [`YCYBLEClient.angle_stream`][pydglab_ws.client.ble.YCYBLEClient.angle_stream] 或
+    [`YCYBLEClient.step_stream`][pydglab_ws.client.ble.YCYBLEClient.step_stream] 创建
+
+    示例：
+    ```python3
+    async with client.angle_stream() as stream:
+        async for sample in stream:
+            window = stream.aggregate(0.2)
+            print(sample.values, window.peak)
+    ```
+
+    :param client: 役次元 BLE 客户端
+    :param kind: 数据类型，``YCYQueryType.ANGLE_DATA`` 或 ``YCYQueryType.STEP_COUNT``
+    :param buffer_size: 未取走的数据的缓冲区大小
+    :param history_size: 用于聚合的最近数据的保留条数
+    :raise ValueError: 参数取值不合法
+    """
+
+    def __init__(
+            self,
+            client: "YCYBLEClient",
+            kind: YCYQueryType = YCYQueryType.ANGLE_DATA,
+            buffer_size: int = 2 ** 10,
+            history_size: int = 2 ** 10
+    ):
+        if kind not in (YCYQueryType.ANGLE_DATA, YCYQueryType.STEP_COUNT):
+            raise ValueError("kind should be ANGLE_DATA or STEP_COUNT")
+        if buffer_size <= 0 or history_size <= 0:
+            raise ValueError("buffer_size and history_size should be positive")
+        self._client = client
+        self._kind = kind
+        self._buffer: Deque[TelemetrySample] = deque(maxlen=buffer_size)
+        self._history: Deque[TelemetrySample] = deque(maxlen=history_size)
+        self._updated = asyncio.Event()
+        self._running = False
+        self._stats = TelemetryStats()
+
+    async def __aenter__(self) -> "TelemetryStream":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def __aiter__(self) -> AsyncIterator[TelemetrySample]:
+        return self
+
+    async def __anext__(self) -> TelemetrySample:
+        sample = await self.recv()
+        if sample is None:
+            raise StopAsyncIteration
+        return sample
+
+    @property
+    def kind(self) -> YCYQueryType:
+        """数据类型"""
+        return self._kind
+
+    @property
+    def running(self) -> bool:
+        """是否正在接收数据"""
+        return self._running
+
+    @property
+    def stats(self) -> TelemetryStats:
+        """统计数据"""
+        return TelemetryStats(
+            received=self._stats.received,
+            dropped=self._stats.dropped,
+            checksum_errors=self._stats.checksum_errors,
+            buffered=len(self._buffer)
+        )
+
+    async def start(self) -> bool:
+        """
+        开启设备的上报并开始接收
+
+        :return: 开启上报的命令是否发送成功
+        """
+        if self._running:
+            return True
+        self._running = True
+        self._client._add_telemetry_listener(self._kind, self._on_notification)
+        if not await self._client._send_command(self._control_command(True)):
+            self._client._remove_telemetry_listener(self._kind, self._on_notification)
+            self._running = False
+            return False
+        return True
+
+    async def close(self):
+        """停止接收并关闭设备的上报 (没有同类型的其他数据流时)，缓冲区中尚未取走的数据仍然可以获取"""
+        if not self._running:
+            return
+        self._running = False
+        self._client._remove_telemetry_listener(self._kind, self._on_notification)
+        self._updated.set()
+        # 同类型的其他数据流仍在接收时保持设备的上报
+        if self._client.connected and not self._client._telemetry_listeners.get(self._kind):
+            await self._client._send_command(self._control_command(False))
+
+    def _control_command(self, enabled: bool) -> bytes:
+        if self._kind == YCYQueryType.ANGLE_DATA:
+            return YCYBLEProtocol.build_angle_control(enabled)
+        return YCYBLEProtocol.build_step_control(_STEP_ON if enabled else _STEP_OFF)
+
+    def _on_notification(self, data: bytes):
+        """处理上报的通知，由客户端在收到对应类型的通知时调用"""
+        timestamp = time.monotonic()
+        if self._kind == YCYQueryType.ANGLE_DATA:
+            values = YCYBLEProtocol.parse_angle_data(data)
+        else:
+            try:
+                response = YCYBLEProtocol.parse_response(data)
+            except (ChecksumError, ValueError, IndexError):
+                response = None
+            values = None if response is None or response.step_count is None else (response.step_count,)
+        if values is None:
+            self._stats.checksum_errors += 1
+            return
+
+        sample = TelemetrySample(timestamp, values)
+        self._stats.received += 1
+        if len(self._buffer) == self._buffer.maxlen:
+            self._stats.dropped += 1
+        self._buffer.append(sample)
+        self._history.append(sample)
+        self._updated.set()
+
+    def recv_nowait(self) -> Optional[TelemetrySample]:
+        """
+        取走最早一条未取走的数据
+
+        :return: 数据，缓冲区为空时为 ``None``
+        """
+        return self._buffer.popleft() if self._buffer else None
+
+    async def recv(self, timeout: Optional[float] = None) -> Optional[TelemetrySample]:
+        """
+        等待并取走最早一条未取走的数据
+
+        :param timeout: 超时时间 (秒)，为 ``None`` 时一直等待
+        :return: 数据，超时或数据流已关闭且缓冲区为空时为 ``None``
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while not self._buffer:
+            if not self._running:
+                return None
+            self._updated.clear()
+            try:
+                await asyncio.wait_for(
+                    self._updated.wait(),
+                    None if deadline is None else max(0.0, deadline - loop.time())
+                )
+            except asyncio.TimeoutError:
+                return None
+        return self._buffer.popleft()
+
+    def aggregate(self, window: float, now: Optional[float] = None) -> Optional[TelemetryWindow]:
+        """
+        聚合最近一段时间内收到的数据，无论是否已被取走
+
+        :param window: 时间窗口 (秒)
+        :param now: 窗口结束时间 (``time.monotonic()``)，默认为当前时间
+        :return: 聚合结果，窗口内没有数据时为 ``None``
+        """
+        if now is None:
+            now = time.monotonic()
+        start = now - window
+        samples = []
+        for sample in reversed(self._history):
+            if sample.timestamp < start:
+                break
+            if sample.timestamp <= now:
+                samples.append(sample)
+        if not samples:
+            return None
+        columns = list(zip(*(sample.values for sample in samples)))
+        count = len(samples)
+        return TelemetryWindow(
+            count=count,
+            mean=tuple(sum(column) / count for column in columns),
+            peak=tuple(max(column) for column in columns),
+            start=samples[-1].timestamp,
+            end=samples[0].timestamp
+        )
@@ -6,6 +6,7 @@ from typing import Optional
 from websockets import WebSocketClientProtocol
 
 from .base import DGLabClient
+from ..codec import encode_message, decode_message
 from ..models import WebSocketMessage
 
 __all__ = ["DGLabWSClient"]
@@ -37,10 +38,10 @@ class DGLabWSClient(DGLabClient):
 
     async def _recv(self) -> WebSocketMessage:
         raw_message = await self._websocket.recv()
-        return WebSocketMessage.model_validate_json(raw_message)
+        return decode_message(raw_message)
 
     async def _send(self, message: WebSocketMessage):
-        await self._websocket.send(message.model_dump_json(by_alias=True, context={"separators": (",", ":")}))
+        await self._websocket.send(encode_message(message))
 
     def get_qrcode(self, uri: str = None) -> Optional[str]:
         if uri is None and (remote_address := self._websocket.remote_address):
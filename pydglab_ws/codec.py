@@ -0,0 +1,188 @@
+"""
+此处提供 WebSocket 消息的编解码函数
+
+专门针对四个字段的消息格式，结果与 [`WebSocketMessage`][pydglab_ws.models.WebSocketMessage]
+的 Pydantic 序列化完全一致，只有在遇到不规范的消息时才回退到 Pydantic
+"""
+import json
+import re
+from typing import Dict, Optional, Union, Any
+from uuid import UUID
+
+from .enums import MessageType, RetCode, MessageDataHead
+from .models import WebSocketMessage
+
+__all__ = ("encode_message", "decode_message")
+
+_MESSAGE_TYPE_LOOKUP: Dict[str, MessageType] = {member.value: member for member in MessageType}
+"""``type`` 字段值到 ``MessageType`` 的查找表"""
+_RET_CODE_LOOKUP: Dict[str, RetCode] = {str(member.value): member for member in RetCode}
+"""``message`` 字段值到 ``RetCode`` 的查找表"""
+_DATA_HEAD_LOOKUP: Dict[str, MessageDataHead] = {member.value: member for member in MessageDataHead}
+"""``message`` 字段值到 ``MessageDataHead`` 的查找表"""
+_WIRE_KEYS = frozenset(("type", "clientId", "targetId", "message"))
+"""消息中允许出现的键"""
+_NEEDS_ESCAPE = re.compile(r'["\\\x00-\x1f]')
+"""需要进行 JSON 转义的字符"""
+_UUID_STRING_LENGTH = 36
+
+_new_message = WebSocketMessage.__new__
+_object_setattr = object.__setattr__
+
+
+class _UUIDInterner:
+    """
+    UUID 与其字符串形式的双向缓存，连接数有限，同一个 UUID 会被反复编解码
+
+    :param max_size: 缓存最大数量，超出后清空重新缓存
+    """
+
+    def __init__(self, max_size: int = 2 ** 14):
+        self._max_size = max_size
+        self._str_to_uuid: Dict[str, UUID] = {}
+        self._uuid_to_str: Dict[UUID, str] = {}
+
+    def _remember(self, value: UUID, text: str):
+        if len(self._uuid_to_str) >= self._max_size:
+            self._str_to_uuid.clear()
+            self._uuid_to_str.clear()
+        self._str_to_uuid[text] = value
+        self._uuid_to_str[value] = text
+
+    def to_uuid(self, text: str) -> Optional[UUID]:
+        """
+        解析标准格式（小写、带连字符）的 UUID4 字符串
+
+        :return: 非标准格式或非 UUID4 时返回 ``None``，交由 Pydantic 处理
+        """
+        if (value := self._str_to_uuid.get(text)) is not None:
+            return value
+        if len(text) != _UUID_STRING_LENGTH:
+            return None
+        try:
+            value = UUID(text)
+        except ValueError:
+            return None
+        if value.version != 4 or str(value) != text:
+            return None
+        self._remember(value, text)
+        return value
+
+    def to_str(self, value: UUID) -> str:
+        """获取 UUID 的字符串形式"""
+        if (text := self._uuid_to_str.get(value)) is None:
+            text = str(value)
+            self._remember(value, text)
+        return text
+
+
+_interner = _UUIDInterner()
+_uuid_to_str = _interner.to_str
+
+
+def _parse_message_value(value: str) -> Union[str, RetCode, MessageDataHead]:
+    """与 ``WebSocketMessage._validate_message`` 相同的 ``message`` 解析规则"""
+    if (ret_code := _RET_CODE_LOOKUP.get(value)) is not None:
+        return ret_code
+    if (data_head := _DATA_HEAD_LOOKUP.get(value)) is not None:
+        return data_head
+    # 只有形如整数的字符串才可能被 int() 解析为其他写法的错误码，例如 " 200"
+    stripped = value.strip()
+    if stripped[-1:].isdigit() and (stripped[:1].isdigit() or stripped[:1] in "+-"):
+        try:
+            return RetCode(int(stripped))
+        except ValueError:
+            pass
+    return value
+
+
+def _decode_id(value: Any) -> Union[UUID, None, bool]:
+    """解析 ID 字段，无法快速解析时返回 ``False``"""
+    if value is None or value == "":
+        return None
+    if type(value) is str and (uuid := _interner.to_uuid(value)) is not None:
+        return uuid
+    return False
+
+
+def _decode_fast(raw_message: Union[str, bytes]) -> Optional[WebSocketMessage]:
+    """快速解析消息，遇到不规范的消息时返回 ``None``"""
+    try:
+        data = json.loads(raw_message)
+    except ValueError:
+        return None
+    if type(data) is not dict or not data.keys() <= _WIRE_KEYS:
+        return None
+
+    msg_type = data.get("type")
+    message = data.get("message")
+    if type(msg_type) is not str or type(message) is not str:
+        return None
+    if (msg_type := _MESSAGE_TYPE_LOOKUP.get(msg_type)) is None:
+        return None
+
+    fields_set = {"type", "message"}
+    ids = []
+    for key, field in ("clientId", "client_id"), ("targetId", "target_id"):
+        if key in data:
+            if (value := _decode_id(data[key])) is False:
+                return None
+            fields_set.add(field)
+        else:
+            value = None
+        ids.append(value)
+
+    # 与 WebSocketMessage.model_construct 相同，但省去了逐个字段查找别名与默认值的开销
+    model = _new_message(WebSocketMessage)
+    _object_setattr(model, "__dict__", {
+        "type": msg_type,
+        "client_id": ids[0],
+        "target_id": ids[1],
+        "message": _parse_message_value(message)
+    })
+    _object_setattr(model, "__pydantic_fields_set__", fields_set)
+    _object_setattr(model, "__pydantic_extra__", None)
+    _object_setattr(model, "__pydantic_private__", None)
+    return model
+
+
+def decode_message(raw_message: Union[str, bytes]) -> WebSocketMessage:
+    """
+    解析 WebSocket 消息，结果与 ``WebSocketMessage.model_validate_json`` 一致
+
+    :param raw_message: 原始 WebSocket 消息
+    :return: 解析后的消息
+    :raise pydantic.ValidationError: 消息不合法（``ValueError`` 的子类）
+    """
+    message = _decode_fast(raw_message)
+    if message is None:
+        return WebSocketMessage.model_validate_json(raw_message)
+    return message
+
+
+def encode_message(message: WebSocketMessage) -> str:
+    """
+    序列化 WebSocket 消息，结果与 ``WebSocketMessage.model_dump_json(by_alias=True)`` 一致
+
+    :param message: 要序列化的消息
+    :return: JSON 字符串
+    """
+    msg_type = message.type
+    value = message.message
+    if type(msg_type) is not MessageType:
+        return message.model_dump_json(by_alias=True, context={"separators": (",", ":")})
+    if type(value) is RetCode:
+        text = str(value.value)
+    elif type(value) is MessageDataHead:
+        text = value.value
+    elif type(value) is str:
+        text = value
+    else:
+        return message.model_dump_json(by_alias=True, context={"separators": (",", ":")})
+    quoted = json.dumps(text, ensure_ascii=False) if _NEEDS_ESCAPE.search(text) else f'"{text}"'
+    client_id = message.client_id
+    target_id = message.target_id
+    return (f'{{"type":"{msg_type.value}",'
+            f'"clientId":"{_uuid_to_str(client_id) if client_id is not None else ""}",'
+            f'"targetId":"{_uuid_to_str(target_id) if target_id is not None else ""}",'
+            f'"message":{quoted}}}')
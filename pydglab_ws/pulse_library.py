@@ -0,0 +1,232 @@
+"""
+此处提供二进制波形库的读写
+
+波形库文件将多条波形的操作数据保存为连续的 uint8 数据，读取时内存映射文件，
+每条波形以零复制的 ``memoryview`` 切片给出，可直接用于 [`dump_add_pulses_chunked`][pydglab_ws.utils.dump_add_pulses_chunked]、
+[`PulseStream`][pydglab_ws.client.stream.PulseStream] 与役次元的 ``convert_pulse``，无需解析 JSON 与创建大量元组。
+
+文件格式 (小端序):
+
+| 部分 | 内容 |
+|------|------|
+| 文件头 (16 字节) | 魔数 ``DGPL``、版本 (uint16)、保留 (uint16)、波形数 (uint32)、名称表长度 (uint32) |
+| 索引 (每条 16 字节) | 名称偏移、名称长度、第一条波形操作的序号、波形操作条数 (均为 uint32) |
+| 名称表 | UTF-8 编码的波形名称，末尾补零至 8 字节对齐 |
+| 数据 | 每条波形操作 8 字节：4 个频率与 4 个强度 |
+
+也可以在命令行中将 ``scripts/pulse_data_db.py`` 生成的 ``customPulseData.json`` 转换为波形库::
+
+    python -m pydglab_ws.pulse_library customPulseData.json pulses.dgpl
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterator, List, Mapping, Iterable, Optional, Tuple, Union, Any, Sequence
+
+from .typing import PulseOperation
+from .utils import _pulses_to_bytes
+
+__all__ = ("PulseLibrary", "write_pulse_library")
+
+PULSE_LIBRARY_MAGIC = b"DGPL"
+PULSE_LIBRARY_VERSION = 1
+
+_HEADER = struct.Struct("<4sHHII")
+_INDEX_ENTRY = struct.Struct("<IIII")
+_OPERATION_SIZE = 8
+
+
+def _align(size: int) -> int:
+    return (size + 7) & ~7
+
+
+def write_pulse_library(
+        path: Union[str, os.PathLike],
+        pulses: Mapping[str, Union[Iterable[PulseOperation], Iterable[Sequence[int]], bytes, memoryview]]
+):
+    """
+    写入波形库文件，先写入临时文件再替换，中途失败不会留下不完整的文件
+
+    :param path: 文件路径
+    :param pulses: 波形名称到波形操作数据的映射，波形操作数据的格式与
+        [`dump_add_pulses_chunked`][pydglab_ws.utils.dump_add_pulses_chunked] 相同
+    :raise InvalidPulseOperation: [`InvalidPulseOperation`][pydglab_ws.exceptions.InvalidPulseOperation]
+    """
+    names = bytearray()
+    index = bytearray()
+    data: List[memoryview] = []
+    operation_count = 0
+    for name, operations in pulses.items():
+        encoded_name = name.encode("utf-8")
+        operations_bytes = _pulses_to_bytes(operations)
+        count = len(operations_bytes) // _OPERATION_SIZE
+        index += _INDEX_ENTRY.pack(len(names), len(encoded_name), operation_count, count)
+        names += encoded_name
+        data.append(operations_bytes)
+        operation_count += count
+
+    header = _HEADER.pack(PULSE_LIBRARY_MAGIC, PULSE_LIBRARY_VERSION, 0, len(data), len(names))
+    padding = bytes(_align(len(header) + len(index) + len(names)) - len(header) - len(index) - len(names))
+
+    path = Path(path)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.write(index)
+            f.write(names)
+            f.write(padding)
+            for operations_bytes in data:
+                f.write(operations_bytes)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class PulseLibrary(Mapping[str, memoryview]):
+    """
+    内存映射的二进制波形库
+
+    按名称获取的波形为每 8 字节一条的 ``memoryview``，引用文件映射的内存而不复制数据。
+    关闭波形库前需要先释放所有取得的切片，否则关闭时抛出 ``BufferError``。
+
+    示例：
+    ```python3
+    with PulseLibrary("pulses.dgpl") as library:
+        for message in dump_add_pulses_chunked(Channel.A, library["呼吸"]):
+            ...
+        await ycy_client.add_pulses(Channel.A, *library.operations("呼吸"))
+    ```
+
+    :param path: 文件路径
+    :raise ValueError: 文件格式不正确
+    """
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        self._path = Path(path)
+        with open(self._path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise ValueError(f"Empty pulse library: {self._path}")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._view = memoryview(self._mmap)
+            self._index = self._read_index()
+        except BaseException:
+            self.close()
+            raise
+
+    def _read_index(self) -> Dict[str, Tuple[int, int]]:
+        view = self._view
+        if len(view) < _HEADER.size:
+            raise ValueError(f"Truncated pulse library: {self._path}")
+        magic, version, _, count, names_size = _HEADER.unpack_from(view)
+        if magic != PULSE_LIBRARY_MAGIC:
+            raise ValueError(f"Not a pulse library: {self._path}")
+        if version != PULSE_LIBRARY_VERSION:
+            raise ValueError(f"Unsupported pulse library version {version}: {self._path}")
+
+        names_start = _HEADER.size + count * _INDEX_ENTRY.size
+        data_start = _align(names_start + names_size)
+        if len(view) < data_start:
+            raise ValueError(f"Truncated pulse library: {self._path}")
+        names = bytes(view[names_start:names_start + names_size])
+        operation_total = (len(view) - data_start) // _OPERATION_SIZE
+
+        index = {}
+        for name_offset, name_length, first, length in _INDEX_ENTRY.iter_unpack(view[_HEADER.size:names_start]):
+            if name_offset + name_length > names_size or first + length > operation_total:
+                raise ValueError(f"Corrupted pulse library index: {self._path}")
+            start = data_start + first * _OPERATION_SIZE
+            index[names[name_offset:name_offset + name_length].decode("utf-8")] = start, length
+        return index
+
+    def __enter__(self) -> "PulseLibrary":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """
+        关闭波形库
+
+        :raise BufferError: 仍有未释放的波形切片
+        """
+        if self._mmap.closed:
+            return
+        if getattr(self, "_view", None) is not None:
+            self._view.release()
+            self._view = None
+        self._mmap.close()
+
+    @property
+    def path(self) -> Path:
+        """文件路径"""
+        return self._path
+
+    def __getitem__(self, name: str) -> memoryview:
+        """
+        获取波形
+
+        :param name: 波形名称
+        :return: 每 8 字节一条的波形操作数据，零复制
+        :raise KeyError: 波形不存在
+        """
+        start, length = self._index[name]
+        return self._view[start:start + length * _OPERATION_SIZE]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, name: Any) -> bool:
+        return name in self._index
+
+    def pulse_count(self, name: str) -> int:
+        """
+        获取波形的操作条数
+
+        :param name: 波形名称
+        :raise KeyError: 波形不存在
+        """
+        return self._index[name][1]
+
+    def operations(self, name: str) -> List[Tuple[memoryview, memoryview]]:
+        """
+        以 ``PulseOperation`` 的形式获取波形，频率与强度均为零复制的切片
+
+        :param name: 波形名称
+        :return: 每条为 (频率, 强度)，各含 4 个 uint8
+        :raise KeyError: 波形不存在
+        """
+        data = self[name]
+        return [(data[i:i + 4], data[i + 4:i + 8]) for i in range(0, len(data), _OPERATION_SIZE)]
+
+
+def main(args: Optional[Sequence[str]] = None):
+    """将 ``customPulseData.json`` (波形名称到波形操作数据的映射) 转换为二进制波形库"""
+    parser = argparse.ArgumentParser(
+        prog="python -m pydglab_ws.pulse_library",
+        description="Convert customPulseData.json into a binary pulse library"
+    )
+    parser.add_argument("source", type=Path, help="JSON file mapping wave names to pulse operations")
+    parser.add_argument("output", type=Path, help="output pulse library")
+    parsed = parser.parse_args(args)
+
+    with parsed.source.open(encoding="utf-8") as f:
+        pulses = json.load(f)
+    write_pulse_library(parsed.output, pulses)
+    with PulseLibrary(parsed.output) as library:
+        total = sum(library.pulse_count(name) for name in library)
+        print(f"{parsed.output}: {len(library)} waves, {total} pulse operations")
+
+
+if __name__ == "__main__":
+    main()
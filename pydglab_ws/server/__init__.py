@@ -1,5 +1,22 @@
-from .server import *
-from .ble_compat import *
+from typing import TYPE_CHECKING
 
-# 让 DGLabWSServer 指向 BLE 版本，实现零修改兼容
-DGLabWSServer = DGLabBLEServer
+from .._lazy import attach
+
+# 各后端在首次访问时才导入，使用 WebSocket 后端时不会导入 bleak
+__getattr__, __dir__, __all__ = attach(__name__, {
+    "server": ("DGLabWSServer", "HeartbeatStats", "SendQueuePolicy", "SendQueueStats"),
+    "sharded": ("DGLabShardedWSServer",),
+    "ble_compat": ("DGLabBLEServer",),
+    "ble_multi": ("DGLabBLEMultiServer",),
+    "backends": (
+        "SERVER_BACKEND_ENV", "DEFAULT_SERVER_BACKEND", "DGLabServer", "register_server_backend",
+        "get_server_backend", "server_backends",
+    ),
+})
+
+if TYPE_CHECKING:
+    from .server import *
+    from .sharded import *
+    from .ble_compat import *
+    from .ble_multi import *
+    from .backends import *
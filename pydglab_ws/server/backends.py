@@ -0,0 +1,100 @@
+"""
+服务端后端选择
+
+按名称选择服务端的实现，只导入所选的后端：
+
+| 名称 | 实现 |
+|------|------|
+| ``ws`` | [`DGLabWSServer`][pydglab_ws.server.server.DGLabWSServer]，DG-Lab WebSocket 服务端 |
+| ``ble`` | [`DGLabBLEServer`][pydglab_ws.server.ble_compat.DGLabBLEServer]，BLE 直连单台役次元设备 |
+| ``ble-multi`` | [`DGLabBLEMultiServer`][pydglab_ws.server.ble_multi.DGLabBLEMultiServer]，BLE 直连多台役次元设备 |
+
+各后端均接受 ``DGLabWSServer`` 的 ``host``, ``port``, ``heartbeat_interval`` 参数 (BLE 后端忽略这些参数)，
+并提供 ``async with`` 与 ``new_local_client()``，同一段代码可以通过环境变量切换后端。
+未指定后端时读取环境变量 ``PYDGLAB_WS_BACKEND``，默认为 ``ble``
+"""
+import importlib
+import os
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+__all__ = (
+    "SERVER_BACKEND_ENV",
+    "DEFAULT_SERVER_BACKEND",
+    "DGLabServer",
+    "register_server_backend",
+    "get_server_backend",
+    "server_backends",
+)
+
+SERVER_BACKEND_ENV = "PYDGLAB_WS_BACKEND"
+"""选择后端的环境变量"""
+DEFAULT_SERVER_BACKEND = "ble"
+"""默认后端"""
+
+_backends: Dict[str, Union[str, Callable[..., Any]]] = {
+    "ws": "pydglab_ws.server.server:DGLabWSServer",
+    "ble": "pydglab_ws.server.ble_compat:DGLabBLEServer",
+    "ble-multi": "pydglab_ws.server.ble_multi:DGLabBLEMultiServer",
+}
+"""后端名称到实现的映射，实现为 ``模块:名称`` 形式的字符串时在首次使用时导入"""
+
+
+def register_server_backend(name: str, backend: Union[str, Callable[..., Any]]):
+    """
+    注册后端，已存在的同名后端将被替换
+
+    :param name: 后端名称
+    :param backend: 创建服务端的类或函数，或者 ``模块:名称`` 形式的字符串，在首次使用时导入。
+        应当接受 ``(host, port, heartbeat_interval)`` 位置参数，并提供 ``async with`` 与 ``new_local_client()``
+    """
+    _backends[name] = backend
+
+
+def server_backends() -> Tuple[str, ...]:
+    """已注册的后端名称"""
+    return tuple(_backends)
+
+
+def get_server_backend(name: Optional[str] = None) -> Callable[..., Any]:
+    """
+    获取后端的实现，只导入该后端所需的模块
+
+    :param name: 后端名称，为 ``None`` 时读取环境变量 ``PYDGLAB_WS_BACKEND``，默认为 ``ble``
+    :return: 创建服务端的类或函数
+    :raise ValueError: 后端不存在
+    """
+    if name is None:
+        name = os.environ.get(SERVER_BACKEND_ENV) or DEFAULT_SERVER_BACKEND
+    try:
+        backend = _backends[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown server backend {name!r}, available: {', '.join(_backends)}"
+        ) from None
+    if isinstance(backend, str):
+        module_name, _, attribute = backend.partition(":")
+        backend = getattr(importlib.import_module(module_name), attribute)
+        _backends[name] = backend
+    return backend
+
+
+def DGLabServer(*args, backend: Optional[str] = None, **kwargs) -> Any:
+    """
+    创建所选后端的服务端，其余参数传给后端的构造函数
+
+    示例：
+    ```python3
+    # 作为 WebSocket 转发节点，不导入 bleak
+    async with DGLabServer("0.0.0.0", 5678, 60, backend="ws") as server:
+        ...
+
+    # 由环境变量 PYDGLAB_WS_BACKEND 选择，默认为 BLE 直连
+    async with DGLabServer() as server:
+        client = server.new_local_client()
+    ```
+
+    :param backend: 后端名称，为 ``None`` 时读取环境变量 ``PYDGLAB_WS_BACKEND``，默认为 ``ble``
+    :return: 服务端实例
+    :raise ValueError: 后端不存在
+    """
+    return get_server_backend(backend)(*args, **kwargs)
@@ -5,13 +5,14 @@ DGLabWSServer 兼容层
 使用独立线程运行 BLE 以兼容 qasync 等特殊事件循环。
 """
 import asyncio
+import concurrent.futures
 import logging
 import threading
 import queue
-from typing import Optional, List, Callable, Any, Union
+from typing import Optional, List, Callable, Any, Union, Coroutine, Dict, Iterable, Hashable
 
 from ..client import YCYBLEClient
-from ..ble import YCYScanner, YCYDevice
+from ..ble import YCYScanner, YCYDevice, YCYDeviceCache, BleakTransport
 from ..enums import Channel, StrengthOperationType, RetCode
 from ..models import StrengthData
 from ..typing import PulseOperation
@@ -20,21 +21,127 @@ __all__ = ("DGLabBLEServer",)
 
 logger = logging.getLogger(__name__)
 
+_CACHED_CONNECT_TIMEOUT = 5.0
+"""尝试连接缓存中的设备的超时时间 (秒)，设备不在附近时尽快改为扫描"""
+_CACHED_CONNECT_ATTEMPTS = 2
+"""最多尝试连接缓存中最近发现的几台设备，缓存中的设备都不在附近时也能及时改为扫描"""
+_SCAN_CONNECT_TIMEOUT = 15.0
+"""扫描到设备后连接的等待时间 (秒)"""
+
+
+class _OrderedCommandQueues:
+    """
+    在 BLE 线程的事件循环中按通道依次执行命令
+
+    同一通道的命令按提交顺序执行，不同通道之间互不等待；
+    不属于任何通道的命令（如 ``stop_all``）会等待所有通道中先提交的命令执行完毕，
+    且之后提交的命令会等待其执行完毕
+
+    :param keys: 通道
+    """
+
+    def __init__(self, keys: Iterable[Hashable]):
+        self._queues: Dict[Hashable, asyncio.Queue] = {key: asyncio.Queue() for key in keys}
+        self._workers = [asyncio.create_task(self._worker(q)) for q in self._queues.values()]
+
+    @staticmethod
+    async def _worker(command_queue: asyncio.Queue):
+        while True:
+            command, _, _ = await command_queue.get()
+            await command()
+
+    @staticmethod
+    async def _run(coro: Coroutine, future: concurrent.futures.Future):
+        if not future.set_running_or_notify_cancel():
+            coro.close()
+            return
+        try:
+            result = await coro
+        except BaseException as e:
+            future.set_exception(e)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+        else:
+            future.set_result(result)
+
+    def put(self, key: Optional[Hashable], coro: Coroutine, future: concurrent.futures.Future):
+        """
+        提交命令，需要在 BLE 线程的事件循环中调用
+
+        :param key: 通道，为 ``None`` 时等待所有通道
+        :param coro: 命令协程
+        :param future: 用于返回执行结果
+        """
+        if key is not None:
+            self._queues[key].put_nowait((lambda: self._run(coro, future), coro, future))
+            return
+
+        # 在每个通道中放入屏障，所有通道都到达屏障后执行命令，之后再继续各通道
+        arrived = [asyncio.Event() for _ in self._queues]
+        released = asyncio.Event()
+
+        def barrier(event: asyncio.Event):
+            async def wait():
+                event.set()
+                await released.wait()
+            return wait
+
+        for command_queue, event in zip(self._queues.values(), arrived):
+            command_queue.put_nowait((barrier(event), None, None))
+
+        async def run_global():
+            try:
+                for event in arrived:
+                    await event.wait()
+                await self._run(coro, future)
+            except asyncio.CancelledError:
+                if future.cancel():
+                    coro.close()
+                raise
+            finally:
+                released.set()
+
+        self._workers.append(asyncio.create_task(run_global()))
+        self._workers = [worker for worker in self._workers if not worker.done()]
+
+    async def close(self):
+        """停止执行命令，尚未执行的命令会被取消"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        for command_queue in self._queues.values():
+            while not command_queue.empty():
+                _, coro, future = command_queue.get_nowait()
+                if future is not None and future.cancel():
+                    coro.close()
+
 
 class BLEThread(threading.Thread):
     """独立的 BLE 线程，运行自己的事件循环"""
 
-    def __init__(self, scan_timeout: float, strength_limit: int, device_address: str = None):
+    def __init__(
+        self,
+        scan_timeout: float,
+        strength_limit: int,
+        device_address: str = None,
+        auto_reconnect: bool = True,
+        device_cache: Union[bool, YCYDeviceCache] = True
+    ):
         super().__init__(daemon=True)
         self._scan_timeout = scan_timeout
         self._strength_limit = strength_limit
         self._device_address = device_address
+        self._auto_reconnect = auto_reconnect
+        if isinstance(device_cache, bool):
+            device_cache = YCYDeviceCache() if device_cache else None
+        self._device_cache: Optional[YCYDeviceCache] = device_cache
         self._loop: Optional[asyncio.AbstractEventLoop] = None
         self._client: Optional[YCYBLEClient] = None
         self._ready = threading.Event()
         self._error: Optional[Exception] = None
         self._devices: List[YCYDevice] = []
         self._should_stop = False  # 显式停止标志
+        self._commands: Optional[_OrderedCommandQueues] = None
 
     def run(self):
         """线程主函数"""
@@ -42,6 +149,7 @@ class BLEThread(threading.Thread):
         asyncio.set_event_loop(self._loop)
         try:
             self._loop.run_until_complete(self._connect())
+            self._loop.run_until_complete(self._start_commands())
             self._ready.set()
             logger.info("BLE 线程: run_forever() 开始运行")
             # 保持事件循环运行
@@ -51,6 +159,7 @@ class BLEThread(threading.Thread):
                     # 如果 run_forever() 正常退出 (被 stop() 调用)，检查是否应该继续
                     if self._should_stop:
                         logger.info("BLE 线程: run_forever() 因 stop() 调用而退出")
+                        self._loop.run_until_complete(self._commands.close())
                         break
                     else:
                         # 意外退出，重新启动 run_forever()
@@ -71,36 +180,123 @@ class BLEThread(threading.Thread):
         # 不关闭 loop，让 daemon 线程自动清理
         logger.info("BLE 线程: 主循环退出，但不关闭 loop")
 
+    @property
+    def ready_timeout(self) -> float:
+        """等待连接完成的超时时间 (秒)，包括尝试连接缓存中的设备、扫描与连接的时间"""
+        timeout = self._scan_timeout + _SCAN_CONNECT_TIMEOUT
+        if self._device_cache is not None and not self._device_address:
+            timeout += _CACHED_CONNECT_ATTEMPTS * _CACHED_CONNECT_TIMEOUT
+        return timeout
+
+    def _create_client(self, device: Union[str, YCYDevice], connect_timeout: Optional[float] = None) -> YCYBLEClient:
+        """创建役次元 BLE 客户端"""
+        return YCYBLEClient(
+            device,
+            strength_limit=self._strength_limit,
+            auto_reconnect=self._auto_reconnect,
+            transport_factory=lambda address, callback: BleakTransport(address, callback, timeout=connect_timeout)
+        )
+
+    async def _connect_cached(self) -> Optional[YCYBLEClient]:
+        """
+        依次尝试连接缓存中最近发现的设备，不进行完整的扫描
+
+        只尝试最近的 ``_CACHED_CONNECT_ATTEMPTS`` 台设备，每台最多等待 ``_CACHED_CONNECT_TIMEOUT`` 秒
+        """
+        if self._device_cache is None or self._device_address:
+            return None
+        for device in YCYScanner.cached_devices(cache=self._device_cache)[:_CACHED_CONNECT_ATTEMPTS]:
+            logger.info(f"尝试连接最近使用的设备: {device}")
+            client = self._create_client(device, _CACHED_CONNECT_TIMEOUT)
+            try:
+                connected = await asyncio.wait_for(client.connect(), _CACHED_CONNECT_TIMEOUT)
+            except asyncio.TimeoutError:
+                connected = False
+            if connected:
+                self._devices = [device]
+                return client
+        return None
+
     async def _connect(self):
-        """连接 BLE 设备"""
+        """连接 BLE 设备，优先连接缓存中最近使用的设备，否则扫描到第一台设备后立即连接"""
         if self._device_address:
-            self._client = YCYBLEClient(
-                self._device_address,
-                strength_limit=self._strength_limit
-            )
+            # 按地址连接时，发现该设备后即停止扫描
+            self._client = self._create_client(self._device_address)
+            success = await self._client.connect()
+        elif (client := await self._connect_cached()) is not None:
+            self._client = client
+            success = True
         else:
             logger.info("正在扫描役次元设备...")
-            self._devices = await YCYScanner.scan(timeout=self._scan_timeout)
-
-            if not self._devices:
+            device = await YCYScanner.find_device(timeout=self._scan_timeout, cache=self._device_cache)
+            if device is None:
                 raise RuntimeError("未找到役次元设备，请确认设备已开机")
+            self._devices = [device]
 
-            device = self._devices[0]
             logger.info(f"找到设备: {device}, 正在连接...")
+            self._client = self._create_client(device)
+            success = await self._client.connect()
 
-            self._client = YCYBLEClient(
-                device,
-                strength_limit=self._strength_limit
-            )
-
-        success = await self._client.connect()
         if not success:
             raise RuntimeError("BLE 连接失败")
 
+        if self._device_cache is not None:
+            device = self._devices[0] if self._devices else YCYDevice(address=self._device_address)
+            self._device_cache.update(device)
+            self._device_cache.save()
         logger.info("BLE 设备已连接")
 
+    async def _start_commands(self):
+        """创建按通道排序的命令队列"""
+        self._commands = _OrderedCommandQueues((Channel.A, Channel.B))
+
+    def submit(self, channel: Optional[Channel], coro: Coroutine) -> concurrent.futures.Future:
+        """
+        提交命令到 BLE 线程，同一通道的命令按提交顺序执行，不会阻塞调用方
+
+        :param channel: 命令所属通道，为 ``None`` 时在所有通道中先提交的命令执行完毕后执行
+        :param coro: 在 BLE 线程中执行的协程
+        :return: 执行结果，可通过 ``asyncio.wrap_future`` 在调用方的事件循环中等待；BLE 线程不可用时结果为 ``False``
+        """
+        future = concurrent.futures.Future()
+        if self._should_stop or not self._loop or self._loop.is_closed() or self._commands is None:
+            logger.warning("submit: BLE 线程不可用")
+            coro.close()
+            future.set_result(False)
+            return future
+        self._loop.call_soon_threadsafe(self._commands.put, channel, coro, future)
+        return future
+
+    async def call(self, channel: Optional[Channel], coro: Coroutine, timeout: Optional[float] = 5.0) -> Any:
+        """
+        提交命令到 BLE 线程并在调用方的事件循环中等待结果，等待期间不会阻塞调用方的事件循环
+
+        :param channel: 命令所属通道
+        :param coro: 在 BLE 线程中执行的协程
+        :param timeout: 超时时间 (秒)
+        :return: 执行结果，超时或失败时为 ``False``
+        """
+        future = asyncio.wrap_future(self.submit(channel, coro))
+        done, _ = await asyncio.wait((future,), timeout=timeout)
+        if not done:
+            # 已开始执行的命令无法取消，会在 BLE 线程中继续执行完毕
+            future.cancel()
+            logger.error(f"BLE 操作超时: {timeout}s")
+            return False
+        if future.cancelled():
+            logger.error("BLE 操作已取消")
+            return False
+        if (e := future.exception()) is not None:
+            logger.error(f"BLE 操作失败: {type(e).__name__}: {e}")
+            return False
+        return future.result()
+
     def run_coro(self, coro, timeout: float = 5.0):
-        """在 BLE 线程中运行协程并返回结果（阻塞）"""
+        """
+        在 BLE 线程中运行协程并返回结果（阻塞）
+
+        会阻塞调用线程，在事件循环中应使用 :meth:`call`
+        """
         if not self._loop or self._loop.is_closed():
             # 协程需要关闭以避免警告
             coro.close()
@@ -146,6 +342,12 @@ class BLEThread(threading.Thread):
             self._loop.call_soon_threadsafe(self._loop.stop)
 
 
+def _log_command_failure(future: concurrent.futures.Future):
+    """记录未等待结果的命令的异常"""
+    if not future.cancelled() and (e := future.exception()) is not None:
+        logger.error(f"BLE 命令执行失败: {type(e).__name__}: {e}")
+
+
 class BLEClientProxy:
     """BLE 客户端代理，在主线程中使用，操作转发到 BLE 线程"""
 
@@ -192,44 +394,59 @@ class BLEClientProxy:
     async def ensure_bind(self):
         pass
 
+    async def _submit(self, channel: Optional[Channel], coro: Coroutine, wait: bool) -> Any:
+        """
+        提交命令到 BLE 线程
+
+        :param channel: 命令所属通道，同一通道的命令按提交顺序执行
+        :param coro: 在 BLE 线程中执行的协程
+        :param wait: 是否等待执行结果，否则提交后立即返回 ``True``
+        """
+        if wait:
+            return await self._ble_thread.call(channel, coro, timeout=None)
+        future = self._ble_thread.submit(channel, coro)
+        future.add_done_callback(_log_command_failure)
+        return not future.done() or future.result() is not False
+
     async def set_strength(
         self,
         channel: Channel,
         operation_type: StrengthOperationType,
-        value: int
+        value: int,
+        wait: bool = False
     ) -> bool:
-        # 使用非阻塞方式，避免卡住主事件循环
-        return self._ble_thread.fire_and_forget(
-            self._client.set_strength(channel, operation_type, value)
+        """
+        设置强度
+
+        :param wait: 是否等待 BLE 命令执行完毕并返回其结果
+        """
+        return await self._submit(
+            channel,
+            self._client.set_strength(channel, operation_type, value),
+            wait
         )
 
-    async def add_pulses(self, channel: Channel, *pulses: PulseOperation) -> bool:
-        # 在添加前先清空旧波形，合并为一个原子操作
-        logger.info(f"BLEClientProxy.add_pulses: channel={channel}, pulses数量={len(pulses)}")
+    async def add_pulses(self, channel: Channel, *pulses: PulseOperation, wait: bool = False) -> bool:
+        """
+        替换波形，先清空旧波形再添加，在 BLE 线程中作为一个命令执行
+
+        :param wait: 是否等待 BLE 命令执行完毕并返回其结果
+        """
+        logger.debug(f"BLEClientProxy.add_pulses: channel={channel}, pulses数量={len(pulses)}")
+
         async def _clear_and_add():
-            try:
-                logger.info(f"_clear_and_add 开始执行: channel={channel}, client.connected={self._client.connected}")
-                logger.info(f"_clear_and_add: waveform_player_a={self._client._waveform_player_a}, waveform_player_b={self._client._waveform_player_b}")
-                await self._client.clear_pulses(channel)
-                logger.info(f"_clear_and_add: clear_pulses 完成")
-                await self._client.add_pulses(channel, *pulses)
-                logger.info(f"_clear_and_add 执行完成: channel={channel}")
-                return True
-            except Exception as e:
-                logger.error(f"_clear_and_add 异常: {type(e).__name__}: {e}")
-                import traceback
-                logger.error(traceback.format_exc())
-                return False
-        result = self._ble_thread.fire_and_forget(_clear_and_add())
-        logger.info(f"BLEClientProxy.add_pulses: fire_and_forget 返回 {result}")
-        return result
+            await self._client.clear_pulses(channel)
+            await self._client.add_pulses(channel, *pulses)
+            return True
+
+        return await self._submit(channel, _clear_and_add(), wait)
 
     async def clear_pulses(self, channel: Channel) -> bool:
         # clear_pulses 现在是 no-op，因为 add_pulses 会自动清空
         # 保留方法以保持接口兼容
         return True
 
-    async def set_pulse_preset(self, channel: Channel, preset_index: int) -> bool:
+    async def set_pulse_preset(self, channel: Channel, preset_index: int, wait: bool = False) -> bool:
         """
         设置通道波形预设 (推荐方式)
 
@@ -238,18 +455,19 @@ class BLEClientProxy:
 
         :param channel: 通道选择
         :param preset_index: DG-Lab 预设索引 (0-15)
+        :param wait: 是否等待 BLE 命令执行完毕并返回其结果
         :return: 是否成功
         """
         logger.info(f"BLEClientProxy.set_pulse_preset: channel={channel}, preset_index={preset_index}")
-        return self._ble_thread.fire_and_forget(
-            self._client.set_pulse_preset(channel, preset_index)
-        )
+        return await self._submit(channel, self._client.set_pulse_preset(channel, preset_index), wait)
 
-    async def stop_all(self) -> bool:
-        # stop_all 需要等待确认
-        return self._ble_thread.run_coro(
-            self._client.stop_all()
-        )
+    async def stop_all(self, timeout: float = 5.0) -> bool:
+        """
+        停止所有输出，在两个通道中先提交的命令执行完毕后执行，并等待确认
+
+        :param timeout: 等待确认的超时时间 (秒)，等待期间不会阻塞当前事件循环
+        """
+        return await self._ble_thread.call(None, self._client.stop_all(), timeout)
 
     async def data_generator(self, *targets, poll_interval: float = 1.0):
         """数据生成器"""
@@ -269,6 +487,9 @@ class DGLabBLEServer:
     :param device_address: 指定设备地址，如果为 None 则自动扫描
     :param scan_timeout: 扫描超时时间 (秒)
     :param strength_limit: 虚拟强度上限
+    :param auto_reconnect: 设备意外断开后是否自动重连
+    :param device_cache: 设备缓存，为 ``True`` 时使用默认路径的缓存，为 ``False`` 时不使用缓存。
+        未指定设备地址时优先连接缓存中最近使用的设备，连接成功的设备会记录到缓存中
     :param host: 忽略 (兼容参数)
     :param port: 忽略 (兼容参数)
     :param heartbeat_interval: 忽略 (兼容参数)
@@ -282,11 +503,15 @@ class DGLabBLEServer:
         device_address: Optional[str] = None,
         scan_timeout: float = 10.0,
         strength_limit: int = 200,
+        auto_reconnect: bool = True,
+        device_cache: Union[bool, YCYDeviceCache] = True,
         **kwargs
     ):
         self._device_address = device_address
         self._scan_timeout = scan_timeout
         self._strength_limit = strength_limit
+        self._auto_reconnect = auto_reconnect
+        self._device_cache = device_cache
         self._ble_thread: Optional[BLEThread] = None
         self._client_proxy: Optional[BLEClientProxy] = None
 
@@ -295,12 +520,16 @@ class DGLabBLEServer:
         self._ble_thread = BLEThread(
             self._scan_timeout,
             self._strength_limit,
-            self._device_address
+            self._device_address,
+            auto_reconnect=self._auto_reconnect,
+            device_cache=self._device_cache
         )
         self._ble_thread.start()
 
-        # 等待连接完成
-        self._ble_thread._ready.wait(timeout=self._scan_timeout + 15)
+        # 在线程池中等待连接完成，不阻塞当前事件循环
+        await asyncio.get_running_loop().run_in_executor(
+            None, self._ble_thread._ready.wait, self._ble_thread.ready_timeout
+        )
 
         if self._ble_thread._error:
             raise self._ble_thread._error
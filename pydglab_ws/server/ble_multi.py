@@ -0,0 +1,126 @@
+"""
+DGLabWSServer 兼容层 (多设备)
+
+提供与 DGLabWSServer 相同的接口，内部使用 [`YCYDeviceManager`][pydglab_ws.client.manager.YCYDeviceManager]
+通过 BLE 直连多台役次元设备，每个本地终端对应一台设备。
+"""
+import logging
+from typing import Optional, Iterable, List
+
+from ..client.manager import YCYDeviceManager, YCYManagedClient, ScannerFactory, ClientFactory
+
+__all__ = ("DGLabBLEMultiServer",)
+
+logger = logging.getLogger(__name__)
+
+
+class DGLabBLEMultiServer:
+    """
+    DGLabWSServer 兼容层 - 使用 BLE 直连多台役次元设备代替 WebSocket
+
+    启动时扫描并连接设备，之后每次调用 [`new_local_client`][pydglab_ws.server.ble_multi.DGLabBLEMultiServer.new_local_client]
+    依次取得一台已连接的设备
+
+    示例：
+    ```python3
+    async with DGLabBLEMultiServer(device_count=2) as server:
+        clients = [server.new_local_client() for _ in range(len(server.local_clients))]
+    ```
+
+    :param addresses: 只连接这些地址的设备，为 ``None`` 时连接任意发现的役次元设备
+    :param device_count: 要连接的设备数，为 ``None`` 时连接 ``addresses`` 中的全部设备，
+        未指定 ``addresses`` 时连接扫描超时前发现的全部设备
+    :param scan_timeout: 扫描超时时间 (秒)
+    :param strength_limit: 虚拟强度上限
+    :param queue_size: 每台设备写入队列的最大长度
+    :param scanner_factory: 扫描器工厂，默认使用 ``BleakScanner``
+    :param client_factory: 客户端工厂，默认使用 ``YCYBLEClient``
+    :param host: 忽略 (兼容参数)
+    :param port: 忽略 (兼容参数)
+    :param heartbeat_interval: 忽略 (兼容参数)
+    :raise TypeError: 传入了未知的参数
+    """
+
+    def __init__(
+        self,
+        host: str = None,
+        port: int = None,
+        heartbeat_interval: float = None,
+        addresses: Optional[Iterable[str]] = None,
+        device_count: Optional[int] = None,
+        scan_timeout: float = 10.0,
+        strength_limit: int = 200,
+        queue_size: int = 64,
+        scanner_factory: Optional[ScannerFactory] = None,
+        client_factory: Optional[ClientFactory] = None
+    ):
+        self._manager = YCYDeviceManager(
+            addresses,
+            strength_limit=strength_limit,
+            queue_size=queue_size,
+            scanner_factory=scanner_factory,
+            client_factory=client_factory
+        )
+        self._device_count = device_count
+        self._scan_timeout = scan_timeout
+        self._local_clients: List[YCYManagedClient] = []
+        self._assigned = 0
+        self._started = False
+
+    async def __aenter__(self) -> "DGLabBLEMultiServer":
+        """扫描并连接设备"""
+        try:
+            self._local_clients = await self._manager.connect(self._device_count, self._scan_timeout)
+        except BaseException:
+            await self._manager.close()
+            raise
+        if not self._local_clients:
+            await self._manager.close()
+            raise RuntimeError("BLE 连接失败")
+        logger.info(f"已连接 {len(self._local_clients)} 台役次元设备")
+        self._assigned = 0
+        self._started = True
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """停止扫描并断开所有设备"""
+        self._started = False
+        self._local_clients = []
+        await self._manager.close()
+
+    @property
+    def manager(self) -> YCYDeviceManager:
+        """多设备管理器，可用于继续连接新发现的设备"""
+        return self._manager
+
+    @property
+    def local_clients(self) -> List[YCYManagedClient]:
+        """启动时连接的设备"""
+        return self._local_clients.copy()
+
+    def new_local_client(self, max_queue: int = 32) -> YCYManagedClient:
+        """
+        获取下一台尚未取得的设备
+
+        :param max_queue: 忽略 (兼容参数)
+        :raise RuntimeError: 服务器未启动，或所有设备均已取得
+        """
+        if not self._started:
+            raise RuntimeError("服务器未启动")
+        if self._assigned >= len(self._local_clients):
+            raise RuntimeError("没有尚未取得的设备")
+        client = self._local_clients[self._assigned]
+        self._assigned += 1
+        return client
+
+    @property
+    def heartbeat_interval(self) -> Optional[float]:
+        return None
+
+    @heartbeat_interval.setter
+    def heartbeat_interval(self, value: float):
+        pass
+
+    @property
+    def heartbeat_enabled(self) -> bool:
+        return False
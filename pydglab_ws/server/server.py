@@ -1,17 +1,192 @@
 import asyncio
+import re
 from asyncio import Task
-from typing import Union, Optional, Sequence, Dict, Callable, Coroutine, Any, Set, Literal, Tuple
-from uuid import uuid4
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import Union, Optional, Sequence, Dict, Callable, Coroutine, Any, Set, Literal, Tuple, Deque
+from uuid import uuid4, UUID
 
 from pydantic import UUID4
-from websockets import WebSocketServerProtocol, ConnectionClosedError
+from websockets import WebSocketServerProtocol, ConnectionClosedError, ConnectionClosed
 from websockets.server import serve as ws_serve
 
 from ..client.local import DGLabLocalClient
+from ..codec import encode_message, decode_message
 from ..enums import MessageDataHead, RetCode, MessageType
 from ..models import WebSocketMessage
 
-__all__ = ["DGLabWSServer"]
+__all__ = ["DGLabWSServer", "HeartbeatStats", "SendQueuePolicy", "SendQueueStats"]
+
+_HEARTBEAT_HEAD = f'{{"type":"{MessageType.HEARTBEAT.value}","clientId":"'
+_HEARTBEAT_MIDDLE = '","targetId":"'
+_HEARTBEAT_TAIL = f'","message":"{RetCode.SUCCESS.value}"}}'
+"""心跳包 JSON 模板，只有两个 UUID 需要替换，与 ``WebSocketMessage`` 序列化结果一致"""
+
+_ROUTE_FIELD_PATTERN = re.compile(r'"(type|clientId|targetId)"\s*:\s*"([^"]*)"')
+"""用于预扫描消息路由字段的正则表达式"""
+
+_STRENGTH_REPORT_PATTERN = re.compile(r'"message"\s*:\s*"strength-\d+\+\d+\+\d+\+\d+"')
+"""App 上报的强度数据消息，只有最新一条有意义"""
+
+
+def _scan_route(raw_message: Union[str, bytes]) -> Optional[Tuple[str, str, str]]:
+    """
+    预扫描消息，仅提取路由所需的 ``type``, ``clientId``, ``targetId``，不进行完整的模型验证
+
+    :param raw_message: 原始 WebSocket 消息
+    :return: ``(type, clientId, targetId)``，无法确定时返回 ``None``
+    """
+    if not isinstance(raw_message, str) or raw_message[:1] != "{" or raw_message[-1:] != "}":
+        return None
+    fields: Dict[str, str] = {}
+    for key, value in _ROUTE_FIELD_PATTERN.findall(raw_message):
+        if key in fields:
+            return None
+        fields[key] = value
+    if len(fields) != 3:
+        return None
+    return fields["type"], fields["clientId"], fields["targetId"]
+
+
+@dataclass
+class HeartbeatStats:
+    """
+    一轮心跳包发送的统计数据
+
+    :ivar duration: 本轮发送耗时（秒）
+    :ivar connections: 本轮需要发送的连接数
+    :ivar sent: 发送成功数
+    :ivar timed_out: 发送超时数
+    :ivar failed: 因连接已断开等原因发送失败数
+    """
+    duration: float
+    connections: int
+    sent: int
+    timed_out: int
+    failed: int
+
+
+class SendQueuePolicy(str, Enum):
+    """
+    连接发送队列已满时的处理策略
+
+    :ivar DROP_OLDEST: 丢弃最早的一条待发送消息
+    :ivar COALESCE_STRENGTH: App 上报的强度数据只保留最新一条，队列仍满时丢弃最早的一条待发送消息
+    :ivar DISCONNECT: 清空队列，发送 ``RetCode.SERVER_DELAY`` 后断开连接
+    """
+    DROP_OLDEST = "drop_oldest"
+    COALESCE_STRENGTH = "coalesce_strength"
+    DISCONNECT = "disconnect"
+
+
+@dataclass
+class SendQueueStats:
+    """
+    单个连接发送队列的统计数据
+
+    :ivar depth: 当前待发送的消息数
+    :ivar max_size: 队列容量
+    :ivar sent: 已发送的消息数
+    :ivar dropped: 因队列已满或连接即将断开而丢弃的消息数
+    :ivar coalesced: 被更新的强度数据替换的消息数
+    """
+    depth: int
+    max_size: int
+    sent: int
+    dropped: int
+    coalesced: int
+
+
+class _SendQueue:
+    """
+    单个连接的发送队列，由独立的任务依次发送，放入消息时不会等待
+
+    :param websocket: 目标连接
+    :param max_size: 队列容量
+    :param policy: 队列已满时的处理策略
+    """
+
+    def __init__(self, websocket: WebSocketServerProtocol, max_size: int, policy: SendQueuePolicy):
+        self._websocket = websocket
+        self._max_size = max_size
+        self._policy = policy
+        self._frames: Deque[str] = deque()
+        self._strength_frame: Optional[str] = None
+        """队列中尚未发送的强度数据消息"""
+        self._wakeup = asyncio.Event()
+        self._closing = False
+        self._sent = 0
+        self._dropped = 0
+        self._coalesced = 0
+        self._task = asyncio.create_task(self._writer())
+
+    @property
+    def stats(self) -> SendQueueStats:
+        """发送队列的统计数据"""
+        return SendQueueStats(
+            depth=len(self._frames),
+            max_size=self._max_size,
+            sent=self._sent,
+            dropped=self._dropped,
+            coalesced=self._coalesced
+        )
+
+    def put(self, frame: str):
+        """
+        放入一条待发送的消息
+
+        :param frame: 已序列化的消息
+        """
+        if self._closing:
+            self._dropped += 1
+            return
+        frames = self._frames
+        if self._policy == SendQueuePolicy.COALESCE_STRENGTH and _STRENGTH_REPORT_PATTERN.search(frame):
+            if self._strength_frame is not None:
+                try:
+                    frames.remove(self._strength_frame)
+                except ValueError:
+                    pass
+                else:
+                    self._coalesced += 1
+            self._strength_frame = frame
+        if len(frames) >= self._max_size:
+            if self._policy == SendQueuePolicy.DISCONNECT:
+                self._dropped += len(frames) + 1
+                frames.clear()
+                frames.append(encode_message(WebSocketMessage(type=MessageType.MSG, message=RetCode.SERVER_DELAY)))
+                self._closing = True
+                self._wakeup.set()
+                return
+            if frames.popleft() == self._strength_frame:
+                self._strength_frame = None
+            self._dropped += 1
+        frames.append(frame)
+        self._wakeup.set()
+
+    async def _writer(self):
+        frames = self._frames
+        try:
+            while True:
+                while frames:
+                    frame = frames.popleft()
+                    if frame == self._strength_frame:
+                        self._strength_frame = None
+                    await self._websocket.send(frame)
+                    self._sent += 1
+                if self._closing:
+                    await self._websocket.close()
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+        except ConnectionClosed:
+            self._dropped += len(frames)
+            frames.clear()
+
+    def close(self):
+        """停止发送，丢弃剩余消息"""
+        self._task.cancel()
 
 
 class DGLabWSServer:
@@ -21,6 +196,13 @@ class DGLabWSServer:
     :param host: WebSocket 服务器绑定的接口
     :param port: 监听端口
     :param heartbeat_interval: 心跳包发送间隔（秒）
+    :param heartbeat_concurrency: 心跳包并发发送的最大连接数
+    :param heartbeat_timeout: 单个连接发送心跳包的超时时间（秒），默认为心跳包发送间隔
+    :param relay_mode: 转发模式，开启后已绑定双方之间的 ``msg`` 消息只预扫描路由字段，原样转发原始消息，
+        只有 ``bind`` 消息或注册了 ``msg`` 消息回调函数时才进行完整的模型验证
+    :param send_queue_size: 每个连接发送队列的容量，消息由各连接独立的任务发送，
+        缓慢的连接不会阻塞向其转发消息的另一方；为 ``None`` 时在收到消息的任务中直接发送
+    :param send_queue_policy: 发送队列已满时的处理策略
     :param kwargs: :class:`websockets.server.serve` 的其他参数
     """
 
@@ -29,6 +211,11 @@ class DGLabWSServer:
             host: Union[str, Sequence[str]],
             port: Optional[int] = None,
             heartbeat_interval: float = None,
+            heartbeat_concurrency: int = 64,
+            heartbeat_timeout: Optional[float] = None,
+            relay_mode: bool = False,
+            send_queue_size: Optional[int] = 2 ** 10,
+            send_queue_policy: SendQueuePolicy = SendQueuePolicy.DROP_OLDEST,
             **kwargs
     ):
         self._serve = ws_serve(
@@ -65,6 +252,18 @@ class DGLabWSServer:
         """新连接建立时 与 连接断开时"""
         self._heartbeat_interval = heartbeat_interval
         self._heartbeat_task: Optional[Task] = None
+        self._heartbeat_concurrency = heartbeat_concurrency
+        self._heartbeat_timeout = heartbeat_timeout
+        self._last_heartbeat_stats: Optional[HeartbeatStats] = None
+        self._relay_mode = relay_mode
+        self._send_queue_size = send_queue_size
+        self._send_queue_policy = SendQueuePolicy(send_queue_policy)
+        self._ws_to_send_queue: Dict[WebSocketServerProtocol, _SendQueue] = {}
+
+    @property
+    def relay_mode(self) -> bool:
+        """是否开启了转发模式"""
+        return self._relay_mode
 
     @property
     def heartbeat_interval(self) -> Optional[float]:
@@ -81,6 +280,11 @@ class DGLabWSServer:
         """是否开启了心跳包发送计时器"""
         return self._heartbeat_interval is not None
 
+    @property
+    def last_heartbeat_stats(self) -> Optional[HeartbeatStats]:
+        """最近一轮心跳包发送的统计数据，包含本轮耗时，尚未发送过时为 ``None``"""
+        return self._last_heartbeat_stats
+
     async def __aenter__(self) -> "DGLabWSServer":
         await self._serve.__aenter__()
         if self.heartbeat_enabled:
@@ -92,6 +296,15 @@ class DGLabWSServer:
             self._heartbeat_task.cancel()
         await self._serve.__aexit__(exc_type, exc_val, exc_tb)
 
+    @property
+    def send_queue_stats(self) -> Dict[UUID4, SendQueueStats]:
+        """各个 WebSocket 连接发送队列的统计数据，未启用发送队列时为空"""
+        return {
+            uuid: send_queue.stats
+            for uuid, websocket in self._uuid_to_ws.items()
+            if (send_queue := self._ws_to_send_queue.get(websocket)) is not None
+        }
+
     @property
     def client_id_to_target_id(self) -> Dict[UUID4, UUID4]:
         """
@@ -126,7 +339,7 @@ class DGLabWSServer:
         :param max_queue: 终端消息队列最大长度
         :return: 创建好的本地终端对象
         """
-        client_id = uuid4()
+        client_id = self._new_uuid()
         return DGLabLocalClient(
             client_id,
             self._message_handler,
@@ -149,14 +362,13 @@ class DGLabWSServer:
             if client_id in self._client_id_to_target_id:
                 target_id = self._client_id_to_target_id.pop(client_id)
                 self._target_id_to_client_id.pop(target_id)
-                if websocket := self._uuid_to_ws.get(target_id):
-                    message = WebSocketMessage(
-                        type=MessageType.BREAK,
-                        client_id=client_id,
-                        target_id=target_id,
-                        message=RetCode.CLIENT_DISCONNECTED
-                    )
-                    await self._send(message, websocket)
+                message = WebSocketMessage(
+                    type=MessageType.BREAK,
+                    client_id=client_id,
+                    target_id=target_id,
+                    message=RetCode.CLIENT_DISCONNECTED
+                )
+                await self._deliver(message, target_id)
             return True
 
     async def _send(
@@ -171,13 +383,50 @@ class DGLabWSServer:
         :param message: 要发送的消息
         :param wss: 发送目标连接
         """
+        raw_message = None
         for websocket in wss:
             if websocket is not None:
-                await websocket.send(message.model_dump_json(by_alias=True, context={"separators": (",", ":")}))
+                if raw_message is None:
+                    raw_message = encode_message(message)
+                await self._send_raw(raw_message, websocket)
         if to_local_client:
             if queue := self._client_id_to_queue.get(message.client_id):
                 await queue.put(message)
 
+    async def _send_raw(self, raw_message: str, websocket: WebSocketServerProtocol):
+        """
+        发送已序列化的消息，启用发送队列时放入该连接的队列
+
+        :param raw_message: 已序列化的消息
+        :param websocket: 发送目标连接
+        """
+        if (send_queue := self._ws_to_send_queue.get(websocket)) is not None:
+            send_queue.put(raw_message)
+        else:
+            await websocket.send(raw_message)
+
+    async def _deliver(self, message: WebSocketMessage, uuid: UUID4):
+        """
+        向指定 ID 的 WebSocket 连接发送消息，该 ID 为消息中的本地终端时则放入其消息队列
+
+        :param message: 要发送的消息
+        :param uuid: 接收方终端 / App ID
+        """
+        websocket = self._uuid_to_ws.get(uuid)
+        await self._send(
+            message,
+            websocket,
+            to_local_client=websocket is None and uuid == message.client_id
+        )
+
+    def _is_local(self, uuid: UUID4) -> bool:
+        """
+        终端 / App ID 是否由本服务端分配
+
+        :param uuid: 终端 / App ID
+        """
+        return True
+
     async def _heartbeat_sender(self):
         """
         心跳包发送器
@@ -185,17 +434,43 @@ class DGLabWSServer:
         注意此处 ``client_id`` 为心跳包接收方 ID，``target_id`` 为绑定方
         """
         while True:
-            for uuid, websocket in self._uuid_to_ws.items():
-                await self._send(
-                    WebSocketMessage(
-                        type=MessageType.HEARTBEAT,
-                        client_id=uuid,
-                        target_id=self._client_id_to_target_id.get(uuid),
-                        message=RetCode.SUCCESS
-                    ),
-                    websocket
-                )
-            await asyncio.sleep(self._heartbeat_interval)
+            self._last_heartbeat_stats = await self._heartbeat_sweep()
+            await asyncio.sleep(
+                max(0.0, self._heartbeat_interval - self._last_heartbeat_stats.duration)
+            )
+
+    async def _heartbeat_sweep(self) -> HeartbeatStats:
+        """
+        向当前所有连接发送一轮心跳包
+
+        先对连接进行快照，再以有限的并发数发送，单个连接发送缓慢不会阻塞其他连接
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        connections = list(self._uuid_to_ws.items())
+        client_id_to_target_id = self._client_id_to_target_id
+        timeout = self._heartbeat_timeout if self._heartbeat_timeout is not None else self._heartbeat_interval
+        stats = HeartbeatStats(duration=0.0, connections=len(connections), sent=0, timed_out=0, failed=0)
+        connection_iter = iter(connections)
+
+        async def worker():
+            # 各个 worker 共享同一个迭代器，从而限制并发数
+            for uuid, websocket in connection_iter:
+                target_id = client_id_to_target_id.get(uuid)
+                raw_message = (f"{_HEARTBEAT_HEAD}{uuid}{_HEARTBEAT_MIDDLE}"
+                               f"{target_id if target_id is not None else ''}{_HEARTBEAT_TAIL}")
+                try:
+                    await asyncio.wait_for(websocket.send(raw_message), timeout)
+                except asyncio.TimeoutError:
+                    stats.timed_out += 1
+                except ConnectionClosed:
+                    stats.failed += 1
+                else:
+                    stats.sent += 1
+
+        await asyncio.gather(*(worker() for _ in range(max(1, min(self._heartbeat_concurrency, len(connections))))))
+        stats.duration = loop.time() - start
+        return stats
 
     async def _ws_handler(self, websocket: WebSocketServerProtocol):
         """
@@ -203,8 +478,10 @@ class DGLabWSServer:
         """
         new_connect_callbacks, disconnect_callbacks = self._connection_callbacks
         # 登记 WebSocket 客户端
-        uuid = uuid4()
+        uuid = self._new_uuid()
         self._uuid_to_ws[uuid] = websocket
+        if self._send_queue_size is not None:
+            self._ws_to_send_queue[websocket] = _SendQueue(websocket, self._send_queue_size, self._send_queue_policy)
         await self._send(
             WebSocketMessage(
                 type=MessageType.BIND,
@@ -224,8 +501,10 @@ class DGLabWSServer:
         # 响应消息
         try:
             async for message in websocket:
+                if self._relay_mode and await self._relay(message, websocket):
+                    continue
                 try:
-                    parsed_message = WebSocketMessage.model_validate_json(message)
+                    parsed_message = decode_message(message)
                 except ValueError:
                     await self._send(
                         WebSocketMessage(
@@ -240,8 +519,29 @@ class DGLabWSServer:
             pass
 
         # 掉线处理
-        # 与官方标准相比，补充了解绑操作
         self._uuid_to_ws.pop(uuid)
+        if (send_queue := self._ws_to_send_queue.pop(websocket, None)) is not None:
+            send_queue.close()
+        await self._handle_disconnect(uuid)
+
+        # 回调函数
+        if disconnect_callbacks:
+            for callback in disconnect_callbacks:
+                callback_ret = callback(uuid, websocket)
+                if isinstance(callback_ret, Coroutine):
+                    await callback_ret
+
+    def _new_uuid(self) -> UUID4:
+        """生成新的终端 / App ID"""
+        return uuid4()
+
+    async def _handle_disconnect(self, uuid: UUID4):
+        """
+        WebSocket 连接断开后，解除绑定关系并通知对方
+
+        :param uuid: 已断开连接的终端 / App ID
+        """
+        # 与官方标准相比，补充了解绑操作
         # 第三方终端掉线
         if notice_id := self._client_id_to_target_id.get(uuid):
             self._client_id_to_target_id.pop(uuid)
@@ -265,18 +565,43 @@ class DGLabWSServer:
         else:
             message = None
         if message is not None:
-            await self._send(
-                message,
-                notice_ws := self._uuid_to_ws.get(notice_id),
-                to_local_client=notice_ws is None
-            )
+            await self._deliver(message, notice_id)
 
-        # 回调函数
-        if disconnect_callbacks:
-            for callback in disconnect_callbacks:
-                callback_ret = callback(uuid, websocket)
-                if isinstance(callback_ret, Coroutine):
-                    await callback_ret
+    async def _relay(self, raw_message: Union[str, bytes], websocket: WebSocketServerProtocol) -> bool:
+        """
+        转发模式下，将已绑定双方之间的 ``msg`` 消息原样转发给对方连接
+
+        :param raw_message: 收到的原始消息
+        :param websocket: 消息来源连接
+        :return: 是否已完成转发，返回 ``False`` 时需要按完整流程处理该消息
+        """
+        if self._message_type_to_callbacks[MessageType.MSG]:
+            return False
+        route = _scan_route(raw_message)
+        if route is None or route[0] != MessageType.MSG.value:
+            return False
+        _, raw_client_id, raw_target_id = route
+        try:
+            client_id = UUID(raw_client_id)
+            target_id = UUID(raw_target_id)
+        except ValueError:
+            return False
+        if self._client_id_to_target_id.get(client_id) != target_id:
+            return False
+
+        client_ws = self._uuid_to_ws.get(client_id)
+        target_ws = self._uuid_to_ws.get(target_id)
+        if websocket is target_ws:
+            peer_ws = client_ws
+        elif websocket is client_ws:
+            peer_ws = target_ws
+        else:
+            return False
+        # 对方为本地终端时，需要解析后放入消息队列
+        if peer_ws is None:
+            return False
+        await self._send_raw(raw_message, peer_ws)
+        return True
 
     async def _message_handler(
             self,
@@ -374,16 +699,14 @@ class DGLabWSServer:
                     to_local_client=websocket is None
                 )
             # 进行转发
-            elif (target_ws := self._uuid_to_ws[message.target_id]) == websocket:
-                client_ws = self._uuid_to_ws.get(message.client_id)
-                await self._send(
-                    msg_to_send,
-                    client_ws,
-                    to_local_client=client_ws is None
-                )
+            elif websocket is not None and self._uuid_to_ws.get(message.target_id) == websocket:
+                await self._deliver(msg_to_send, message.client_id)
             else:
-                await self._send(msg_to_send, target_ws)
+                await self._deliver(msg_to_send, message.target_id)
 
+            # 回调函数由终端所属的服务端调用
+            if not self._is_local(message.client_id):
+                return
             if callback_set := self._message_type_to_callbacks.get(MessageType.MSG):
                 for callback in callback_set:
                     callback_ret = callback(message, msg_to_send.message != RetCode.INCOMPATIBLE_RELATIONSHIP)
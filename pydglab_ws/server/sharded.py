@@ -0,0 +1,492 @@
+"""
+多进程 DG-Lab WebSocket 服务端
+
+多个 worker 进程通过 ``SO_REUSEPORT`` 监听同一端口，终端与 App 连接到不同 worker 时，
+通过 Unix Socket 总线在 worker 之间转发 ``bind``, ``msg``, ``break`` 消息。
+跨 worker 的关系绑定等待超时时，向终端所在的 worker 撤销该绑定，超时后才到达的绑定结果将被忽略。
+"""
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+from typing import Optional, Dict, Callable, Coroutine, Any, Tuple, List, Union, Sequence, Set
+from uuid import UUID, uuid4
+
+from pydantic import UUID4
+from websockets import WebSocketServerProtocol
+
+from .server import DGLabWSServer
+from ..codec import encode_message, decode_message
+from ..enums import MessageType, MessageDataHead, RetCode
+from ..models import WebSocketMessage
+
+__all__ = ("DGLabShardedWSServer",)
+
+logger = logging.getLogger(__name__)
+
+_BUS_READER_LIMIT = 2 ** 20
+"""总线单条消息的最大长度"""
+_READY_POLL_INTERVAL = 0.1
+"""等待 worker 启动时检查进程是否存活的间隔（秒）"""
+
+
+class _ShardBus:
+    """
+    worker 之间的消息总线
+
+    每个 worker 监听一个 Unix Socket，向其他 worker 发送时按需建立连接并复用，
+    消息为按行分隔的 JSON，同一对 worker 之间的消息保持顺序
+
+    :param index: 本 worker 序号
+    :param bus_dir: Unix Socket 文件所在目录
+    :param handler: 收到消息时调用的协程函数
+    """
+
+    def __init__(
+            self,
+            index: int,
+            bus_dir: str,
+            handler: Callable[[Dict[str, Any]], Coroutine[Any, Any, None]]
+    ):
+        self._index = index
+        self._bus_dir = bus_dir
+        self._handler = handler
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writers: Dict[int, asyncio.StreamWriter] = {}
+        self._connect_locks: Dict[int, asyncio.Lock] = {}
+        self._reader_tasks: Set[asyncio.Task] = set()
+
+    def _path(self, index: int) -> str:
+        return os.path.join(self._bus_dir, f"worker-{index}.sock")
+
+    async def start(self):
+        """开始监听"""
+        self._server = await asyncio.start_unix_server(
+            self._on_connection,
+            path=self._path(self._index),
+            limit=_BUS_READER_LIMIT
+        )
+
+    async def close(self):
+        """关闭监听与所有连接"""
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for task in self._reader_tasks:
+            task.cancel()
+        await asyncio.gather(*self._reader_tasks, return_exceptions=True)
+
+    async def _on_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._reader_tasks.add(task)
+        try:
+            while line := await reader.readline():
+                try:
+                    await self._handler(json.loads(line))
+                except Exception as e:
+                    # 单条消息处理失败（例如接收方已断开）不影响后续消息
+                    logger.warning(f"Shard worker {self._index} 处理总线消息失败: {type(e).__name__}: {e}")
+        finally:
+            self._reader_tasks.discard(task)
+            writer.close()
+
+    async def _get_writer(self, index: int, retry_interval: float = 0.05, retries: int = 100):
+        if (writer := self._writers.get(index)) is not None and not writer.is_closing():
+            return writer
+        async with self._connect_locks.setdefault(index, asyncio.Lock()):
+            if (writer := self._writers.get(index)) is not None and not writer.is_closing():
+                return writer
+            # 对方 worker 可能仍在启动中
+            for _ in range(retries):
+                try:
+                    _, writer = await asyncio.open_unix_connection(self._path(index))
+                except (FileNotFoundError, ConnectionRefusedError):
+                    await asyncio.sleep(retry_interval)
+                else:
+                    self._writers[index] = writer
+                    return writer
+            raise ConnectionRefusedError(f"Shard worker {index} is not reachable")
+
+    async def send(self, index: int, frame: Dict[str, Any]):
+        """
+        向指定 worker 发送消息
+
+        :param index: 目标 worker 序号
+        :param frame: 消息内容，需要能被 JSON 序列化
+        """
+        writer = await self._get_writer(index)
+        writer.write(json.dumps(frame, separators=(",", ":")).encode() + b"\n")
+        await writer.drain()
+
+
+class _ShardWorkerServer(DGLabWSServer):
+    """
+    分片模式下单个 worker 进程中的服务端
+
+    终端 / App ID 的第一个字节为分配该 ID 的 worker 序号，据此判断对方所在的 worker
+
+    :param index: 本 worker 序号
+    :param worker_count: worker 总数
+    :param bus_dir: 总线 Unix Socket 文件所在目录
+    :param bind_timeout: 跨 worker 关系绑定的等待超时时间（秒）
+    """
+
+    def __init__(
+            self,
+            index: int,
+            worker_count: int,
+            bus_dir: str,
+            host: Union[str, Sequence[str]],
+            port: Optional[int] = None,
+            heartbeat_interval: float = None,
+            bind_timeout: float = 5.0,
+            **kwargs
+    ):
+        super().__init__(host, port, heartbeat_interval, **kwargs)
+        self._index = index
+        self._worker_count = worker_count
+        self._bind_timeout = bind_timeout
+        self._bus = _ShardBus(index, bus_dir, self._handle_bus_frame)
+        self._pending_binds: Dict[Tuple[str, str, str], asyncio.Future] = {}
+        """(终端 ID, App ID, 绑定请求 ID) 到等待绑定结果的 Future 的映射"""
+
+    @property
+    def index(self) -> int:
+        """本 worker 序号"""
+        return self._index
+
+    async def __aenter__(self) -> "_ShardWorkerServer":
+        await self._bus.start()
+        await super().__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await super().__aexit__(exc_type, exc_val, exc_tb)
+        await self._bus.close()
+
+    def _owner(self, uuid: UUID4) -> int:
+        """分配该 ID 的 worker 序号"""
+        return uuid.bytes[0] % self._worker_count
+
+    def _new_uuid(self) -> UUID4:
+        return UUID(bytes=bytes((self._index,)) + uuid4().bytes[1:], version=4)
+
+    def _is_local(self, uuid: UUID4) -> bool:
+        return self._owner(uuid) == self._index
+
+    async def _deliver(self, message: WebSocketMessage, uuid: UUID4):
+        if self._is_local(uuid):
+            await super()._deliver(message, uuid)
+        else:
+            await self._bus.send(
+                self._owner(uuid),
+                {"op": "deliver", "to": str(uuid), "message": encode_message(message)}
+            )
+
+    async def _run_callbacks(self, message_type: MessageType, message: WebSocketMessage, success: bool):
+        for callback in self._message_type_to_callbacks[message_type]:
+            callback_ret = callback(message, success)
+            if isinstance(callback_ret, Coroutine):
+                await callback_ret
+
+    @staticmethod
+    async def _handle_bind(
+            self: "_ShardWorkerServer",
+            message: WebSocketMessage,
+            websocket: WebSocketServerProtocol = None
+    ):
+        """
+        响应关系绑定（``bind`` 类型）消息，终端位于其他 worker 时向其发起绑定请求
+        """
+        if message.message != MessageDataHead.DG_LAB \
+                or message.client_id is None \
+                or message.target_id is None:
+            return
+        if self._is_local(message.client_id):
+            await DGLabWSServer._handle_bind(self, message, websocket)
+            return
+
+        # App 需要连接在本 worker 上，且未被绑定
+        if message.target_id not in self._uuid_to_ws:
+            code = RetCode.TARGET_CLIENT_NOT_FOUND
+        elif message.target_id in self._target_id_to_client_id \
+                or any(target_id == str(message.target_id) for _, target_id, _ in self._pending_binds):
+            code = RetCode.ID_ALREADY_BOUND
+        else:
+            code = None
+
+        # 绑定请求 ID 区分同一对终端与 App 的多次绑定，超时后才到达的结果不会被当作之后请求的结果
+        key = (str(message.client_id), str(message.target_id), uuid4().hex)
+        future = self._pending_binds[key] = asyncio.get_running_loop().create_future()
+        try:
+            await self._bus.send(
+                self._owner(message.client_id),
+                {"op": "bind", "client_id": key[0], "target_id": key[1], "bind_id": key[2], "code": code}
+            )
+            code = RetCode(await asyncio.wait_for(future, self._bind_timeout))
+        except asyncio.TimeoutError:
+            code = RetCode.SERVER_INTERNAL_ERROR
+            # 终端所在的 worker 可能在超时后才完成绑定，撤销该绑定使双方状态与回复给 App 的结果一致
+            try:
+                await self._bus.send(
+                    self._owner(message.client_id),
+                    {"op": "unbind", "client_id": key[0], "target_id": key[1]}
+                )
+            except ConnectionError:
+                pass
+        except ConnectionError:
+            code = RetCode.SERVER_INTERNAL_ERROR
+        finally:
+            self._pending_binds.pop(key, None)
+
+        if code == RetCode.SUCCESS:
+            self._client_id_to_target_id[message.client_id] = message.target_id
+            self._target_id_to_client_id[message.target_id] = message.client_id
+        msg_to_send = message.model_copy()
+        msg_to_send.message = code
+        await self._send(msg_to_send, websocket)
+
+    async def _handle_bus_frame(self, frame: Dict[str, Any]):
+        """处理来自其他 worker 的消息"""
+        op = frame["op"]
+        if op == "deliver":
+            await self._handle_bus_deliver(UUID(frame["to"]), decode_message(frame["message"]))
+        elif op == "bind":
+            await self._handle_bus_bind(
+                UUID(frame["client_id"]), UUID(frame["target_id"]), frame["bind_id"], frame["code"]
+            )
+        elif op == "bind_result":
+            future = self._pending_binds.get((frame["client_id"], frame["target_id"], frame["bind_id"]))
+            if future is not None and not future.done():
+                future.set_result(frame["code"])
+        elif op == "unbind":
+            await self._handle_bus_unbind(UUID(frame["client_id"]), UUID(frame["target_id"]))
+
+    async def _handle_bus_deliver(self, uuid: UUID4, message: WebSocketMessage):
+        """投递其他 worker 转发来的消息"""
+        # 对方掉线，同步解除绑定关系
+        if message.type == MessageType.BREAK \
+                and self._client_id_to_target_id.get(message.client_id) == message.target_id:
+            self._client_id_to_target_id.pop(message.client_id)
+            self._target_id_to_client_id.pop(message.target_id)
+        await DGLabWSServer._deliver(self, message, uuid)
+        if message.type == MessageType.MSG and self._is_local(message.client_id):
+            await self._run_callbacks(MessageType.MSG, message, True)
+
+    async def _handle_bus_bind(self, client_id: UUID4, target_id: UUID4, bind_id: str, code: Optional[int]):
+        """处理其他 worker 上的 App 对本 worker 终端发起的关系绑定"""
+        client_exists = client_id in self._uuid_to_ws or client_id in self._client_id_to_queue
+        if code is None:
+            if not client_exists:
+                code = RetCode.TARGET_CLIENT_NOT_FOUND
+            elif client_id in self._client_id_to_target_id:
+                code = RetCode.ID_ALREADY_BOUND
+            else:
+                self._client_id_to_target_id[client_id] = target_id
+                self._target_id_to_client_id[target_id] = client_id
+                code = RetCode.SUCCESS
+        code = RetCode(code)
+
+        # 先回复 App 所在的 worker，保证之后经总线发往 App 的消息晚于绑定结果
+        await self._bus.send(
+            self._owner(target_id),
+            {
+                "op": "bind_result",
+                "client_id": str(client_id),
+                "target_id": str(target_id),
+                "bind_id": bind_id,
+                "code": code.value
+            }
+        )
+        if client_exists:
+            await DGLabWSServer._deliver(
+                self,
+                WebSocketMessage(type=MessageType.BIND, client_id=client_id, target_id=target_id, message=code),
+                client_id
+            )
+        await self._run_callbacks(
+            MessageType.BIND,
+            WebSocketMessage(
+                type=MessageType.BIND,
+                client_id=client_id,
+                target_id=target_id,
+                message=MessageDataHead.DG_LAB
+            ),
+            code == RetCode.SUCCESS
+        )
+
+    async def _handle_bus_unbind(self, client_id: UUID4, target_id: UUID4):
+        """App 所在的 worker 等待绑定结果超时，撤销已完成的绑定并通知终端"""
+        if self._client_id_to_target_id.get(client_id) != target_id:
+            return
+        self._client_id_to_target_id.pop(client_id)
+        self._target_id_to_client_id.pop(target_id)
+        await DGLabWSServer._deliver(
+            self,
+            WebSocketMessage(
+                type=MessageType.BREAK,
+                client_id=client_id,
+                target_id=target_id,
+                message=RetCode.CLIENT_DISCONNECTED
+            ),
+            client_id
+        )
+
+
+async def _run_worker(
+        index: int,
+        worker_count: int,
+        bus_dir: str,
+        host: Union[str, Sequence[str]],
+        port: int,
+        heartbeat_interval: Optional[float],
+        worker_setup: Optional[Callable[[DGLabWSServer], Coroutine[Any, Any, Any]]],
+        ready_event,
+        kwargs: Dict[str, Any]
+):
+    async with _ShardWorkerServer(
+            index,
+            worker_count,
+            bus_dir,
+            host,
+            port,
+            heartbeat_interval,
+            reuse_port=True,
+            **kwargs
+    ) as server:
+        if worker_setup is not None:
+            await worker_setup(server)
+        ready_event.set()
+        await asyncio.Future()
+
+
+def _worker_main(*args):
+    """worker 进程入口"""
+    try:
+        asyncio.run(_run_worker(*args))
+    except KeyboardInterrupt:
+        pass
+
+
+class DGLabShardedWSServer:
+    """
+    多进程 DG-Lab WebSocket 服务端
+
+    启动 ``workers`` 个 worker 进程，每个进程运行一个 [`DGLabWSServer`][pydglab_ws.server.server.DGLabWSServer]，
+    通过 ``SO_REUSEPORT`` 监听同一端口，由系统内核分配连接。
+    终端与 App 位于不同 worker 时，``bind``, ``msg``, ``break`` 消息通过 Unix Socket 总线转发。
+
+    回调函数与本地终端需要在 ``worker_setup`` 中对各个 worker 的服务端进行设置，
+    回调函数只会在终端所在的 worker 中调用。
+
+    仅支持提供 ``SO_REUSEPORT`` 与 Unix Socket 的平台（Linux, macOS, BSD）
+
+    示例：
+    ```python3
+    async def setup(server: DGLabWSServer):
+        server.add_receive_callback(MessageType.MSG, print)
+
+    async with DGLabShardedWSServer("0.0.0.0", 5678, workers=4, worker_setup=setup):
+        await asyncio.Future()
+    ```
+
+    :param host: WebSocket 服务器绑定的接口
+    :param port: 监听端口
+    :param workers: worker 进程数，默认为 CPU 核心数
+    :param heartbeat_interval: 心跳包发送间隔（秒）
+    :param worker_setup: 在每个 worker 进程中、服务端启动后调用的协程函数，传入该 worker 的服务端，
+        需要能被 ``pickle`` 序列化（例如模块级函数）
+    :param start_timeout: 等待所有 worker 启动 (包括 ``worker_setup`` 完成) 的超时时间（秒）
+    :param kwargs: worker 中 [`DGLabWSServer`][pydglab_ws.server.server.DGLabWSServer] 的其他参数
+    """
+
+    def __init__(
+            self,
+            host: Union[str, Sequence[str]],
+            port: int,
+            workers: Optional[int] = None,
+            heartbeat_interval: float = None,
+            worker_setup: Optional[Callable[[DGLabWSServer], Coroutine[Any, Any, Any]]] = None,
+            start_timeout: float = 30.0,
+            **kwargs
+    ):
+        self._host = host
+        self._port = port
+        self._workers = workers or os.cpu_count() or 1
+        if not 0 < self._workers <= 256:
+            raise ValueError(f"Invalid number of workers: {self._workers}")
+        self._heartbeat_interval = heartbeat_interval
+        self._worker_setup = worker_setup
+        self._start_timeout = start_timeout
+        self._kwargs = kwargs
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: List[multiprocessing.Process] = []
+        self._bus_dir: Optional[str] = None
+
+    @property
+    def workers(self) -> int:
+        """worker 进程数"""
+        return self._workers
+
+    @property
+    def processes(self) -> List[multiprocessing.Process]:
+        """所有 worker 进程"""
+        return self._processes.copy()
+
+    async def __aenter__(self) -> "DGLabShardedWSServer":
+        self._bus_dir = tempfile.mkdtemp(prefix="pydglab-ws-")
+        ready_events = []
+        for index in range(self._workers):
+            ready_event = self._context.Event()
+            process = self._context.Process(
+                target=_worker_main,
+                args=(
+                    index,
+                    self._workers,
+                    self._bus_dir,
+                    self._host,
+                    self._port,
+                    self._heartbeat_interval,
+                    self._worker_setup,
+                    ready_event,
+                    self._kwargs
+                ),
+                daemon=True
+            )
+            process.start()
+            self._processes.append(process)
+            ready_events.append(ready_event)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._start_timeout
+        try:
+            for process, ready_event in zip(self._processes, ready_events):
+                # 分段等待，worker 在启动中退出时立即失败，而不必等到超时
+                while not await loop.run_in_executor(None, ready_event.wait, _READY_POLL_INTERVAL):
+                    if not process.is_alive():
+                        raise RuntimeError(
+                            f"Shard worker {process.name} exited during startup with code {process.exitcode}"
+                        )
+                    if loop.time() >= deadline:
+                        raise TimeoutError("Shard workers failed to start")
+        except BaseException:
+            await self.__aexit__(None, None, None)
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        loop = asyncio.get_running_loop()
+        for process in self._processes:
+            process.terminate()
+        for process in self._processes:
+            await loop.run_in_executor(None, process.join)
+        self._processes.clear()
+        if self._bus_dir is not None:
+            shutil.rmtree(self._bus_dir, ignore_errors=True)
+            self._bus_dir = None
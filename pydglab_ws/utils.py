@@ -2,6 +2,8 @@
 此处提供一些工具函数
 """
 import json
+from itertools import chain
+from typing import Union, Iterable, Sequence, List, Any
 
 from pydantic import UUID4
 
@@ -17,6 +19,7 @@ __all__ = (
     "dump_strength_operation",
     "parse_strength_data",
     "dump_add_pulses",
+    "dump_add_pulses_chunked",
     "dump_clear_pulses",
     "parse_feedback_data"
 )
@@ -100,19 +103,68 @@ def dump_pulse_operation(pulse: PulseOperation) -> str:
     :raise InvalidPulseOperation: [`InvalidPulseOperation`][pydglab_ws.exceptions.InvalidPulseOperation]
     """
     try:
-        pulse_bytes = bytes().join(
-            # int.to_bytes Python 3.11 才添加了 length, byteorder 的默认参数值
-            value.to_bytes(
-                length=1,
-                byteorder='big'
-            ) for operation in pulse for value in operation
-        )
-    except (TypeError, AttributeError, OverflowError) as e:
+        # bytes() 在一次遍历中完成所有数值的类型与范围检查
+        pulse_bytes = bytes(chain.from_iterable(pulse))
+    except (TypeError, ValueError) as e:
         raise InvalidPulseOperation(pulse) from e
     else:
         return pulse_bytes.hex()
 
 
+def _format_add_pulses(channel: Channel, pulses_bytes: Union[bytes, memoryview]) -> str:
+    """由每 8 字节一条的波形数据生成下放波形操作的数据"""
+    if not pulses_bytes:
+        return f"{MessageDataHead.PULSE.value}-{channel.name}:[]"
+    # bytes.hex 的分隔符只能为单个字符，先以 "," 分隔再替换为 '","'
+    items = pulses_bytes.hex(",", -8).replace(",", '","')
+    return f'{MessageDataHead.PULSE.value}-{channel.name}:["{items}"]'
+
+
+def _pulses_to_bytes(pulses: Union[Iterable[PulseOperation], Iterable[Sequence[int]], Any]) -> memoryview:
+    """
+    将波形操作数据序列转换为每 8 字节一条的连续数据
+
+    :raise InvalidPulseOperation: [`InvalidPulseOperation`][pydglab_ws.exceptions.InvalidPulseOperation]
+    """
+    # 支持缓冲区协议的 uint8 数据（bytes, bytearray, array("B"), N×8 的 numpy.uint8 数组等）无需复制
+    try:
+        view = memoryview(pulses)
+    except TypeError:
+        pass
+    else:
+        if view.format in ("B", "c") and view.c_contiguous:
+            view = view.cast("B")
+            if len(view) % 8:
+                raise InvalidPulseOperation(pulses)
+            return view
+        pulses = view.tolist()
+
+    pulses = pulses if isinstance(pulses, Sequence) else list(pulses)
+    if not pulses:
+        return memoryview(b"")
+    try:
+        # 由第一条数据判断是 PulseOperation 序列还是 N×8 的数值序列
+        first_value = pulses[0][0]
+        if isinstance(first_value, (bytes, str)) or hasattr(first_value, "__iter__"):
+            values = chain.from_iterable(chain.from_iterable(pulses))
+        else:
+            values = chain.from_iterable(pulses)
+        pulses_bytes = bytes(values)
+    except (TypeError, ValueError, IndexError, KeyError):
+        pulses_bytes = None
+    if pulses_bytes is None or len(pulses_bytes) != 8 * len(pulses):
+        # 出错时才逐条检查，找出不合法的数据
+        for pulse in pulses:
+            try:
+                flat = bytes(chain.from_iterable(pulse)) if hasattr(pulse[0], "__iter__") else bytes(pulse)
+            except (TypeError, ValueError, IndexError, KeyError) as e:
+                raise InvalidPulseOperation(pulse) from e
+            if len(flat) != 8:
+                raise InvalidPulseOperation(pulse)
+        raise InvalidPulseOperation(pulses)
+    return memoryview(pulses_bytes)
+
+
 def dump_add_pulses(
         channel: Channel,
         *pulses: PulseOperation
@@ -128,8 +180,42 @@ def dump_add_pulses(
     """
     if (pulses_length := len(pulses)) > PULSE_DATA_MAX_LENGTH:
         raise PulseDataTooLong(pulses_length)
-    return (f"{MessageDataHead.PULSE.value}-{channel.name}"
-            f":{json.dumps([dump_pulse_operation(pulse) for pulse in pulses], separators=(',', ':'))}")
+    return _format_add_pulses(channel, _pulses_to_bytes(pulses))
+
+
+def dump_add_pulses_chunked(
+        channel: Channel,
+        pulses: Union[Iterable[PulseOperation], Iterable[Sequence[int]], bytes, bytearray, memoryview],
+        chunk_size: int = PULSE_DATA_MAX_LENGTH
+) -> List[str]:
+    """
+    生成下放波形操作的数据，波形操作数据过长时自动拆分为多条，每条都不超过 WebSocket 消息的长度限制
+
+    示例：
+    ```python3
+    for message in dump_add_pulses_chunked(Channel.A, pulses):
+        await websocket.send(message)
+    ```
+
+    :param channel: 通道选择
+    :param pulses: 波形操作数据，可以是 ``PulseOperation`` 序列、每条 8 个数值的序列（N×8），
+        或每 8 字节一条的 uint8 连续数据（``bytes``, ``bytearray``, ``array("B")``, N×8 的 ``numpy.uint8`` 数组等）
+    :param chunk_size: 每条数据中波形操作数据的最大条数，不超过
+        [`PULSE_DATA_MAX_LENGTH`][pydglab_ws.utils.PULSE_DATA_MAX_LENGTH]
+    :return: 每条均可作为 WebSocket 消息中的 ``message``
+    :raise InvalidPulseOperation: [`InvalidPulseOperation`][pydglab_ws.exceptions.InvalidPulseOperation]
+    :raise PulseDataTooLong: ``chunk_size`` 超过 [`PULSE_DATA_MAX_LENGTH`][pydglab_ws.utils.PULSE_DATA_MAX_LENGTH]
+    """
+    if chunk_size > PULSE_DATA_MAX_LENGTH:
+        raise PulseDataTooLong(chunk_size)
+    if chunk_size <= 0:
+        raise ValueError(f"Invalid chunk size: {chunk_size}")
+    pulses_bytes = _pulses_to_bytes(pulses)
+    step = chunk_size * 8
+    return [
+        _format_add_pulses(channel, pulses_bytes[start:start + step])
+        for start in range(0, len(pulses_bytes), step)
+    ]
 
 
 def dg_lab_client_qrcode(uri: str, client_id: UUID4) -> str:
@@ -1,8 +1,15 @@
+import argparse
+import hashlib
 import itertools
 import json
 import math
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Tuple, Any
+from typing import List, Tuple, Any, Dict, Optional, Callable
 
 from pydantic import BaseModel, RootModel, field_validator
 
@@ -128,6 +135,16 @@ def parse_frequency(data: int) -> int:
     return round(frequency_value - (accumulate - data) * multiple)
 
 
+FREQUENCY_TABLE = [ms_to_frequency(parse_frequency(data)) for data in range(84)]
+"""App 中脉冲频率参数 (0-83) 对应的波形频率"""
+
+
+def get_frequency(data: int) -> int:
+    if 0 <= data < len(FREQUENCY_TABLE):
+        return FREQUENCY_TABLE[data]
+    return ms_to_frequency(parse_frequency(data))
+
+
 def parse_part_time(data: int) -> int:
     known_data_to_value = {
         0: 0.1,
@@ -160,128 +177,70 @@ def parse_strength_data(data: float) -> int:
     return round((100 / 20) * data)
 
 
-def get_each_x_y(x_range: Tuple[int, int], y_range: Tuple[float, float]) -> List[Tuple[int, float]]:
-    x_start, x_end = x_range
-    y_start, y_end = y_range
-
-    results = {}
-    for x in range(x_end - 1):
-        y = y_start + (y_end - y_start) * (x - x_start) / (x_end - x_start)
-        results[x] = y
-    results[x_end - 1] = y_end
-
-    return list(results.items())
+def ramp(length: int, start: float, end: float) -> List[int]:
+    """
+    从 ``start`` 到 ``end`` 线性插值生成 ``length`` 个取整后的值，最后一个值固定为 ``end``
 
+    ``length`` 不大于 1 时只有 ``end`` 一个值
+    """
+    if length <= 1:
+        return [round(end)]
+    delta = end - start
+    values = [round(start + delta * x / length) for x in range(length - 1)]
+    values.append(round(end))
+    return values
 
-def generate_static_frequency(point_num: int, ax: int, _: int, __: int) -> List[Tuple[int, ...]]:
-    frequency = ms_to_frequency(parse_frequency(ax))
-    return [
-        tuple(frequency for _ in range(4)) for __ in range(point_num)
-    ]
 
-
-def generate_part_frequency(point_num: int, ax: int, bx: int, _: int) -> List[Tuple[int, ...]]:
-    frequency_a = ms_to_frequency(parse_frequency(ax))
-    frequency_b = ms_to_frequency(parse_frequency(bx))
-    frequencies = list(
-        map(
-            lambda x: round(x[1]),
-            get_each_x_y(
-                (0, point_num * 4),
-                (frequency_a, frequency_b)
-            )
-        )
-    )
-    return [
-        tuple(frequencies[i:i + 4]) for i in range(0, len(frequencies), 4)
-    ]
-
-
-def generate_inside_point_frequency(point_num: int, ax: int, _: int, cx: int) -> List[Tuple[int, ...]]:
-    frequency_a = ms_to_frequency(parse_frequency(ax))
-    frequency_c = ms_to_frequency(parse_frequency(cx))
-    frequencies_inside_point = list(
-        map(
-            lambda x: round(x[1]),
-            get_each_x_y(
-                (0, 4),
-                (frequency_a, frequency_c)
-            )
-        )
-    )
-    return [
-        tuple(frequency for frequency in frequencies_inside_point) for __ in range(point_num)
-    ]
-
-
-def generate_point_each_frequency(point_num: int, ax: int, _: int, cx: int) -> List[Tuple[int, ...]]:
-    frequency_a = ms_to_frequency(parse_frequency(ax))
-    frequency_c = ms_to_frequency(parse_frequency(cx))
-    frequencies_for_points = list(
-        map(
-            lambda x: round(x[1]),
-            get_each_x_y(
-                (0, point_num),
-                (frequency_a, frequency_c)
-            )
-        )
-    )
-    return [
-        tuple(frequency for _ in range(4)) for frequency in frequencies_for_points
-    ]
+def pack(values: List[int]) -> List[Tuple[int, ...]]:
+    """每 4 个值打包为一个元组，不足 4 个的剩余值打包为最后一个元组"""
+    full_length = len(values) - len(values) % 4
+    packed = list(zip(*[iter(values[:full_length])] * 4))
+    if full_length < len(values):
+        packed.append(tuple(values[full_length:]))
+    return packed
 
 
 def generate_frequency(pcx: int, point_num: int, ax: int, bx: int, cx: int) -> List[Tuple[int, ...]]:
-    type_to_func = {
-        1: generate_static_frequency,
-        2: generate_part_frequency,
-        3: generate_inside_point_frequency,
-        4: generate_point_each_frequency
-    }
-    return type_to_func[pcx](point_num, ax, bx, cx)
-
-
-def generate_strength_from_strength(strength: List[int]) -> List[Tuple[int, ...]]:
-    return [
-        tuple(strength[i:i + 4]) for i in range(0, len(strength), 4)
-    ]
+    """
+    生成每个点的频率
+
+    | PCX | 频率变化规律 |
+    |-----|-------------|
+    | 1   | 固定为 AX |
+    | 2   | 整个小节内从 AX 渐变到 BX |
+    | 3   | 每个点内从 AX 渐变到 CX |
+    | 4   | 逐点从 AX 渐变到 CX |
+    """
+    frequency_a = get_frequency(ax)
+    if pcx == 1:
+        return [(frequency_a,) * 4] * point_num
+    elif pcx == 2:
+        return pack(ramp(point_num * 4, frequency_a, get_frequency(bx)))
+    elif pcx == 3:
+        return [tuple(ramp(4, frequency_a, get_frequency(cx)))] * point_num
+    elif pcx == 4:
+        return [(frequency,) * 4 for frequency in ramp(point_num, frequency_a, get_frequency(cx))]
+    raise KeyError(pcx)
 
 
 def generate_strength(point_datas: List[PointData]) -> List[Tuple[int, ...]]:
+    """生成强度，锚点保持该点的强度，其余点从上一个点的强度渐变而来"""
+    strengths = [parse_strength_data(point.y) for point in point_datas]
     strength_data = []
     for index, point in enumerate(point_datas):
-        index: int
-        point: PointData
-        current_strength = parse_strength_data(point.y)
         if point.anchor:
-            strength_data.append(
-                tuple(current_strength for _ in range(4))
-            )
+            strength_data.append((strengths[index],) * 4)
         else:
-            last_point = point_datas[index - 1]
-            last_strength = parse_strength_data(last_point.y)
             strength_data.extend(
-                generate_strength_from_strength(
-                    list(
-                        map(
-                            lambda x: round(x[1]),
-                            get_each_x_y(
-                                (0, (point.x - last_point.x) * 4),
-                                (last_strength, current_strength)
-                            )
-                        )
-                    )
+                pack(
+                    ramp((point.x - point_datas[index - 1].x) * 4, strengths[index - 1], strengths[index])
                 )
             )
     return strength_data
 
 
 def generate_operations_from_sleep(sleep_time: float) -> List[Tuple[Tuple[int, ...], Tuple[int, ...]]]:
-    return [
-        ((0, 0, 0, 0), (0, 0, 0, 0)) for _ in range(
-            round(sleep_time * 1000 / 100)
-        )
-    ]
+    return [((0, 0, 0, 0), (0, 0, 0, 0))] * round(sleep_time * 1000 / 100)
 
 
 def generate_operations_from_part(
@@ -338,21 +297,215 @@ def generate_result_from_pulse_data(pulse_data: PulseData) -> List[Tuple[Tuple[i
     return operations
 
 
-def main():
-    pulse_datas = read_pulse_data_from_json(
-        Path("appPulseData.json")
-    )
-    custom_pulse_data = {}
+PARALLEL_THRESHOLD = 32
+"""波形数不少于该值时使用进程池编译"""
+
+
+def compile_pulse_datas(
+        pulse_datas: List[PulseData],
+        workers: Optional[int] = None
+) -> Dict[str, List[Tuple[Tuple[int, ...], Tuple[int, ...]]]]:
+    """
+    编译所有波形，波形较多时使用进程池
+
+    :param pulse_datas: App 导出的波形
+    :param workers: 进程数，默认为 CPU 核数，为 1 时不使用进程池
+    :return: 波形名称到波形操作数据的映射，名称重复时保留最后一条
+    """
+    if workers == 1 or len(pulse_datas) < PARALLEL_THRESHOLD:
+        results = map(generate_result_from_pulse_data, pulse_datas)
+        return {pulse_data.BG_waveName: result for pulse_data, result in zip(pulse_datas, results)}
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(
+            generate_result_from_pulse_data,
+            pulse_datas,
+            chunksize=max(1, len(pulse_datas) // (workers * 4))
+        )
+        return {pulse_data.BG_waveName: result for pulse_data, result in zip(pulse_datas, results)}
+
+
+MANIFEST_NAME = ".pulse_manifest.json"
+MANIFEST_VERSION = 1
+CUSTOM_PULSE_DATA_NAME = "customPulseData.json"
+
+
+def source_hash(pulse_data: PulseData) -> str:
+    """波形源数据的哈希"""
+    return hashlib.sha256(pulse_data.model_dump_json().encode("utf-8")).hexdigest()
+
+
+def write_atomic(path: Path, content: str):
+    """先写入临时文件再替换，中途失败不会留下不完整的文件"""
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def read_manifest(output_dir: Path) -> Dict[str, Dict[str, str]]:
+    """读取上次生成的清单，键为 ``BG_pluseID``，不存在或无效时为空"""
+    try:
+        with (output_dir / MANIFEST_NAME).open(encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest["waves"]
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass
+    return {}
+
+
+def read_output(path: Path) -> Optional[List[Any]]:
+    """读取上次生成的波形，不存在或无效时为 ``None``"""
+    try:
+        with path.open(encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+@dataclass
+class BuildResult:
+    """
+    一次生成的结果
+
+    :ivar compiled: 重新编译的波形名称
+    :ivar reused: 未改变而沿用上次输出的波形名称
+    :ivar removed: 已从源数据中删除而被清理输出的波形名称
+    """
+    compiled: List[str] = field(default_factory=list)
+    reused: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.compiled or self.removed)
+
+
+def build(
+        input_path: Path,
+        output_dir: Path,
+        workers: Optional[int] = None,
+        force: bool = False
+) -> BuildResult:
+    """
+    增量生成波形
+
+    清单按 ``BG_pluseID`` 记录每条波形的 ``BG_bg_updateTime`` 与源数据哈希，
+    只重新编译发生变化或输出文件缺失的波形，输出文件均原子写入
+
+    :param input_path: App 导出的波形数据
+    :param output_dir: 输出目录
+    :param workers: 进程数
+    :param force: 是否重新编译所有波形
+    """
+    pulse_datas = read_pulse_data_from_json(input_path)
+    previous = {} if force else read_manifest(output_dir)
+    manifest: Dict[str, Dict[str, str]] = {}
+    custom_pulse_data: Dict[str, Any] = {}
+    result = BuildResult()
+
+    changed = []
     for pulse_data in pulse_datas:
-        result = generate_result_from_pulse_data(pulse_data)
-        with Path(f"{pulse_data.BG_waveName}.json").open("w", encoding="utf-8") as file:
-            json.dump(result, file)
-        custom_pulse_data[pulse_data.BG_waveName] = result
+        entry = {
+            "update_time": pulse_data.BG_bg_updateTime,
+            "hash": source_hash(pulse_data),
+            "wave_name": pulse_data.BG_waveName,
+        }
+        manifest[pulse_data.BG_pluseID] = entry
+        output = None
+        if previous.get(pulse_data.BG_pluseID) == entry:
+            output = read_output(output_dir / f"{pulse_data.BG_waveName}.json")
+        if output is None:
+            changed.append(pulse_data)
+        else:
+            result.reused.append(pulse_data.BG_waveName)
+        custom_pulse_data[pulse_data.BG_waveName] = output
+
+    for wave_name, operations in compile_pulse_datas(changed, workers).items():
+        write_atomic(output_dir / f"{wave_name}.json", json.dumps(operations))
+        custom_pulse_data[wave_name] = operations
+        result.compiled.append(wave_name)
+
+    # 已删除或改名的波形
+    for entry in previous.values():
+        if entry["wave_name"] not in custom_pulse_data and entry["wave_name"] not in result.removed:
+            (output_dir / f"{entry['wave_name']}.json").unlink(missing_ok=True)
+            result.removed.append(entry["wave_name"])
+
+    if result.changed or not (output_dir / CUSTOM_PULSE_DATA_NAME).exists():
+        write_atomic(
+            output_dir / CUSTOM_PULSE_DATA_NAME,
+            json.dumps(custom_pulse_data, indent=4, ensure_ascii=False, cls=CustomPulseDataJSONEncoder)
+        )
+    write_atomic(
+        output_dir / MANIFEST_NAME,
+        json.dumps({"version": MANIFEST_VERSION, "waves": manifest}, indent=2, ensure_ascii=False)
+    )
+    return result
+
+
+def watch(
+        input_path: Path,
+        output_dir: Path,
+        workers: Optional[int] = None,
+        interval: float = 1.0,
+        should_stop: Callable[[], bool] = lambda: False,
+        on_build: Callable[[BuildResult], None] = lambda result: None
+):
+    """
+    监视源数据文件，发生变化时增量生成
 
-    with Path("customPulseData.json").open("w", encoding="utf-8") as f:
-        json.dump(custom_pulse_data, f, indent=4, ensure_ascii=False, cls=CustomPulseDataJSONEncoder)
+    :param interval: 检查文件是否变化的间隔 (秒)
+    :param should_stop: 返回 ``True`` 时停止监视
+    :param on_build: 每次生成后的回调
+    """
+    last_state = None
+    while not should_stop():
+        try:
+            stat = input_path.stat()
+            state = stat.st_mtime_ns, stat.st_size
+        except OSError:
+            state = None
+        if state is not None and state != last_state:
+            last_state = state
+            try:
+                on_build(build(input_path, output_dir, workers))
+            except Exception as e:
+                # 编辑过程中文件可能暂时无效，等待下一次修改
+                print(f"build failed: {type(e).__name__}: {e}")
+        time.sleep(interval)
+
+
+def print_result(result: BuildResult):
+    print(
+        f"{len(result.compiled)} compiled, {len(result.reused)} unchanged, {len(result.removed)} removed"
+        + (f": {', '.join(result.compiled)}" if result.compiled else "")
+    )
 
-    print(custom_pulse_data)
+
+def main(args: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Convert DG-Lab App pulse data into pulse operations")
+    parser.add_argument("--input", type=Path, default=Path("appPulseData.json"), help="App pulse data export")
+    parser.add_argument("--output-dir", type=Path, default=Path("."), help="directory for the generated JSON files")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--force", action="store_true", help="recompile every waveform")
+    parser.add_argument("--watch", action="store_true", help="rebuild whenever the input file changes")
+    parser.add_argument("--interval", type=float, default=1.0, help="polling interval for --watch (seconds)")
+    parsed = parser.parse_args(args)
+
+    parsed.output_dir.mkdir(parents=True, exist_ok=True)
+    if parsed.watch:
+        try:
+            watch(parsed.input, parsed.output_dir, parsed.workers, parsed.interval, on_build=print_result)
+        except KeyboardInterrupt:
+            pass
+    else:
+        print_result(build(parsed.input, parsed.output_dir, parsed.workers, parsed.force))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,307 @@
+"""
+模拟的役次元设备
+
+解码写入的命令并维护通道、马达与计步状态，通过通知应答查询，
+可以注入写入延迟、丢包与通知突发，并按时间记录所有事件，用于测试与基准测试::
+
+    device = SimulatedYCYDevice(write_latency=0.005, loss=0.1)
+    client = YCYBLEClient("00:00:00:00:00:00", transport_factory=device.transport_factory)
+"""
+import asyncio
+import random
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from pydglab_ws.ble.enums import YCYChannel, YCYMode, YCYCommand, YCYQueryType, YCYError, MotorState, ElectrodeStatus
+from pydglab_ws.ble.protocol import YCYBLEProtocol, PACKET_HEADER
+from pydglab_ws.ble.transport import BLETransport
+
+_COMMAND_LENGTHS = {
+    YCYCommand.CHANNEL_CONTROL: 10,
+    YCYCommand.MOTOR_CONTROL: 4,
+    YCYCommand.STEP_CONTROL: 4,
+    YCYCommand.ANGLE_CONTROL: 4,
+    YCYCommand.QUERY: 4,
+}
+
+
+@dataclass(frozen=True)
+class TimelineEvent:
+    """
+    模拟设备上发生的事件
+
+    :ivar time: 事件循环时间
+    :ivar kind: 事件类型 ``connect``、``disconnect``、``write``、``lost``、``notify``
+    :ivar data: 写入或通知的字节
+    """
+    time: float
+    kind: str
+    data: bytes = b""
+
+
+@dataclass
+class SimulatedChannel:
+    """模拟设备的通道状态，``pulses`` 为自定义模式下已输出的脉冲数"""
+    enabled: bool = False
+    strength: int = 1
+    mode: YCYMode = YCYMode.OFF
+    frequency: int = 0
+    pulse_width: int = 0
+    electrode_status: ElectrodeStatus = ElectrodeStatus.CONNECTED_INACTIVE
+    pulses: int = 0
+
+
+def notification(*payload: int) -> bytearray:
+    """构建带校验和的查询应答 / 上报通知"""
+    data = bytes([PACKET_HEADER, YCYCommand.QUERY, *payload])
+    return bytearray(data + bytes([YCYBLEProtocol.calculate_checksum(data)]))
+
+
+def angle_notification(*values: int) -> bytearray:
+    """构建角度数据通知"""
+    return notification(YCYQueryType.ANGLE_DATA, *b"".join(v.to_bytes(2, "big") for v in values))
+
+
+class SimulatedTransport(BLETransport):
+    """连接到模拟设备的传输层，由 [`SimulatedYCYDevice.transport_factory`] 创建"""
+
+    def __init__(self, device: "SimulatedYCYDevice", disconnected_callback: Callable[[], None]):
+        self._device = device
+        self._disconnected_callback = disconnected_callback
+        self._connected = False
+        self._callback: Optional[Callable[[int, bytearray], None]] = None
+        self._write_lock = asyncio.Lock()
+
+    @property
+    def is_connected(self) -> bool:
+        return self._connected
+
+    async def connect(self):
+        if self._device.connect_latency:
+            await asyncio.sleep(self._device.connect_latency)
+        if not self._device.available:
+            raise ConnectionError("simulated device unavailable")
+        self._connected = True
+        self._device._attach(self)
+
+    async def disconnect(self):
+        if self._connected:
+            self._connected = False
+            self._device._detach(self)
+
+    async def start_notify(self, callback: Callable[[int, bytearray], None]):
+        self._callback = callback
+
+    async def write(self, data: bytes):
+        if not self._connected:
+            raise ConnectionError("not connected")
+        # 无应答写入在链路上依次发送
+        async with self._write_lock:
+            if self._device.write_latency:
+                await asyncio.sleep(self._device.write_latency)
+            if not self._connected:
+                raise ConnectionError("not connected")
+            self._device._receive(bytes(data))
+
+    def _notify(self, data: bytearray):
+        if self._connected and self._callback is not None:
+            self._callback(0, data)
+
+    def _lost(self):
+        """设备端断开连接"""
+        if self._connected:
+            self._connected = False
+            self._disconnected_callback()
+
+
+class SimulatedYCYDevice:
+    """
+    模拟的役次元设备
+
+    :param write_latency: 每次写入的耗时 (秒)，同一连接的写入依次进行
+    :param notify_latency: 查询应答的延迟 (秒)
+    :param loss: 写入的命令在到达设备前丢失的概率
+    :param connect_latency: 连接耗时 (秒)
+    :param battery: 电池电量
+    :param seed: 丢包使用的随机数种子
+    """
+
+    def __init__(
+            self,
+            write_latency: float = 0.0,
+            notify_latency: float = 0.0,
+            loss: float = 0.0,
+            connect_latency: float = 0.0,
+            battery: int = 100,
+            seed: int = 0
+    ):
+        self.write_latency = write_latency
+        self.notify_latency = notify_latency
+        self.loss = loss
+        self.connect_latency = connect_latency
+        self.battery = battery
+        self.available = True
+        """为 ``False`` 时连接失败，模拟设备离开范围"""
+        self.channels: Dict[YCYChannel, SimulatedChannel] = {
+            YCYChannel.A: SimulatedChannel(),
+            YCYChannel.B: SimulatedChannel(),
+        }
+        self.motor = MotorState.OFF
+        self.step_count = 0
+        self.step_reporting = False
+        self.angle_reporting = False
+        self.angle: Tuple[int, ...] = (0,) * 6
+        self.timeline: List[TimelineEvent] = []
+        self.connections = 0
+        self._random = random.Random(seed)
+        self._transport: Optional[SimulatedTransport] = None
+
+    def transport_factory(self, address: str, disconnected_callback: Callable[[], None]) -> SimulatedTransport:
+        """用作 ``YCYBLEClient`` 的 ``transport_factory``"""
+        return SimulatedTransport(self, disconnected_callback)
+
+    @property
+    def connected(self) -> bool:
+        return self._transport is not None
+
+    def events(self, kind: Optional[str] = None, command: Optional[int] = None) -> List[TimelineEvent]:
+        """
+        按类型与命令字筛选时间线
+
+        :param kind: 事件类型
+        :param command: 命令字
+        """
+        return [
+            event for event in self.timeline
+            if (kind is None or event.kind == kind) and (command is None or event.data[1:2] == bytes([command]))
+        ]
+
+    def frames(self, command: Optional[int] = None) -> List[bytes]:
+        """设备收到的命令"""
+        return [event.data for event in self.events("write", command)]
+
+    # ==================== 注入 ====================
+
+    def drop_connection(self):
+        """设备端断开连接 (例如离开范围)，触发客户端的断开回调"""
+        if (transport := self._transport) is not None:
+            self._detach(transport)
+            transport._lost()
+
+    def inject_burst(self, packets: Iterable[bytes], interval: float = 0.0):
+        """
+        发送一批通知
+
+        :param packets: 通知字节
+        :param interval: 通知之间的间隔 (秒)，为 0 时在当前事件循环迭代中同步发送
+        """
+        packets = [bytearray(packet) for packet in packets]
+        if interval <= 0:
+            for packet in packets:
+                self._notify(packet)
+            return
+        loop = asyncio.get_running_loop()
+        for i, packet in enumerate(packets):
+            loop.call_later(interval * i, self._notify, packet)
+
+    def set_electrode(self, channel: YCYChannel, status: ElectrodeStatus):
+        """修改电极状态并主动上报"""
+        self.channels[channel].electrode_status = status
+        self._notify(self._status_packet(channel))
+
+    # ==================== 内部 ====================
+
+    def _record(self, kind: str, data: bytes = b""):
+        self.timeline.append(TimelineEvent(asyncio.get_running_loop().time(), kind, bytes(data)))
+
+    def _attach(self, transport: SimulatedTransport):
+        self._transport = transport
+        self.connections += 1
+        self._record("connect")
+
+    def _detach(self, transport: SimulatedTransport):
+        if self._transport is transport:
+            self._transport = None
+            self.angle_reporting = self.step_reporting = False
+            self._record("disconnect")
+
+    def _notify(self, data: bytearray):
+        if self._transport is not None:
+            self._record("notify", data)
+            self._transport._notify(data)
+
+    def _reply(self, data: bytearray):
+        if self.notify_latency:
+            asyncio.get_running_loop().call_later(self.notify_latency, self._notify, data)
+        else:
+            self._notify(data)
+
+    def _receive(self, data: bytes):
+        if self.loss and self._random.random() < self.loss:
+            self._record("lost", data)
+            return
+        self._record("write", data)
+
+        if len(data) < 4 or data[0] != PACKET_HEADER:
+            self._reply(notification(YCYQueryType.ERROR, YCYError.HEADER_ERROR))
+            return
+        if YCYBLEProtocol.calculate_checksum(data[:-1]) != data[-1]:
+            self._reply(notification(YCYQueryType.ERROR, YCYError.CHECKSUM_ERROR))
+            return
+        command = data[1]
+        if _COMMAND_LENGTHS.get(command) != len(data):
+            self._reply(notification(YCYQueryType.ERROR, YCYError.COMMAND_ERROR))
+            return
+
+        if command == YCYCommand.CHANNEL_CONTROL:
+            self._channel_control(data)
+        elif command == YCYCommand.MOTOR_CONTROL:
+            self.motor = MotorState(data[2])
+        elif command == YCYCommand.STEP_CONTROL:
+            if data[2] == 0x02:
+                self.step_count = 0
+            elif data[2] in (0x00, 0x01):
+                self.step_reporting = data[2] == 0x01
+        elif command == YCYCommand.ANGLE_CONTROL:
+            self.angle_reporting = data[2] == 0x01
+        else:
+            self._query(data[2])
+
+    def _channel_control(self, data: bytes):
+        channels = (YCYChannel.A, YCYChannel.B) if data[2] == YCYChannel.AB else (YCYChannel(data[2]),)
+        for channel in channels:
+            state = self.channels[channel]
+            state.enabled = data[3] == 0x01
+            state.strength = int.from_bytes(data[4:6], "big")
+            state.mode = YCYMode(data[6])
+            state.frequency, state.pulse_width = data[7], data[8]
+            state.electrode_status = (
+                ElectrodeStatus.CONNECTED_ACTIVE if state.enabled else ElectrodeStatus.CONNECTED_INACTIVE
+            )
+            if state.enabled and state.mode == YCYMode.CUSTOM:
+                state.pulses += 1
+
+    def _status_packet(self, channel: YCYChannel) -> bytearray:
+        state = self.channels[channel]
+        query_type = YCYQueryType.CHANNEL_A_STATUS if channel == YCYChannel.A else YCYQueryType.CHANNEL_B_STATUS
+        return notification(
+            query_type, state.electrode_status, 0x01 if state.enabled else 0x00,
+            state.strength >> 8, state.strength & 0xFF, state.mode
+        )
+
+    def _query(self, query_type: int):
+        if query_type == YCYQueryType.CHANNEL_A_STATUS:
+            reply = self._status_packet(YCYChannel.A)
+        elif query_type == YCYQueryType.CHANNEL_B_STATUS:
+            reply = self._status_packet(YCYChannel.B)
+        elif query_type == YCYQueryType.MOTOR_STATUS:
+            reply = notification(query_type, self.motor)
+        elif query_type == YCYQueryType.BATTERY:
+            reply = notification(query_type, self.battery)
+        elif query_type == YCYQueryType.STEP_COUNT:
+            reply = notification(query_type, self.step_count >> 8, self.step_count & 0xFF)
+        elif query_type == YCYQueryType.ANGLE_DATA:
+            reply = angle_notification(*self.angle)
+        else:
+            reply = notification(YCYQueryType.ERROR, YCYError.DATA_ERROR)
+        self._reply(reply)
@@ -0,0 +1,419 @@
+"""
+役次元 BLE 客户端测试 (使用模拟的传输层)
+"""
+import asyncio
+import functools
+
+import pytest
+
+from pydglab_ws.ble.enums import YCYCommand, YCYQueryType, YCYMode, ElectrodeStatus, YCYError, YCYChannel, MotorState
+from pydglab_ws.ble.protocol import YCYBLEProtocol, PACKET_HEADER
+from pydglab_ws.ble.transport import BLETransport
+from pydglab_ws.client.ble import YCYBLEClient, WaveformPolicy, _WaveformPlayer, _WaveformClock
+from pydglab_ws.enums import Channel, StrengthOperationType
+from pydglab_ws.models import StrengthData
+
+
+def _packet(*payload: int) -> bytes:
+    """构建带校验和的查询应答"""
+    data = bytes([PACKET_HEADER, YCYCommand.QUERY, *payload])
+    return data + bytes([YCYBLEProtocol.calculate_checksum(data)])
+
+
+def _status(query_type: YCYQueryType, strength: int) -> bytes:
+    return _packet(query_type, ElectrodeStatus.CONNECTED_ACTIVE, 0x01, strength >> 8, strength & 0xFF,
+                   YCYMode.PRESET_1)
+
+
+class _FakeTransport(BLETransport):
+    """按查询类型延迟应答的传输层"""
+
+    def __init__(self, client: YCYBLEClient, delays: dict, replies: dict):
+        self.written = []
+        self._client = client
+        self._delays = delays
+        self._replies = replies
+
+    @property
+    def is_connected(self) -> bool:
+        return True
+
+    async def connect(self):
+        pass
+
+    async def disconnect(self):
+        pass
+
+    async def start_notify(self, callback):
+        pass
+
+    async def write(self, data: bytes):
+        self.written.append(bytes(data))
+        if data[1] == YCYCommand.QUERY and (query_type := YCYQueryType(data[2])) in self._replies:
+            asyncio.get_running_loop().call_later(
+                self._delays.get(query_type, 0),
+                self._client._notification_handler, 0, bytearray(self._replies[query_type])
+            )
+
+
+def _new_client(delays: dict = None, replies: dict = None, write_coalesce_window: float = 0.0) -> YCYBLEClient:
+    client = YCYBLEClient("00:00:00:00:00:00", write_coalesce_window=write_coalesce_window)
+    client._transport = _FakeTransport(client, delays or {}, replies or {})
+    client._connected = True
+    return client
+
+
+REPLIES = {
+    YCYQueryType.BATTERY: _packet(YCYQueryType.BATTERY, 75),
+    YCYQueryType.CHANNEL_A_STATUS: _status(YCYQueryType.CHANNEL_A_STATUS, 10),
+    YCYQueryType.CHANNEL_B_STATUS: _status(YCYQueryType.CHANNEL_B_STATUS, 20),
+}
+
+
+class TestQueryDispatcher:
+    """查询应答匹配测试"""
+
+    @pytest.mark.asyncio
+    async def test_parallel_queries_out_of_order(self):
+        """并发查询，应答乱序到达时仍能正确匹配"""
+        client = _new_client(
+            delays={YCYQueryType.BATTERY: 0.03, YCYQueryType.CHANNEL_A_STATUS: 0.02, YCYQueryType.CHANNEL_B_STATUS: 0},
+            replies=REPLIES
+        )
+        start = asyncio.get_running_loop().time()
+        battery, status_a, status_b = await client.get_device_status(timeout=0.5)
+        assert asyncio.get_running_loop().time() - start < 0.2
+        assert battery == 75
+        assert status_a.strength == 10 and status_b.strength == 20
+        assert client._channel_a_strength == 10 and client._channel_b_strength == 20
+        assert await client.recv_event(timeout=0.01) is None
+
+    @pytest.mark.asyncio
+    async def test_unmatched_notifications_go_to_events(self):
+        """未匹配到查询的通知进入事件队列，不会被查询误取"""
+        client = _new_client(delays={YCYQueryType.BATTERY: 0.02}, replies=REPLIES)
+        query = asyncio.create_task(client.get_battery(timeout=0.5))
+        await asyncio.sleep(0)
+        client._notification_handler(0, bytearray(_packet(YCYQueryType.ERROR, YCYError.DATA_ERROR)))
+        client._notification_handler(0, bytearray(_status(YCYQueryType.CHANNEL_B_STATUS, 30)))
+        assert await query == 75
+
+        error = await client.recv_event(timeout=0.1)
+        assert error.is_error and error.data == YCYError.DATA_ERROR
+        assert await client.recv_data() == StrengthData(a=0, b=client.strength_data.b, a_limit=200, b_limit=200)
+        assert client.strength_data.b > 0
+
+    @pytest.mark.asyncio
+    async def test_query_timeout(self):
+        """无应答时按查询的超时时间返回"""
+        client = _new_client()
+        assert await client.get_battery(timeout=0.05) == -1
+        assert await client.get_channel_status(Channel.A, timeout=0.05) is None
+        assert await client.get_electrode_status(Channel.B, timeout=0.05) == ElectrodeStatus.NOT_CONNECTED
+        assert not any(client._pending_queries.values())
+
+        # 超时后迟到的应答不会匹配到之后的查询
+        client._notification_handler(0, bytearray(REPLIES[YCYQueryType.BATTERY]))
+        assert (await client.recv_event(timeout=0.1)).battery == 75
+
+    @pytest.mark.asyncio
+    async def test_checksum_error_not_matched(self):
+        """校验失败的通知不作为查询应答"""
+        client = _new_client(replies={YCYQueryType.BATTERY: _packet(YCYQueryType.BATTERY, 75)[:-1] + b"\x00"})
+        assert await client.get_battery(timeout=0.05) == -1
+        assert (await client.recv_event(timeout=0.1)).battery == 75
+
+
+class _VirtualTimeLoop(asyncio.SelectorEventLoop):
+    """
+    使用虚拟时间的事件循环
+
+    没有就绪的回调时直接把时间推进到最近的定时器，``sleep`` 不实际等待，
+    调度结果只取决于代码本身，不受机器负载影响
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._virtual_time = 0.0
+
+    def time(self) -> float:
+        return self._virtual_time
+
+    def _run_once(self):
+        if not self._ready and self._scheduled:
+            self._virtual_time = max(self._virtual_time, self._scheduled[0].when())
+        super()._run_once()
+
+
+def _virtual_time(test):
+    """在虚拟时间的事件循环中运行异步测试"""
+
+    @functools.wraps(test)
+    def wrapper(*args, **kwargs):
+        loop = _VirtualTimeLoop()
+        try:
+            return loop.run_until_complete(test(*args, **kwargs))
+        finally:
+            loop.close()
+
+    return wrapper
+
+
+class _FakeWaveClient:
+    """记录波形发送时间的客户端，每次发送耗时固定"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.sent = []
+
+    async def set_custom_wave(self, channel, frequency, pulse_width):
+        self.sent.append((asyncio.get_running_loop().time(), frequency))
+        await asyncio.sleep(self.latency)
+        return True
+
+
+PULSE = ((10, 10, 10, 10), (50, 50, 50, 50))
+TICK = 0.02
+
+
+class TestWaveformPlayer:
+    """波形播放器调度测试"""
+
+    @_virtual_time
+    async def test_no_drift(self):
+        """发送耗时不会累积为播放时长的偏移"""
+        client = _FakeWaveClient(latency=TICK / 2)
+        player = _WaveformPlayer(client, Channel.A, tick_interval=TICK)
+        await player.add(*[PULSE] * 20)
+        await asyncio.sleep(TICK * 20 + 0.05)
+        await player.stop()
+
+        times = [t for t, _ in client.sent]
+        assert len(times) == 20
+        # 逐次 sleep 的旧实现总时长约为 20 * 1.5 * TICK
+        assert times[-1] - times[0] == pytest.approx(19 * TICK)
+        stats = player.stats
+        assert stats.ticks == 20 and stats.skipped == stats.overruns == 0
+        assert stats.max_jitter == pytest.approx(0)
+
+    @pytest.mark.parametrize(
+        "policy,expected_ticks",
+        [
+            (WaveformPolicy.SKIP, 6),
+            (WaveformPolicy.CATCH_UP, 10),
+        ]
+    )
+    @_virtual_time
+    async def test_slow_write_policy(self, policy, expected_ticks):
+        """发送耗时超过播放间隔时，按策略跳过或追赶"""
+        client = _FakeWaveClient(latency=TICK * 1.8)
+        player = _WaveformPlayer(client, Channel.A, policy, tick_interval=TICK)
+        await player.add(*[PULSE] * 10)
+        await asyncio.sleep(TICK * 20)
+        await player.stop()
+
+        stats = player.stats
+        assert stats.ticks == expected_ticks
+        assert stats.ticks + stats.skipped == 10
+        assert stats.overruns == stats.ticks
+
+    @_virtual_time
+    async def test_idle_restarts_timeline(self):
+        """队列为空时挂起，之后添加的波形立即开始播放"""
+        client = _FakeWaveClient(latency=0)
+        player = _WaveformPlayer(client, Channel.A, tick_interval=TICK)
+        await player.add(PULSE)
+        await asyncio.sleep(TICK * 5)
+        assert player.queue_size == 0 and len(client.sent) == 1
+
+        start = asyncio.get_running_loop().time()
+        await player.add(PULSE, PULSE)
+        await asyncio.sleep(TICK / 2)
+        await player.stop()
+        assert client.sent[1][0] == pytest.approx(start)
+        assert player.stats.skipped == 0
+
+
+def _control_frames(client: YCYBLEClient) -> list:
+    return [frame for frame in client._transport.written if frame[1] == YCYCommand.CHANNEL_CONTROL]
+
+
+class TestWriteCoalescer:
+    """通道控制命令的合并与去重测试"""
+
+    @pytest.mark.asyncio
+    async def test_deduplicate(self):
+        """与上一次写入完全相同的通道控制命令不再写入"""
+        client = _new_client()
+        for _ in range(3):
+            assert await client.set_strength(Channel.A, StrengthOperationType.SET_TO, 50)
+        assert await client.set_strength(Channel.B, StrengthOperationType.SET_TO, 50)
+        assert len(_control_frames(client)) == 2
+        stats = client.write_stats
+        assert stats.written == 2 and stats.deduplicated == 2 and stats.saved == 2
+
+    @pytest.mark.asyncio
+    async def test_coalesce_window(self):
+        """合并窗口内只写入每个通道最新的命令，所有调用共享写入结果"""
+        client = _new_client(write_coalesce_window=0.05)
+        results = await asyncio.gather(*(
+            client.set_strength(Channel.A, StrengthOperationType.SET_TO, value) for value in range(10, 60, 5)
+        ))
+        assert all(results)
+        frames = _control_frames(client)
+        # 第一条立即写入，其余在窗口结束时只写入最新的一条
+        assert len(frames) == 2
+        assert frames[-1] == YCYBLEProtocol.build_channel_control(
+            YCYChannel.A, True, client._channel_a_strength, YCYMode.PRESET_1
+        )
+        stats = client.write_stats
+        assert stats.written == 2 and stats.coalesced == 8
+
+    @pytest.mark.asyncio
+    async def test_pass_through(self):
+        """马达与查询命令不合并，停止命令立即写入并替换暂缓写入的命令"""
+        client = _new_client(write_coalesce_window=1)
+        await client.set_strength(Channel.A, StrengthOperationType.SET_TO, 50)
+        pending = asyncio.create_task(client.set_strength(Channel.A, StrengthOperationType.SET_TO, 60))
+        await asyncio.sleep(0)
+        for _ in range(2):
+            assert await client.set_motor(MotorState.OFF)
+        assert await client.stop_channel(Channel.A)
+        assert await asyncio.wait_for(pending, 0.1)
+
+        written = client._transport.written
+        assert sum(frame[1] == YCYCommand.MOTOR_CONTROL for frame in written) == 2
+        frames = _control_frames(client)
+        assert len(frames) == 2 and frames[-1][3] == 0x00
+        assert client.write_stats.coalesced == 1
+
+    @pytest.mark.asyncio
+    async def test_status_report_resets_dedup(self):
+        """设备上报通道状态后，相同的命令会再次写入"""
+        client = _new_client(replies=REPLIES)
+        await client.set_strength(Channel.A, StrengthOperationType.SET_TO, 50)
+        await client.get_channel_status(Channel.A)
+        await client.set_strength(Channel.A, StrengthOperationType.SET_TO, 50)
+        assert len(_control_frames(client)) == 2
+
+    @pytest.mark.asyncio
+    async def test_custom_wave_not_deduplicated(self):
+        """自定义模式的命令每条只触发一次输出，相同的命令也会写入"""
+        client = _new_client()
+        await client.set_strength(Channel.A, StrengthOperationType.SET_TO, 50)
+        for _ in range(3):
+            assert await client.set_custom_wave(Channel.A, 50, 50)
+        assert len(_control_frames(client)) == 4
+        assert client.write_stats.deduplicated == 0
+
+
+PULSE_2 = ((10, 10, 10, 10), (80, 80, 80, 80))
+
+
+def _clocked_players(client: YCYBLEClient):
+    clock = _WaveformClock(client, tick_interval=TICK)
+    players = [_WaveformPlayer(client, channel, tick_interval=TICK, clock=clock) for channel in (Channel.A, Channel.B)]
+    return clock, players
+
+
+class TestCombinedChannels:
+    """AB 通道合并命令测试"""
+
+    @_virtual_time
+    async def test_shared_clock_combines_same_waves(self):
+        """两个通道同一时刻的波形参数与强度相同时只写入一条 AB 通道命令"""
+        client = _new_client()
+        for channel in Channel.A, Channel.B:
+            await client.set_strength(channel, StrengthOperationType.SET_TO, 50)
+        clock, (player_a, player_b) = _clocked_players(client)
+        await player_a.add(*[PULSE] * 5)
+        await player_b.add(*[PULSE] * 5)
+        await asyncio.sleep(TICK * 8)
+        await clock.stop()
+
+        frames = _control_frames(client)[2:]
+        assert len(frames) == 5
+        assert all(frame[2] == YCYChannel.AB and frame[6] == YCYMode.CUSTOM for frame in frames)
+        assert player_a.stats.ticks == player_b.stats.ticks == 5
+
+    @_virtual_time
+    async def test_shared_clock_different_waves(self):
+        """波形参数或强度不同时逐个通道写入，但仍在同一时刻下发"""
+        client = _new_client()
+        await client.set_strength(Channel.A, StrengthOperationType.SET_TO, 50)
+        await client.set_strength(Channel.B, StrengthOperationType.SET_TO, 60)
+        clock, (player_a, player_b) = _clocked_players(client)
+        await player_a.add(*[PULSE] * 3)
+        await player_b.add(*[PULSE_2] * 3)
+        await asyncio.sleep(TICK * 6)
+        await clock.stop()
+
+        frames = _control_frames(client)[2:]
+        assert [frame[2] for frame in frames] == [YCYChannel.A, YCYChannel.B] * 3
+
+    @_virtual_time
+    async def test_shared_clock_single_channel(self):
+        """只有一个通道有波形时只写入该通道"""
+        client = _new_client()
+        for channel in Channel.A, Channel.B:
+            await client.set_strength(channel, StrengthOperationType.SET_TO, 50)
+        clock, (player_a, player_b) = _clocked_players(client)
+        await player_b.add(*[PULSE] * 3)
+        await asyncio.sleep(TICK * 6)
+        await clock.stop()
+
+        frames = _control_frames(client)[2:]
+        assert [frame[2] for frame in frames] == [YCYChannel.B] * 3
+        assert player_a.stats.ticks == 0
+
+    @pytest.mark.asyncio
+    async def test_stop_all_single_frame(self):
+        """stop_all 使用一条 AB 通道命令停止两个通道"""
+        client = _new_client()
+        assert await client.stop_all()
+        written = client._transport.written
+        assert written == [
+            YCYBLEProtocol.build_channel_control(YCYChannel.AB, False, 1, YCYMode.PRESET_1),
+            YCYBLEProtocol.build_motor_control(MotorState.OFF),
+        ]
+
+    @_virtual_time
+    async def test_ab_frame_supersedes_pending_channel(self):
+        """合并窗口内暂缓写入的单通道命令被之后的 AB 通道命令替换，不会在之后写入而覆盖 AB 通道命令"""
+        client = _new_client(write_coalesce_window=0.05)
+        await client.set_strength(Channel.A, StrengthOperationType.SET_TO, 50)
+        pending = asyncio.create_task(client.set_strength(Channel.A, StrengthOperationType.SET_TO, 60))
+        await asyncio.sleep(0)
+        ab_frame = YCYBLEProtocol.build_channel_control(YCYChannel.AB, True, 10, YCYMode.PRESET_2)
+        assert await client._send_command(ab_frame)
+        assert await asyncio.wait_for(pending, 0.1)
+        await asyncio.sleep(0.1)
+        assert [frame[2] for frame in _control_frames(client)] == [YCYChannel.A, YCYChannel.AB]
+        assert _control_frames(client)[-1] == ab_frame
+        assert client.write_stats.coalesced == 1
+
+    @_virtual_time
+    async def test_channel_frame_flushes_pending_ab(self):
+        """合并窗口内暂缓写入的 AB 通道命令在之后的单通道命令之前写入"""
+        client = _new_client(write_coalesce_window=0.05)
+        frames = [
+            YCYBLEProtocol.build_channel_control(YCYChannel.AB, True, strength, YCYMode.PRESET_1)
+            for strength in (10, 20)
+        ]
+        assert await client._send_command(frames[0])
+        pending = asyncio.create_task(client._send_command(frames[1]))
+        await asyncio.sleep(0)
+        assert await client.set_strength(Channel.A, StrengthOperationType.SET_TO, 50)
+        assert await asyncio.wait_for(pending, 0.1)
+        await asyncio.sleep(0.1)
+        written = _control_frames(client)
+        assert written[:2] == frames and [frame[2] for frame in written] == [YCYChannel.AB, YCYChannel.AB, YCYChannel.A]
+
+    @pytest.mark.asyncio
+    async def test_ab_write_resets_dedup(self):
+        """AB 通道命令写入后，单通道的相同命令会再次写入"""
+        client = _new_client()
+        await client.set_strength(Channel.A, StrengthOperationType.SET_TO, 50)
+        await client.stop_all()
+        await client.set_strength(Channel.A, StrengthOperationType.SET_TO, 50)
+        assert [frame[2] for frame in _control_frames(client)] == [YCYChannel.A, YCYChannel.AB, YCYChannel.A]
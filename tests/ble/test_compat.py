@@ -0,0 +1,219 @@
+"""
+DGLabBLEServer 兼容层测试 (使用模拟的 BLE 客户端)
+"""
+import asyncio
+import time
+
+import pytest
+
+from pydglab_ws.ble import YCYDevice, YCYDeviceCache, YCYScanner
+from pydglab_ws.enums import Channel, StrengthOperationType
+from pydglab_ws.server import ble_compat
+from pydglab_ws.server.ble_compat import BLEThread, BLEClientProxy
+
+
+class _FakeYCYClient:
+    """记录命令执行顺序的 BLE 客户端，每条命令耗时不同"""
+
+    def __init__(self, delays: dict = None):
+        self.log = []
+        self._delays = delays or {}
+
+    async def _command(self, name: str, channel, value=None):
+        await asyncio.sleep(self._delays.get((name, channel, value), self._delays.get(name, 0)))
+        self.log.append((name, channel, value))
+        return True
+
+    async def set_strength(self, channel, operation_type, value):
+        return await self._command("set_strength", channel, value)
+
+    async def clear_pulses(self, channel):
+        return await self._command("clear_pulses", channel)
+
+    async def add_pulses(self, channel, *pulses):
+        return await self._command("add_pulses", channel, len(pulses))
+
+    async def set_pulse_preset(self, channel, preset_index):
+        if preset_index < 0:
+            raise ValueError("invalid preset")
+        return await self._command("set_pulse_preset", channel, preset_index)
+
+    async def stop_all(self):
+        return await self._command("stop_all", None)
+
+
+class _FakeBLEThread(BLEThread):
+    """不扫描设备，直接使用模拟客户端的 BLE 线程"""
+
+    def __init__(self, client: _FakeYCYClient):
+        super().__init__(scan_timeout=0, strength_limit=200, device_cache=False)
+        self._fake_client = client
+
+    async def _connect(self):
+        self._client = self._fake_client
+
+
+@pytest.fixture
+def ble_thread():
+    def start(delays: dict = None):
+        thread = _FakeBLEThread(_FakeYCYClient(delays))
+        thread.start()
+        assert thread._ready.wait(timeout=5)
+        threads.append(thread)
+        return thread
+
+    threads = []
+    yield start
+    for thread in threads:
+        thread.stop()
+
+
+class TestBLEClientProxy:
+    """BLE 线程与调用方事件循环之间的命令桥接"""
+
+    @pytest.mark.asyncio
+    async def test_channel_order(self, ble_thread):
+        """同一通道的命令按提交顺序执行，即使先提交的命令耗时更长"""
+        thread = ble_thread({("set_strength", Channel.A, 1): 0.1, ("set_strength", Channel.A, 2): 0.05})
+        proxy = BLEClientProxy(thread)
+        for value in range(1, 6):
+            assert await proxy.set_strength(Channel.A, StrengthOperationType.SET_TO, value)
+        assert await proxy.set_strength(Channel.A, StrengthOperationType.SET_TO, 6, wait=True)
+        assert thread._client.log == [("set_strength", Channel.A, value) for value in range(1, 7)]
+
+    @pytest.mark.asyncio
+    async def test_channels_independent(self, ble_thread):
+        """不同通道的命令互不等待"""
+        thread = ble_thread({("set_strength", Channel.A, 1): 0.3})
+        proxy = BLEClientProxy(thread)
+        await proxy.set_strength(Channel.A, StrengthOperationType.SET_TO, 1)
+        await proxy.set_strength(Channel.B, StrengthOperationType.SET_TO, 2, wait=True)
+        assert thread._client.log == [("set_strength", Channel.B, 2)]
+
+    @pytest.mark.asyncio
+    async def test_add_pulses_single_command(self, ble_thread):
+        """清空与添加波形作为一个命令执行，不会与同一通道的其他命令交错"""
+        thread = ble_thread({"clear_pulses": 0.05})
+        proxy = BLEClientProxy(thread)
+        await proxy.add_pulses(Channel.B, ((10,) * 4, (50,) * 4))
+        assert await proxy.set_pulse_preset(Channel.B, 3, wait=True)
+        assert thread._client.log == [
+            ("clear_pulses", Channel.B, None),
+            ("add_pulses", Channel.B, 1),
+            ("set_pulse_preset", Channel.B, 3),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_stop_all_barrier(self, ble_thread):
+        """stop_all 在两个通道先提交的命令之后、后提交的命令之前执行"""
+        thread = ble_thread({("set_strength", Channel.A, 1): 0.1, ("set_strength", Channel.B, 2): 0.05})
+        proxy = BLEClientProxy(thread)
+        await proxy.set_strength(Channel.A, StrengthOperationType.SET_TO, 1)
+        await proxy.set_strength(Channel.B, StrengthOperationType.SET_TO, 2)
+        stop = asyncio.create_task(proxy.stop_all())
+        await asyncio.sleep(0)
+        await proxy.set_strength(Channel.A, StrengthOperationType.SET_TO, 3, wait=True)
+        assert await stop
+        log = thread._client.log
+        assert log.index(("stop_all", None, None)) == 2
+        assert log[-1] == ("set_strength", Channel.A, 3)
+
+    @pytest.mark.asyncio
+    async def test_stop_all_does_not_block_loop(self, ble_thread):
+        """等待 stop_all 确认期间，调用方的事件循环仍可运行其他任务"""
+        thread = ble_thread({"stop_all": 0.3})
+        proxy = BLEClientProxy(thread)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        start = time.monotonic()
+        assert await proxy.stop_all()
+        task.cancel()
+        assert time.monotonic() - start >= 0.25
+        assert ticks >= 10
+
+    @pytest.mark.asyncio
+    async def test_stop_all_timeout(self, ble_thread):
+        """stop_all 超时返回 False"""
+        thread = ble_thread({"stop_all": 1})
+        proxy = BLEClientProxy(thread)
+        assert await proxy.stop_all(timeout=0.05) is False
+
+    @pytest.mark.asyncio
+    async def test_wait_result_error(self, ble_thread):
+        """等待结果时命令的异常记为失败，且不影响之后的命令"""
+        thread = ble_thread()
+        proxy = BLEClientProxy(thread)
+        assert await proxy.set_pulse_preset(Channel.A, -1, wait=True) is False
+        assert await proxy.set_pulse_preset(Channel.A, 1, wait=True)
+
+    @pytest.mark.asyncio
+    async def test_stopped_thread(self, ble_thread):
+        """BLE 线程停止后提交命令直接返回 False"""
+        thread = ble_thread()
+        proxy = BLEClientProxy(thread)
+        thread.stop()
+        assert await proxy.set_strength(Channel.A, StrengthOperationType.SET_TO, 1) is False
+        assert await proxy.set_strength(Channel.A, StrengthOperationType.SET_TO, 1, wait=True) is False
+
+    @pytest.mark.asyncio
+    async def test_stop_cancels_pending(self, ble_thread):
+        """BLE 线程停止时尚未执行的命令被取消，等待结果的调用返回 False"""
+        thread = ble_thread({("set_strength", Channel.A, 1): 0.2})
+        proxy = BLEClientProxy(thread)
+        await proxy.set_strength(Channel.A, StrengthOperationType.SET_TO, 1)
+        pending = asyncio.create_task(proxy.set_strength(Channel.A, StrengthOperationType.SET_TO, 2, wait=True))
+        await asyncio.sleep(0.05)
+        thread.stop()
+        assert await asyncio.wait_for(pending, 1) is False
+        assert ("set_strength", Channel.A, 2) not in thread._client.log
+
+
+class _UnreachableClient:
+    """连接时一直等待的客户端，模拟不在附近的设备"""
+
+    def __init__(self, device: YCYDevice, attempts: list):
+        self._device = device
+        self._attempts = attempts
+
+    async def connect(self) -> bool:
+        self._attempts.append(self._device.address)
+        if self._device.address == "SCANNED":
+            return True
+        await asyncio.Future()
+
+
+class TestCachedConnect:
+    """优先连接缓存中的设备"""
+
+    @pytest.mark.asyncio
+    async def test_stale_cache_falls_back_to_scan(self, tmp_path, monkeypatch):
+        """缓存中的设备都不可连接时，只尝试最近的几台，之后改为扫描"""
+        monkeypatch.setattr(ble_compat, "_CACHED_CONNECT_TIMEOUT", 0.05)
+        cache = YCYDeviceCache(tmp_path / "devices.json")
+        for i in range(16):
+            cache.update(YCYDevice(address=f"00:00:00:00:00:{i:02X}"), timestamp=time.time() - i)
+        scanned = YCYDevice(address="SCANNED")
+
+        async def find_device(timeout, cache):
+            return scanned
+
+        attempts = []
+        monkeypatch.setattr(YCYScanner, "find_device", staticmethod(find_device))
+        thread = BLEThread(scan_timeout=1, strength_limit=200, device_cache=cache)
+        monkeypatch.setattr(thread, "_create_client", lambda device, *args: _UnreachableClient(device, attempts))
+
+        start = time.monotonic()
+        await thread._connect()
+        assert time.monotonic() - start < 1
+        assert attempts == ["00:00:00:00:00:00", "00:00:00:00:00:01", "SCANNED"]
+        assert thread._devices == [scanned]
+        # 等待连接完成的时间包括尝试连接缓存中的设备的时间
+        assert thread.ready_timeout == 1 + ble_compat._SCAN_CONNECT_TIMEOUT \
+               + ble_compat._CACHED_CONNECT_ATTEMPTS * ble_compat._CACHED_CONNECT_TIMEOUT
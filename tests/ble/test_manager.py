@@ -0,0 +1,168 @@
+"""
+役次元多设备管理测试 (使用模拟的扫描器与传输层)
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from pydglab_ws.ble.enums import YCYCommand
+from pydglab_ws.ble.models import YCYDevice
+from pydglab_ws.ble.scanner import SERVICE_UUID
+from pydglab_ws.ble.transport import BLETransport
+from pydglab_ws.client.ble import YCYBLEClient
+from pydglab_ws.client.manager import YCYDeviceManager
+from pydglab_ws.enums import Channel, StrengthOperationType
+
+
+class _FakeScanner:
+    """由测试触发检测回调的扫描器"""
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.running = False
+        self.starts = 0
+
+    async def start(self):
+        self.running = True
+        self.starts += 1
+
+    async def stop(self):
+        self.running = False
+
+    def advertise(self, address: str, service_uuids=(SERVICE_UUID,)):
+        self.callback(
+            SimpleNamespace(address=address, name=f"YCY-{address[-2:]}"),
+            SimpleNamespace(service_uuids=list(service_uuids), rssi=-50)
+        )
+
+
+class _SlowTransport(BLETransport):
+    """连接与每次写入耗时固定的传输层"""
+
+    def __init__(self, connect_delay: float, latency: float):
+        self.connected = False
+        self.connect_delay = connect_delay
+        self.latency = latency
+        self.written = []
+
+    @property
+    def is_connected(self) -> bool:
+        return self.connected
+
+    async def connect(self):
+        await asyncio.sleep(self.connect_delay)
+        self.connected = True
+
+    async def disconnect(self):
+        self.connected = False
+
+    async def start_notify(self, callback):
+        pass
+
+    async def write(self, data: bytes):
+        await asyncio.sleep(self.latency)
+        self.written.append(bytes(data))
+
+
+@pytest.fixture
+def fake_backend():
+    scanners = []
+    latencies = {}
+
+    def scanner_factory(callback):
+        scanners.append(_FakeScanner(callback))
+        return scanners[-1]
+
+    def client_factory(device: YCYDevice):
+        latency = latencies.get(device.address, 0)
+        return YCYBLEClient(device, transport_factory=lambda address, on_disconnect: _SlowTransport(0.1, latency))
+
+    return SimpleNamespace(
+        scanners=scanners,
+        latencies=latencies,
+        manager=lambda **kwargs: YCYDeviceManager(
+            scanner_factory=scanner_factory, client_factory=client_factory, **kwargs
+        )
+    )
+
+
+def _strength_writes(managed) -> int:
+    return sum(frame[1] == YCYCommand.CHANNEL_CONTROL for frame in managed.client._transport.written)
+
+
+class TestYCYDeviceManager:
+    """多设备管理测试"""
+
+    @pytest.mark.asyncio
+    async def test_connect_in_parallel(self, fake_backend):
+        """一个扫描器发现多台设备，并行连接，按 client_id 获取"""
+        async with fake_backend.manager() as manager:
+            scanner, = fake_backend.scanners
+            assert scanner.running
+            for i in range(3):
+                scanner.advertise(f"00:00:00:00:00:0{i}")
+            scanner.advertise("00:00:00:00:00:FF", service_uuids=())
+
+            start = asyncio.get_running_loop().time()
+            clients = await manager.connect(count=3, timeout=1)
+            assert asyncio.get_running_loop().time() - start < 0.25
+            assert len(clients) == 3 and len(manager.discovered) == 3
+            assert {client.client_id for client in clients} == set(manager.clients)
+            for client in clients:
+                assert manager.get_client(client.client_id) is client
+            # 已连接的设备不会再次连接
+            assert await manager.connect(count=1, timeout=0.05) == []
+        assert not scanner.running
+        assert manager.clients == {}
+
+    @pytest.mark.asyncio
+    async def test_wait_for_discovery(self, fake_backend):
+        """设备稍后才被发现时等待，只连接指定地址的设备"""
+        async with fake_backend.manager(addresses=["AA:00:00:00:00:01"]) as manager:
+            scanner, = fake_backend.scanners
+            loop = asyncio.get_running_loop()
+            loop.call_later(0.05, scanner.advertise, "BB:00:00:00:00:02")
+            loop.call_later(0.1, scanner.advertise, "aa:00:00:00:00:01")
+            clients = await manager.connect(timeout=1)
+            assert [client.client.client_id for client in clients] == [
+                YCYBLEClient("aa:00:00:00:00:01").client_id
+            ]
+
+    @pytest.mark.asyncio
+    async def test_slow_device_isolated(self, fake_backend):
+        """写入较慢的设备不影响其他设备"""
+        fake_backend.latencies["00:00:00:00:00:01"] = 0.2
+        async with fake_backend.manager() as manager:
+            scanner, = fake_backend.scanners
+            scanner.advertise("00:00:00:00:00:01")
+            scanner.advertise("00:00:00:00:00:02")
+            clients = {client.client.client_id: client for client in await manager.connect(count=2, timeout=1)}
+            slow = clients[YCYBLEClient("00:00:00:00:00:01").client_id]
+            fast = clients[YCYBLEClient("00:00:00:00:00:02").client_id]
+
+            for value in range(1, 6):
+                for client in slow, fast:
+                    assert await client.set_strength(Channel.A, StrengthOperationType.SET_TO, value * 10)
+            assert await asyncio.wait_for(
+                fast.set_strength(Channel.B, StrengthOperationType.SET_TO, 10, wait=True), 0.1
+            )
+            assert _strength_writes(fast) == 6
+            assert _strength_writes(slow) <= 1
+            assert slow.stats.queued >= 3
+
+    @pytest.mark.asyncio
+    async def test_queue_full_and_stop_all(self, fake_backend):
+        """写入队列已满时拒绝命令，stop_all 取消尚未执行的命令"""
+        fake_backend.latencies["00:00:00:00:00:01"] = 0.05
+        async with fake_backend.manager(queue_size=2) as manager:
+            scanner, = fake_backend.scanners
+            scanner.advertise("00:00:00:00:00:01")
+            client, = await manager.connect(count=1, timeout=1)
+            results = [
+                await client.set_strength(Channel.A, StrengthOperationType.SET_TO, value) for value in (10, 20, 30, 40)
+            ]
+            assert results[-1] is False and client.stats.rejected >= 1
+            assert await client.stop_all()
+            assert client.client._transport.written[-1][1] == YCYCommand.MOTOR_CONTROL
+            assert client.stats.queued == 0
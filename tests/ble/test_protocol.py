@@ -1,13 +1,18 @@
 """
 役次元 BLE 协议编解码测试
 """
+import itertools
+import math
+import random
+import timeit
+
 import pytest
 
 from pydglab_ws.ble.enums import (
     YCYChannel, YCYMode, YCYCommand, YCYQueryType,
     MotorState, ElectrodeStatus, YCYError
 )
-from pydglab_ws.ble.protocol import YCYBLEProtocol, PACKET_HEADER
+from pydglab_ws.ble.protocol import YCYBLEProtocol, PACKET_HEADER, _ChannelControlFrameBuilder
 from pydglab_ws.ble.exceptions import ChecksumError
 
 
@@ -384,3 +389,172 @@ class TestBuildAngleControl:
         """关闭角度上报"""
         cmd = YCYBLEProtocol.build_angle_control(False)
         assert cmd[2] == 0x00
+
+
+def _legacy_build_channel_control(channel, enabled, strength, mode, frequency=0, pulse_width=0) -> bytes:
+    """逐字节构建通道控制命令的原实现，用于对比"""
+    strength = max(1, min(276, strength))
+    if mode != YCYMode.CUSTOM:
+        frequency = 0
+        pulse_width = 0
+    else:
+        frequency = max(1, min(100, frequency))
+        pulse_width = max(0, min(100, pulse_width))
+    data = bytes([
+        PACKET_HEADER, YCYCommand.CHANNEL_CONTROL, channel, 0x01 if enabled else 0x00,
+        (strength >> 8) & 0xFF, strength & 0xFF, mode, frequency, pulse_width,
+    ])
+    return data + bytes([sum(data) & 0xFF])
+
+
+class TestChannelControlFrameBuilder:
+    """通道控制命令模板构建测试"""
+
+    def test_identical_to_legacy(self):
+        """各种参数组合 (包括需要限制范围的值) 的结果与逐字节构建完全一致"""
+        builder = _ChannelControlFrameBuilder(max_size=64)
+        for channel, enabled, strength, mode, frequency, pulse_width in itertools.product(
+            YCYChannel, (True, False), (-5, 0, 1, 2, 255, 256, 257, 276, 300),
+            (YCYMode.PRESET_1, YCYMode.PRESET_16, YCYMode.CUSTOM), (0, 1, 50, 100, 150), (-1, 0, 50, 100, 101)
+        ):
+            args = channel, enabled, strength, mode, frequency, pulse_width
+            # 构建两次，第二次命中缓存
+            assert builder.build(*args) == _legacy_build_channel_control(*args)
+            assert builder.build(*args) == _legacy_build_channel_control(*args)
+
+    def test_returns_immutable_bytes(self):
+        """返回的命令不会被之后的构建修改"""
+        builder = _ChannelControlFrameBuilder()
+        first = builder.build(YCYChannel.A, True, 100, YCYMode.CUSTOM, 10, 20)
+        builder.build(YCYChannel.A, True, 200, YCYMode.CUSTOM, 30, 40)
+        assert type(first) is bytes
+        assert first == _legacy_build_channel_control(YCYChannel.A, True, 100, YCYMode.CUSTOM, 10, 20)
+
+    def test_lru_eviction(self):
+        """缓存超出上限时淘汰最久未使用的命令"""
+        builder = _ChannelControlFrameBuilder(max_size=2)
+        builder.build(YCYChannel.A, True, 1, YCYMode.CUSTOM, 1, 1)
+        builder.build(YCYChannel.A, True, 2, YCYMode.CUSTOM, 1, 1)
+        builder.build(YCYChannel.A, True, 1, YCYMode.CUSTOM, 1, 1)
+        builder.build(YCYChannel.A, True, 3, YCYMode.CUSTOM, 1, 1)
+        assert [key[2] for key in builder._frames] == [1, 3]
+
+    def test_invalid_channel(self):
+        """超出单字节范围的参数与原实现一样抛出 ValueError"""
+        with pytest.raises(ValueError):
+            YCYBLEProtocol.build_channel_control(0x100, True, 1, YCYMode.PRESET_1)
+
+
+@pytest.mark.benchmark
+def test_build_channel_control_benchmark():
+    """模板构建与逐字节构建的耗时对比，参数取自 10Hz 波形播放的典型范围"""
+    params = [
+        (channel, True, 100, YCYMode.CUSTOM, frequency, pulse_width)
+        for channel in (YCYChannel.A, YCYChannel.B)
+        for frequency in range(10, 110, 10)
+        for pulse_width in range(0, 100, 10)
+    ]
+    assert [YCYBLEProtocol.build_channel_control(*args) for args in params] \
+           == [_legacy_build_channel_control(*args) for args in params]
+    number = 20
+    legacy = min(timeit.repeat(
+        lambda: [_legacy_build_channel_control(*args) for args in params],
+        number=number,
+        repeat=3
+    )) / number * 1e3
+    templated = min(timeit.repeat(
+        lambda: [YCYBLEProtocol.build_channel_control(*args) for args in params],
+        number=number,
+        repeat=3
+    )) / number * 1e3
+    assert templated < legacy
+
+
+def _response(*payload: int) -> bytes:
+    data = bytes([PACKET_HEADER, YCYCommand.QUERY, *payload])
+    return data + bytes([YCYBLEProtocol.calculate_checksum(data)])
+
+
+def _angle(*values: int) -> bytes:
+    return _response(YCYQueryType.ANGLE_DATA, *b"".join(value.to_bytes(2, "big") for value in values))
+
+
+class TestParseAngleBatch:
+    """角度数据批量解析测试"""
+
+    def test_columns_match_parse_response(self):
+        """逐列结果与逐条解析一致"""
+        rng = random.Random(0)
+        samples = [tuple(rng.randrange(0x10000) for _ in range(6)) for _ in range(100)]
+        packets = [_angle(*sample) for sample in samples]
+        batch = YCYBLEProtocol.parse_angle_batch(b"".join(packets), timestamps=[i * 0.01 for i in range(100)])
+        assert len(batch) == 100
+        assert list(zip(*batch.columns)) == [YCYBLEProtocol.parse_response(p).angle_data for p in packets]
+        assert batch.timestamps[-1] == pytest.approx(0.99)
+        assert batch.skipped == 0 and batch.checksum_errors == 0
+
+    def test_mixed_notifications(self):
+        """跳过其他类型的通知，时间与所在通知对应"""
+        data = b"".join((
+            _angle(1, 2, 3, 4, 5, 6),
+            _response(YCYQueryType.BATTERY, 80),
+            _response(YCYQueryType.STEP_COUNT, 0x01, 0x02),
+            _angle(7, 8, 9, 10, 11, 12),
+        ))
+        batch = YCYBLEProtocol.parse_angle_batch(data, timestamps=[1.0, 2.0, 3.0, 4.0])
+        assert list(batch.timestamps) == [1.0, 4.0]
+        assert list(batch.gyro_z) == [6, 12]
+        assert batch.skipped == 2
+
+    def test_checksum_error_dropped(self):
+        """校验和错误的角度数据被丢弃，不校验时保留"""
+        bad = bytearray(_angle(1, 2, 3, 4, 5, 6))
+        bad[-1] ^= 0xFF
+        data = bytes(bad) + _angle(7, 8, 9, 10, 11, 12)
+        batch = YCYBLEProtocol.parse_angle_batch(data)
+        assert list(batch.acc_x) == [7] and batch.checksum_errors == 1
+        assert math.isnan(batch.timestamps[0])
+        assert len(YCYBLEProtocol.parse_angle_batch(data, verify_checksum=False)) == 2
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            _angle(1, 2, 3, 4, 5, 6)[:-1],
+            b"\x00" * 16,
+            _response(0x7F, 0x00),
+        ]
+    )
+    def test_invalid_buffer(self, data):
+        """不完整或无法识别的通知"""
+        with pytest.raises(ValueError):
+            YCYBLEProtocol.parse_angle_batch(data)
+
+    @pytest.mark.parametrize("mixed", [False, True])
+    def test_too_few_timestamps(self, mixed):
+        """接收时间少于通知条数时不错位对齐"""
+        packets = [_angle(i, 0, 0, 0, 0, 0) for i in range(3)]
+        if mixed:
+            packets.insert(1, _response(YCYQueryType.BATTERY, 80))
+        with pytest.raises(ValueError, match="timestamps"):
+            YCYBLEProtocol.parse_angle_batch(b"".join(packets), timestamps=[1.0])
+
+    def test_empty(self):
+        assert len(YCYBLEProtocol.parse_angle_batch(b"")) == 0
+
+
+@pytest.mark.benchmark
+def test_parse_angle_batch_benchmark():
+    """批量解析与逐条解析角度数据的耗时对比"""
+    rng = random.Random(0)
+    packets = [_angle(*(rng.randrange(0x10000) for _ in range(6))) for _ in range(1000)]
+    data = b"".join(packets)
+    assert list(zip(*YCYBLEProtocol.parse_angle_batch(data).columns)) \
+           == [YCYBLEProtocol.parse_response(p).angle_data for p in packets]
+    number = 5
+    single = min(timeit.repeat(
+        lambda: [YCYBLEProtocol.parse_response(p) for p in packets], number=number, repeat=3
+    )) / number * 1e3
+    batch = min(timeit.repeat(
+        lambda: YCYBLEProtocol.parse_angle_batch(data), number=number, repeat=3
+    )) / number * 1e3
+    assert batch < single
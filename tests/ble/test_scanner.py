@@ -0,0 +1,180 @@
+"""
+设备缓存与扫描器测试 (使用模拟的 BleakScanner)
+"""
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from pydglab_ws.ble import scanner as scanner_module
+from pydglab_ws.ble.cache import YCYDeviceCache
+from pydglab_ws.ble.models import YCYDevice
+from pydglab_ws.ble.scanner import YCYScanner, SERVICE_UUID
+from pydglab_ws.client.ble import YCYBLEClient
+from pydglab_ws.server.ble_compat import BLEThread
+from .device_simulator import SimulatedYCYDevice
+
+
+def _advertisement(address: str, name: str, rssi: int = -50, service_uuids=(SERVICE_UUID,)):
+    return SimpleNamespace(address=address, name=name), SimpleNamespace(service_uuids=list(service_uuids), rssi=rssi)
+
+
+class _FakeBleakScanner:
+    """按顺序给出广播的 BleakScanner，记录检查过的广播数"""
+    advertisements = []
+    inspected = 0
+
+    @classmethod
+    async def discover(cls, timeout: float, return_adv: bool):
+        cls.inspected = len(cls.advertisements)
+        return {device.address: (device, adv) for device, adv in cls.advertisements}
+
+    @classmethod
+    async def find_device_by_filter(cls, filterfunc, timeout: float):
+        cls.inspected = 0
+        for device, adv in cls.advertisements:
+            cls.inspected += 1
+            if filterfunc(device, adv):
+                return device
+        return None
+
+
+@pytest.fixture
+def fake_scanner(monkeypatch):
+    _FakeBleakScanner.advertisements = [
+        _advertisement("00:00:00:00:00:01", "Other", service_uuids=()),
+        _advertisement("00:00:00:00:00:02", "YCY-A", rssi=-40),
+        _advertisement("00:00:00:00:00:03", "YCY-B", service_uuids=(SERVICE_UUID.upper(),)),
+        _advertisement("00:00:00:00:00:04", "YCY-C"),
+    ]
+    monkeypatch.setattr(scanner_module, "BleakScanner", _FakeBleakScanner)
+    return _FakeBleakScanner
+
+
+class TestDeviceCache:
+    """设备缓存测试"""
+
+    def test_round_trip(self, tmp_path):
+        """写入后重新读取，最近发现的在前，缺少的名称保留之前的记录"""
+        path = tmp_path / "cache" / "devices.json"
+        cache = YCYDeviceCache(path)
+        cache.update(YCYDevice("AA:00:00:00:00:01", "YCY-1", -60), timestamp=100)
+        cache.update(YCYDevice("AA:00:00:00:00:02", "YCY-2", -50), timestamp=200)
+        cache.update(YCYDevice("aa:00:00:00:00:01"), timestamp=300)
+        cache.save()
+        assert [p.name for p in path.parent.iterdir()] == ["devices.json"]
+
+        loaded = YCYDeviceCache(path, max_age=None)
+        assert [device.name for device in loaded.devices()] == ["YCY-1", "YCY-2"]
+        assert loaded.devices()[0].rssi == -60
+        assert loaded.last_seen("AA:00:00:00:00:01") == 300
+
+    def test_eviction_and_expiry(self, tmp_path):
+        """超出数量上限时淘汰最久未发现的设备，过期的设备不再返回"""
+        cache = YCYDeviceCache(tmp_path / "devices.json", max_entries=2, max_age=50)
+        for i in range(3):
+            cache.update(YCYDevice(f"AA:00:00:00:00:0{i}"), timestamp=100 * i)
+        assert len(cache) == 2 and cache.last_seen("AA:00:00:00:00:00") is None
+        assert [device.address for device in cache.devices(now=220)] == ["AA:00:00:00:00:02"]
+        cache.remove("aa:00:00:00:00:02")
+        assert cache.devices(now=220) == []
+
+    def test_invalid_file(self, tmp_path):
+        """内容无效或版本不同的缓存文件视为空"""
+        path = tmp_path / "devices.json"
+        path.write_text("{not json")
+        assert len(YCYDeviceCache(path)) == 0
+        path.write_text(json.dumps({"version": 0, "devices": [{"address": "x", "last_seen": 0}]}))
+        assert len(YCYDeviceCache(path)) == 0
+        assert len(YCYDeviceCache(tmp_path / "missing.json")) == 0
+
+    def test_unwritable(self, tmp_path):
+        """无法写入时不抛出异常"""
+        blocker = tmp_path / "file"
+        blocker.write_text("")
+        cache = YCYDeviceCache(blocker / "devices.json")
+        cache.update(YCYDevice("AA:00:00:00:00:01"))
+        cache.save()
+
+
+class TestScanner:
+    """扫描器测试"""
+
+    @pytest.mark.asyncio
+    async def test_scan_updates_cache(self, fake_scanner, tmp_path):
+        """完整扫描按服务 UUID 过滤 (不区分大小写)，并记录到缓存"""
+        cache = YCYDeviceCache(tmp_path / "devices.json")
+        devices = await YCYScanner.scan(timeout=0, cache=cache)
+        assert [device.name for device in devices] == ["YCY-A", "YCY-B", "YCY-C"]
+        assert len(YCYDeviceCache(cache.path)) == 3
+
+    @pytest.mark.asyncio
+    async def test_find_device_early_exit(self, fake_scanner, tmp_path):
+        """发现第一个满足条件的设备后立即停止"""
+        cache = YCYDeviceCache(tmp_path / "devices.json")
+        device = await YCYScanner.find_device(timeout=0, cache=cache)
+        assert device == YCYDevice("00:00:00:00:00:02", "YCY-A", -40)
+        assert fake_scanner.inspected == 2
+        assert YCYScanner.cached_devices(cache=YCYDeviceCache(cache.path)) == [device]
+
+        device = await YCYScanner.find_device(name="ycy-b", timeout=0)
+        assert device.address == "00:00:00:00:00:03" and fake_scanner.inspected == 3
+        assert await YCYScanner.find_device(address="00:00:00:00:00:01", timeout=0) is None
+
+    def test_cached_devices_filter(self, tmp_path):
+        """按地址或名称筛选缓存中的设备"""
+        cache = YCYDeviceCache(tmp_path / "devices.json")
+        cache.update(YCYDevice("AA:00:00:00:00:01", "YCY-1"), YCYDevice("AA:00:00:00:00:02", "YCY-2"))
+        assert [d.name for d in YCYScanner.cached_devices(name="ycy-2", cache=cache)] == ["YCY-2"]
+        assert [d.name for d in YCYScanner.cached_devices(address="aa:00:00:00:00:01", cache=cache)] == ["YCY-1"]
+
+
+class _SimulatedBLEThread(BLEThread):
+    """使用模拟设备的 BLE 线程，只用于调用连接流程"""
+
+    def __init__(self, devices: dict, cache: YCYDeviceCache):
+        super().__init__(scan_timeout=0, strength_limit=200, auto_reconnect=False, device_cache=cache)
+        self.simulated = devices
+        self.attempts = []
+
+    def _create_client(self, device, connect_timeout=None) -> YCYBLEClient:
+        address = device if isinstance(device, str) else device.address
+        self.attempts.append((address, connect_timeout))
+        return YCYBLEClient(device, transport_factory=self.simulated[address].transport_factory)
+
+
+class TestFastConnect:
+    """优先连接缓存中的设备"""
+
+    @pytest.mark.asyncio
+    async def test_cached_device_skips_scan(self, fake_scanner, tmp_path, monkeypatch):
+        """缓存中的设备可用时直接连接，不进行扫描；不可用的设备被跳过"""
+        cache = YCYDeviceCache(tmp_path / "devices.json")
+        cache.update(YCYDevice("AA:00:00:00:00:01", "YCY-1"), timestamp=time.time() - 10)
+        cache.update(YCYDevice("AA:00:00:00:00:02", "YCY-2"))
+        gone, nearby = SimulatedYCYDevice(), SimulatedYCYDevice()
+        gone.available = False
+
+        async def no_scan(*args, **kwargs):
+            raise AssertionError("should not scan")
+
+        monkeypatch.setattr(YCYScanner, "find_device", no_scan)
+        thread = _SimulatedBLEThread({"AA:00:00:00:00:02": gone, "AA:00:00:00:00:01": nearby}, cache)
+        await thread._connect()
+        assert thread._client.connected and nearby.connected
+        assert [address for address, _ in thread.attempts] == ["AA:00:00:00:00:02", "AA:00:00:00:00:01"]
+        assert all(timeout is not None for _, timeout in thread.attempts)
+        assert YCYDeviceCache(cache.path).devices()[0].address == "AA:00:00:00:00:01"
+        await thread._client.disconnect()
+
+    @pytest.mark.asyncio
+    async def test_fallback_to_scan(self, fake_scanner, tmp_path):
+        """缓存为空时扫描到第一台设备后立即连接，并记录到缓存"""
+        cache = YCYDeviceCache(tmp_path / "devices.json")
+        thread = _SimulatedBLEThread({"00:00:00:00:00:02": SimulatedYCYDevice()}, cache)
+        await thread._connect()
+        assert thread._client.connected
+        assert thread.attempts == [("00:00:00:00:00:02", None)]
+        assert [device.address for device in YCYDeviceCache(cache.path).devices()] == ["00:00:00:00:00:02"]
+        await thread._client.disconnect()
@@ -0,0 +1,300 @@
+"""
+使用模拟设备的役次元 BLE 客户端端到端测试
+"""
+import asyncio
+
+import pytest
+
+from pydglab_ws.ble.enums import YCYChannel, YCYMode, YCYCommand, YCYQueryType, YCYError, MotorState, ElectrodeStatus
+from pydglab_ws.ble.exceptions import DisconnectedError
+from pydglab_ws.client.ble import YCYBLEClient
+from pydglab_ws.enums import Channel, StrengthOperationType
+from .device_simulator import SimulatedYCYDevice, SimulatedTransport, notification, angle_notification
+
+
+def _client(device: SimulatedYCYDevice, **kwargs) -> YCYBLEClient:
+    return YCYBLEClient("00:00:00:00:00:00", transport_factory=device.transport_factory, **kwargs)
+
+
+class TestSimulatedDevice:
+    """模拟设备测试"""
+
+    @pytest.mark.asyncio
+    async def test_channel_control_and_queries(self):
+        """设备解码通道控制命令，查询应答反映设备状态"""
+        device = SimulatedYCYDevice(notify_latency=0.01, battery=42)
+        async with _client(device) as client:
+            assert device.connected
+            assert await client.set_strength(Channel.A, StrengthOperationType.SET_TO, 100)
+            assert await client.set_motor(MotorState.PRESET_2)
+            assert device.channels[YCYChannel.A].enabled
+            assert device.channels[YCYChannel.A].strength == client._channel_a_strength
+            assert not device.channels[YCYChannel.B].enabled
+            assert device.motor == MotorState.PRESET_2
+
+            battery, status_a, status_b = await client.get_device_status(timeout=0.5)
+            assert battery == 42
+            assert status_a.enabled and status_a.strength == client._channel_a_strength
+            assert status_a.electrode_status == ElectrodeStatus.CONNECTED_ACTIVE
+            assert not status_b.enabled
+
+            assert await client.stop_all()
+            assert not any(channel.enabled for channel in device.channels.values())
+            assert device.motor == MotorState.OFF
+        assert not device.connected
+        assert [event.kind for event in device.timeline][::len(device.timeline) - 1] == ["connect", "disconnect"]
+
+    @pytest.mark.asyncio
+    async def test_combined_custom_wave(self):
+        """两个通道相同的自定义波形合并为一条 AB 命令，设备对两个通道都输出"""
+        device = SimulatedYCYDevice()
+        async with _client(device) as client:
+            for channel in Channel.A, Channel.B:
+                await client.set_strength(channel, StrengthOperationType.SET_TO, 50)
+            assert await client._set_custom_waves({Channel.A: (50, 20), Channel.B: (50, 20)})
+            ab_frames = [frame for frame in device.frames(YCYCommand.CHANNEL_CONTROL) if frame[2] == YCYChannel.AB]
+            assert len(ab_frames) == 1
+            for channel in YCYChannel.A, YCYChannel.B:
+                state = device.channels[channel]
+                assert state.mode == YCYMode.CUSTOM and (state.frequency, state.pulse_width) == (50, 20)
+                assert state.pulses == 1
+
+    @pytest.mark.asyncio
+    async def test_bad_frame_reports_error(self):
+        """校验和错误的命令被设备拒绝并上报异常"""
+        device = SimulatedYCYDevice()
+        async with _client(device) as client:
+            await client._write(bytes([0x35, YCYCommand.MOTOR_CONTROL, MotorState.ON, 0x00]))
+            event = await client.recv_event(timeout=0.1)
+            assert event.response_type == YCYQueryType.ERROR and event.error_code == YCYError.CHECKSUM_ERROR
+            assert device.motor == MotorState.OFF
+
+    @pytest.mark.asyncio
+    async def test_packet_loss_and_timeline(self):
+        """丢失的命令记录在时间线中，不改变设备状态；写入依次进行且带有延迟"""
+        device = SimulatedYCYDevice(write_latency=0.01, loss=0.5, seed=1)
+        async with _client(device) as client:
+            for value in range(1, 21):
+                await client.set_strength(Channel.A, StrengthOperationType.SET_TO, value)
+            lost = device.events("lost")
+            written = device.events("write", YCYCommand.CHANNEL_CONTROL)
+            assert lost and written and len(lost) + len(written) == 20
+            times = [event.time for event in device.timeline if event.kind in ("lost", "write")]
+            assert all(b - a >= 0.009 for a, b in zip(times, times[1:]))
+            last = written[-1].data
+            assert device.channels[YCYChannel.A].strength == int.from_bytes(last[4:6], "big")
+            # 查询丢失时超时
+            device.loss = 1.0
+            assert await client.get_battery(timeout=0.05) == -1
+
+    @pytest.mark.asyncio
+    async def test_notification_burst(self):
+        """突发的角度数据通知全部进入数据流，状态上报进入事件队列"""
+        device = SimulatedYCYDevice()
+        async with _client(device) as client:
+            async with client.angle_stream(buffer_size=256) as stream:
+                assert device.angle_reporting
+                device.inject_burst(angle_notification(i, 0, 0, 0, 0, 0) for i in range(200))
+                device.set_electrode(YCYChannel.B, ElectrodeStatus.NOT_CONNECTED)
+                assert stream.stats.received == 200 and stream.stats.dropped == 0
+                assert [(await stream.recv(timeout=0.1)).values[0] for _ in range(3)] == [0, 1, 2]
+            assert not device.angle_reporting
+            event = await client.recv_event(timeout=0.1)
+            assert event.response_type == YCYQueryType.CHANNEL_B_STATUS
+            assert event.channel_status.electrode_status == ElectrodeStatus.NOT_CONNECTED
+
+    @pytest.mark.asyncio
+    async def test_drop_connection(self):
+        """设备端断开时客户端收到断开回调，之后可以重新连接"""
+        device = SimulatedYCYDevice()
+        client = _client(device)
+        assert await client.connect()
+        device.drop_connection()
+        assert not client.connected
+        device.available = False
+        assert not await client.connect()
+        device.available = True
+        assert await client.connect()
+        assert device.connections == 2
+        await client.disconnect()
+
+    @pytest.mark.asyncio
+    async def test_inject_burst_interval(self):
+        """按间隔发送的通知在时间线中依次排列"""
+        device = SimulatedYCYDevice()
+        async with _client(device) as client:
+            device.inject_burst([notification(YCYQueryType.BATTERY, level) for level in (90, 80, 70)], interval=0.02)
+            events = [await client.recv_event(timeout=0.2) for _ in range(3)]
+            assert [event.battery for event in events] == [90, 80, 70]
+            times = [event.time for event in device.events("notify")]
+            assert times[-1] - times[0] >= 0.03
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_write_jitter_benchmark():
+    """
+    在带延迟的模拟链路上比较逐条写入与合并写入
+
+    每 2 毫秒调整一次强度，链路每次写入耗时 5 毫秒：逐条写入时命令排队，
+    最后一条命令的送达延迟随命令数增长；合并窗口内只写入最新的一条，送达延迟保持有界
+    """
+    results = {}
+    for window in 0.0, 0.02:
+        device = SimulatedYCYDevice(write_latency=0.005)
+        async with _client(device, write_coalesce_window=window) as client:
+            loop = asyncio.get_running_loop()
+            tasks = []
+            for value in range(1, 51):
+                tasks.append(asyncio.create_task(
+                    client.set_strength(Channel.A, StrengthOperationType.SET_TO, value)
+                ))
+                await asyncio.sleep(0.002)
+            last_sent = loop.time()
+            await asyncio.gather(*tasks)
+            frames = device.events("write", YCYCommand.CHANNEL_CONTROL)
+            results[window] = (len(frames), frames[-1].time - last_sent)
+            assert device.channels[YCYChannel.A].strength == client._channel_a_strength
+    assert results[0.02][0] < results[0.0][0]
+    assert results[0.02][1] < results[0.0][1]
+
+
+class TestAutoReconnect:
+    """自动重连测试"""
+
+    @pytest.mark.asyncio
+    async def test_reconnect_replays_state(self):
+        """意外断开后自动重连，恢复通道强度与数据流上报，并记录重连耗时"""
+        device = SimulatedYCYDevice()
+        async with _client(device, auto_reconnect=True, reconnect_delay=0.02) as client:
+            await client.set_strength(Channel.A, StrengthOperationType.SET_TO, 80)
+            strength = device.channels[YCYChannel.A].strength
+            async with client.step_stream():
+                device.drop_connection()
+                # 设备重启后状态丢失
+                device.channels[YCYChannel.A].enabled = False
+                assert not client.connected and client.reconnecting
+                with pytest.raises(DisconnectedError):
+                    await client.set_strength(Channel.A, StrengthOperationType.SET_TO, 10)
+
+                for _ in range(50):
+                    if client.connected and not client.reconnecting:
+                        break
+                    await asyncio.sleep(0.01)
+                assert client.connected
+                assert device.channels[YCYChannel.A].enabled
+                assert device.channels[YCYChannel.A].strength == strength
+                assert device.step_reporting
+
+            stats = client.connection_stats
+            assert stats.connects == 2 and stats.disconnects == 1 and stats.reconnects == 1
+            assert 0.01 <= stats.last_reconnect_latency == stats.max_reconnect_latency < 0.5
+            assert stats.uptime < stats.total_uptime
+        assert device.connections == 2 and client.connection_stats.uptime == 0
+
+    @pytest.mark.asyncio
+    async def test_backoff_until_available(self):
+        """设备不可用时按指数增长的等待时间重试"""
+        device = SimulatedYCYDevice()
+        async with _client(device, auto_reconnect=True, reconnect_delay=0.01, reconnect_max_delay=0.04) as client:
+            device.available = False
+            device.drop_connection()
+            await asyncio.sleep(0.15)
+            failed = client.connection_stats.failed_attempts
+            assert 2 <= failed <= 10
+            device.available = True
+            for _ in range(20):
+                if client.connected:
+                    break
+                await asyncio.sleep(0.01)
+            assert client.connected and client.connection_stats.reconnects == 1
+
+    @pytest.mark.asyncio
+    async def test_max_attempts(self):
+        """超过最大尝试次数后停止重连，主动断开不会触发重连"""
+        device = SimulatedYCYDevice()
+        client = _client(device, auto_reconnect=True, reconnect_delay=0.01, reconnect_max_attempts=2)
+        assert await client.connect()
+        device.available = False
+        device.drop_connection()
+        await asyncio.sleep(0.1)
+        assert not client.reconnecting and client.connection_stats.failed_attempts == 2
+
+        device.available = True
+        assert await client.connect()
+        await client.disconnect()
+        await asyncio.sleep(0.03)
+        assert not client.reconnecting and device.connections == 2
+        assert client.connection_stats.disconnects == 1
+
+    @pytest.mark.asyncio
+    async def test_waveform_paused_while_disconnected(self):
+        """断开期间波形暂停播放而不被丢弃，重连后继续播放"""
+        device = SimulatedYCYDevice()
+        async with _client(device, auto_reconnect=True, reconnect_delay=0.1) as client:
+            await client.set_strength(Channel.A, StrengthOperationType.SET_TO, 50)
+            await client.add_pulses(Channel.A, *[((10, 10, 10, 10), (50, 50, 50, 50))] * 10)
+            await asyncio.sleep(0.15)
+            device.drop_connection()
+            player = client._waveform_player_a
+            remaining = player.queue_size
+            assert player.paused and 0 < remaining < 10
+            await asyncio.sleep(0.03)
+            assert player.queue_size == remaining
+
+            for _ in range(30):
+                if client.connected:
+                    break
+                await asyncio.sleep(0.01)
+            assert not player.paused
+            await asyncio.sleep(0.25)
+            assert player.queue_size < remaining
+            assert device.channels[YCYChannel.A].pulses == player.stats.ticks
+
+    @pytest.mark.asyncio
+    async def test_failed_notify_disconnects_transport(self):
+        """开始接收通知失败时断开已建立的连接，重试不会遗留连接"""
+        device = SimulatedYCYDevice()
+        transports = []
+        failures = [0]
+
+        class _FlakyTransport(SimulatedTransport):
+            async def start_notify(self, callback):
+                if failures[0] > 0:
+                    failures[0] -= 1
+                    raise OSError("notify failed")
+                await super().start_notify(callback)
+
+        def factory(address, disconnected_callback):
+            transports.append(_FlakyTransport(device, disconnected_callback))
+            return transports[-1]
+
+        client = YCYBLEClient("00:00:00:00:00:00", transport_factory=factory, auto_reconnect=True,
+                              reconnect_delay=0.01)
+        assert await client.connect()
+        device.drop_connection()
+        failures[0] = 2
+        for _ in range(50):
+            if client.connected:
+                break
+            await asyncio.sleep(0.01)
+        assert client.connected and client.connection_stats.failed_attempts == 2
+        assert [transport.is_connected for transport in transports] == [False] * 3 + [True]
+        await client.disconnect()
+
+    @pytest.mark.asyncio
+    async def test_manual_connect_during_reconnect(self):
+        """自动重连期间手动连接时停止自动重连，不会同时建立两个连接"""
+        device = SimulatedYCYDevice(connect_latency=0.02)
+        client = _client(device, auto_reconnect=True, reconnect_delay=0.01)
+        assert await client.connect()
+        device.available = False
+        device.drop_connection()
+        await asyncio.sleep(0.05)
+        assert client.reconnecting
+        device.available = True
+        assert await client.connect()
+        assert not client.reconnecting
+        await asyncio.sleep(0.1)
+        assert client.connected and device.connections == 2
+        await client.disconnect()
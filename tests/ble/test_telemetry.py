@@ -0,0 +1,131 @@
+"""
+角度与计步数据流测试 (使用模拟的传输层)
+"""
+import asyncio
+
+import pytest
+
+from pydglab_ws.ble.enums import YCYQueryType
+from pydglab_ws.ble.protocol import YCYBLEProtocol
+from .test_client import _new_client, _packet
+
+
+def _angle(*values: int) -> bytearray:
+    return bytearray(_packet(YCYQueryType.ANGLE_DATA, *b"".join(v.to_bytes(2, "big") for v in values)))
+
+
+def _steps(count: int) -> bytearray:
+    return bytearray(_packet(YCYQueryType.STEP_COUNT, count >> 8, count & 0xFF))
+
+
+class TestTelemetryStream:
+    """数据流测试"""
+
+    @pytest.mark.asyncio
+    async def test_angle_stream(self):
+        """开始时开启上报，结束时关闭上报，数据按接收顺序取出且不进入事件队列"""
+        client = _new_client()
+        async with client.angle_stream() as stream:
+            assert client._transport.written[-1] == YCYBLEProtocol.build_angle_control(True)
+            for i in range(3):
+                client._notification_handler(0, _angle(i, 1, 2, 3, 4, 5))
+            samples = [await stream.recv(timeout=1) for _ in range(3)]
+        assert client._transport.written[-1] == YCYBLEProtocol.build_angle_control(False)
+        assert [sample.values[0] for sample in samples] == [0, 1, 2]
+        assert samples[0].timestamp <= samples[1].timestamp <= samples[2].timestamp
+        assert await client.recv_event(timeout=0) is None
+        assert stream.stats.received == 3
+
+    @pytest.mark.asyncio
+    async def test_two_streams_share_reporting(self):
+        """同类型的两个数据流都关闭后才关闭上报，关闭其中一个不影响另一个"""
+        client = _new_client()
+        disable = YCYBLEProtocol.build_angle_control(False)
+        async with client.angle_stream() as first:
+            async with client.angle_stream() as second:
+                client._notification_handler(0, _angle(1, 0, 0, 0, 0, 0))
+            assert disable not in client._transport.written
+            client._notification_handler(0, _angle(2, 0, 0, 0, 0, 0))
+            assert [(await first.recv(timeout=1)).values[0] for _ in range(2)] == [1, 2]
+            assert second.stats.received == 1
+        assert client._transport.written[-1] == disable
+        assert client._transport.written.count(disable) == 1
+
+    @pytest.mark.asyncio
+    async def test_step_stream(self):
+        """计步数据流"""
+        client = _new_client()
+        async with client.step_stream() as stream:
+            assert client._transport.written[-1] == YCYBLEProtocol.build_step_control(0x01)
+            client._notification_handler(0, _steps(300))
+            sample = await stream.recv(timeout=1)
+        assert sample.values == (300,)
+        assert client._transport.written[-1] == YCYBLEProtocol.build_step_control(0x00)
+
+    @pytest.mark.asyncio
+    async def test_ring_buffer_drops_oldest(self):
+        """缓冲区已满时丢弃最早的未取走的数据并计数"""
+        client = _new_client()
+        stream = client.angle_stream(buffer_size=4)
+        await stream.start()
+        for i in range(10):
+            client._notification_handler(0, _angle(i, 0, 0, 0, 0, 0))
+        stats = stream.stats
+        assert stats.received == 10 and stats.dropped == 6 and stats.buffered == 4
+        assert [stream.recv_nowait().values[0] for _ in range(4)] == [6, 7, 8, 9]
+        assert stream.recv_nowait() is None
+        await stream.close()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("kind", ["angle", "step"])
+    async def test_checksum_error(self, kind):
+        """校验和错误的数据被丢弃并计数，不会从通知回调中抛出异常"""
+        client = _new_client()
+        async with getattr(client, f"{kind}_stream")() as stream:
+            bad = _angle(1, 2, 3, 4, 5, 6) if kind == "angle" else _steps(300)
+            bad[-1] ^= 0xFF
+            client._notification_handler(0, bad)
+            assert stream.stats.checksum_errors == 1 and stream.stats.received == 0
+
+    @pytest.mark.asyncio
+    async def test_aggregate_window(self):
+        """按时间窗口聚合最近的数据，无论是否已被取走"""
+        client = _new_client()
+        async with client.angle_stream() as stream:
+            client._notification_handler(0, _angle(100, 0, 0, 0, 0, 0))
+            await asyncio.sleep(0.1)
+            for value in (10, 20, 30):
+                client._notification_handler(0, _angle(value, value * 2, 0, 0, 0, 0))
+            while stream.recv_nowait() is not None:
+                pass
+            window = stream.aggregate(0.05)
+        assert window.count == 3
+        assert window.mean[:2] == (20.0, 40.0)
+        assert window.peak[:2] == (30, 60)
+        assert window.start <= window.end
+        assert stream.aggregate(0.05, now=window.start - 1) is None
+
+    @pytest.mark.asyncio
+    async def test_iteration_ends_on_close(self):
+        """数据流关闭且缓冲区为空时结束迭代"""
+        client = _new_client()
+        stream = client.angle_stream()
+        await stream.start()
+        client._notification_handler(0, _angle(1, 0, 0, 0, 0, 0))
+
+        async def close_later():
+            await asyncio.sleep(0.05)
+            await stream.close()
+
+        asyncio.create_task(close_later())
+        samples = [sample async for sample in stream]
+        assert len(samples) == 1
+
+    @pytest.mark.asyncio
+    async def test_query_not_intercepted(self):
+        """数据流运行期间，主动查询计步数据仍能收到应答"""
+        client = _new_client(replies={YCYQueryType.STEP_COUNT: _steps(42)})
+        async with client.step_stream() as stream:
+            response = await client._query(YCYQueryType.STEP_COUNT)
+        assert response.step_count == 42
+        assert stream.stats.received == 0
@@ -3,10 +3,24 @@ import pytest
 from pytest_asyncio import is_async_test
 
 
-def pytest_collection_modifyitems(items):
+def pytest_addoption(parser):
+    parser.addoption("--benchmark", action="store_true", default=False, help="运行对比耗时的基准测试")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: 对比耗时的基准测试，结果受机器负载影响，仅在指定 --benchmark 时运行")
+
+
+def pytest_collection_modifyitems(config, items):
     # 将所有 asyncio test 标记为在会话内使用同一事件循环
     # 该操作是必须的，否则将导致测试时服务端收取不到来自 App 端的消息
     pytest_asyncio_tests = (item for item in items if is_async_test(item))
     session_scope_marker = pytest.mark.asyncio(scope="session")
     for async_test in pytest_asyncio_tests:
         async_test.add_marker(session_scope_marker, append=False)
+
+    if not config.getoption("--benchmark"):
+        skip_benchmark = pytest.mark.skip(reason="基准测试需要指定 --benchmark")
+        for item in items:
+            if "benchmark" in item.keywords:
+                item.add_marker(skip_benchmark)
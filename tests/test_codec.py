@@ -0,0 +1,103 @@
+import itertools
+import timeit
+from uuid import uuid4, uuid1
+
+import pytest
+from pydantic import ValidationError
+
+from pydglab_ws.codec import encode_message, decode_message
+from pydglab_ws.enums import MessageType, RetCode, MessageDataHead
+from pydglab_ws.models import WebSocketMessage
+
+CLIENT_ID = uuid4()
+TARGET_ID = uuid4()
+
+
+def _pydantic_dump(message: WebSocketMessage) -> str:
+    return message.model_dump_json(by_alias=True, context={"separators": (",", ":")})
+
+
+@pytest.mark.parametrize(
+    "msg_type,client_id,target_id,message",
+    itertools.product(
+        list(MessageType),
+        [None, CLIENT_ID],
+        [None, TARGET_ID],
+        [
+            *RetCode,
+            *MessageDataHead,
+            "strength-1+2+200",
+            'pulse-A:["0000000000000000","0a0a0a0a64646464"]',
+            "feedback-9",
+            "",
+            'quote " backslash \\ control \x00\x1f\n\t del \x7f',
+            "中文 é 😀  ",
+        ]
+    )
+)
+def test_codec_matches_pydantic(msg_type, client_id, target_id, message):
+    model = WebSocketMessage(type=msg_type, client_id=client_id, target_id=target_id, message=message)
+    raw_message = encode_message(model)
+    assert raw_message == _pydantic_dump(model)
+    decoded = decode_message(raw_message)
+    assert decoded == WebSocketMessage.model_validate_json(raw_message)
+    assert decoded.model_fields_set == WebSocketMessage.model_validate_json(raw_message).model_fields_set
+
+
+@pytest.mark.parametrize(
+    "raw_message",
+    [
+        '{"type":"bind","clientId":"","targetId":"","message":"DGLAB"}',
+        f'{{"type":"msg","clientId":"{CLIENT_ID}","message":" +200\\n"}}',
+        f'{{"type":"msg","clientId":"{str(CLIENT_ID).upper()}","targetId":null,"message":"201"}}',
+        f'{{"type":"msg","client_id":"{CLIENT_ID}","target_id":"{TARGET_ID}","message":"clear-1"}}',
+        f'{{"type":"msg","clientId":"{CLIENT_ID.hex}","targetId":"","message":"405","extra":1}}',
+        f'{{"type":"heartbeat","clientId":"{TARGET_ID}","targetId":"{CLIENT_ID}","message":200}}',
+        b'{"type":"break","clientId":"","targetId":"","message":"209"}',
+    ]
+)
+def test_decode_message_matches_pydantic(raw_message):
+    assert decode_message(raw_message) == WebSocketMessage.model_validate_json(raw_message)
+
+
+@pytest.mark.parametrize(
+    "raw_message",
+    [
+        "f05f7b2c-921f-426e-a79b-f275fa5623b4",
+        "[]",
+        "{type=bind}",
+        '""',
+        '{"type":"bind","clientId":"","targetId":""}',
+        '{"type":"unknown","clientId":"","targetId":"","message":""}',
+        f'{{"type":"msg","clientId":"{uuid1()}","targetId":"","message":""}}',
+    ]
+)
+def test_decode_message_invalid(raw_message):
+    with pytest.raises(ValidationError):
+        WebSocketMessage.model_validate_json(raw_message)
+    with pytest.raises(ValueError):
+        decode_message(raw_message)
+
+
+@pytest.mark.benchmark
+def test_codec_benchmark():
+    """编解码的单条消息耗时，与 Pydantic 序列化对比"""
+    model = WebSocketMessage(
+        type=MessageType.MSG,
+        client_id=CLIENT_ID,
+        target_id=TARGET_ID,
+        message="strength-10+20+100+200"
+    )
+    raw_message = _pydantic_dump(model)
+    number = 2000
+
+    def per_message(func) -> float:
+        return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+    pydantic_encode = per_message(lambda: _pydantic_dump(model))
+    codec_encode = per_message(lambda: encode_message(model))
+    pydantic_decode = per_message(lambda: WebSocketMessage.model_validate_json(raw_message))
+    codec_decode = per_message(lambda: decode_message(raw_message))
+
+    assert codec_encode < pydantic_encode
+    assert codec_decode < pydantic_decode
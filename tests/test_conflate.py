@@ -0,0 +1,132 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+from websockets.client import connect
+
+from pydglab_ws.client import DGLabLocalClient, DGLabConflatedReceiver, DGLabWSConnect, DGLabWSClient
+from pydglab_ws.enums import MessageType, RetCode, FeedbackButton
+from pydglab_ws.exceptions import InvalidStrengthData
+from pydglab_ws.models import StrengthData, WebSocketMessage
+from pydglab_ws.server.server import DGLabWSServer
+from tests.app_simulator import DGLabAppSimulator
+
+WEBSOCKET_HOST = "127.0.0.1"
+CONFLATE_PORT = 5682
+CONFLATE_URI = f"ws://{WEBSOCKET_HOST}:{CONFLATE_PORT}"
+
+CLIENT_ID = uuid4()
+TARGET_ID = uuid4()
+
+
+async def _new_bound_client():
+    queues = {}
+
+    async def sender(_):
+        pass
+
+    client = DGLabLocalClient(CLIENT_ID, sender, queues.__setitem__, max_queue=0)
+    queue = queues[CLIENT_ID]
+    await queue.put(
+        WebSocketMessage(type=MessageType.BIND, client_id=CLIENT_ID, target_id=TARGET_ID, message=RetCode.SUCCESS)
+    )
+    return client, queue
+
+
+def _msg(message) -> WebSocketMessage:
+    return WebSocketMessage(type=MessageType.MSG, client_id=CLIENT_ID, target_id=TARGET_ID, message=message)
+
+
+def _break() -> WebSocketMessage:
+    return WebSocketMessage(
+        type=MessageType.BREAK,
+        client_id=CLIENT_ID,
+        target_id=TARGET_ID,
+        message=RetCode.CLIENT_DISCONNECTED
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "conflate_feedback,expected",
+    [
+        (
+                False,
+                [
+                    FeedbackButton.A1, RetCode.CLIENT_DISCONNECTED, FeedbackButton.A1, FeedbackButton.B1,
+                    RetCode.CLIENT_DISCONNECTED, StrengthData(a=5, b=0, a_limit=200, b_limit=200)
+                ]
+        ),
+        (
+                True,
+                [
+                    RetCode.CLIENT_DISCONNECTED, FeedbackButton.A1, FeedbackButton.B1,
+                    RetCode.CLIENT_DISCONNECTED, StrengthData(a=5, b=0, a_limit=200, b_limit=200)
+                ]
+        ),
+    ]
+)
+async def test_conflated_receiver(conflate_feedback, expected):
+    client, queue = await _new_bound_client()
+    for message in (
+            _msg("strength-1+0+200+200"),
+            _msg("feedback-0"),
+            _msg("strength-2+0+200+200"),
+            _break(),
+            _msg("feedback-0"),
+            _msg("feedback-5"),
+            _break(),
+            _msg("strength-5+0+200+200"),
+    ):
+        await queue.put(message)
+
+    async with DGLabConflatedReceiver(client, conflate_feedback) as receiver:
+        await asyncio.sleep(0.01)
+        assert queue.empty()
+        assert receiver.latest_strength == StrengthData(a=5, b=0, a_limit=200, b_limit=200)
+        assert [await receiver.recv_data() for _ in expected] == expected
+        assert receiver.conflated == 8 - len(expected)
+
+        await queue.put(_msg("strength-6+0+200+200"))
+        assert await asyncio.wait_for(receiver.recv_data(), 1) == StrengthData(a=6, b=0, a_limit=200, b_limit=200)
+
+
+@pytest.mark.asyncio
+async def test_conflated_receiver_exception():
+    client, queue = await _new_bound_client()
+    await queue.put(_msg("strength-1+0+200+200"))
+    await queue.put(_msg("strength-1+0+200"))
+    async with DGLabConflatedReceiver(client) as receiver:
+        assert await asyncio.wait_for(receiver.recv_data(), 1) == StrengthData(a=1, b=0, a_limit=200, b_limit=200)
+        with pytest.raises(InvalidStrengthData):
+            await asyncio.wait_for(receiver.recv_data(), 1)
+
+
+@pytest.mark.asyncio
+async def test_conflated_receiver_ws_client():
+    async with DGLabWSServer(WEBSOCKET_HOST, CONFLATE_PORT):
+        async with DGLabWSConnect(CONFLATE_URI) as client:  # type: DGLabWSClient
+            async with DGLabConflatedReceiver(client) as receiver:
+                async with _AppConnect() as app:
+                    await app.bind(client.client_id)
+                    for a in range(10):
+                        await app.send_strength(StrengthData(a=a, b=0, a_limit=200, b_limit=200))
+                    await asyncio.sleep(0.05)
+                    assert await asyncio.wait_for(receiver.recv_data(), 1) \
+                           == StrengthData(a=9, b=0, a_limit=200, b_limit=200)
+                assert await asyncio.wait_for(receiver.recv_data(), 1) == RetCode.CLIENT_DISCONNECTED
+
+
+class _AppConnect:
+    """模拟 App 连接到服务端"""
+
+    def __init__(self):
+        self._connect = connect(CONFLATE_URI)
+
+    async def __aenter__(self) -> DGLabAppSimulator:
+        app = DGLabAppSimulator(await self._connect.__aenter__())
+        await app.register()
+        return app
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self._connect.__aexit__(exc_type, exc_val, exc_tb)
@@ -0,0 +1,94 @@
+import importlib
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import pydglab_ws
+
+PROJECT_ROOT = Path(__file__).parent.parent
+HEAVY_DEPENDENCIES = ("bleak", "websockets", "pydantic")
+
+PACKAGES = ("pydglab_ws", "pydglab_ws.client", "pydglab_ws.server", "pydglab_ws.ble")
+
+
+def _run(code: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    )
+
+
+def _import_lines(stderr: str):
+    """解析 ``-X importtime`` 的输出，依次给出 (带缩进的模块名, 累计导入耗时 (微秒))"""
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "cumulative" not in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            yield name[1:], int(cumulative)
+
+
+def _import_times(stderr: str) -> dict:
+    return {name.strip(): cumulative for name, cumulative in _import_lines(stderr)}
+
+
+def test_import_does_not_load_dependencies():
+    times = _import_times(_run("import pydglab_ws").stderr)
+    assert "pydglab_ws" in times
+    assert not [name for name in times if name.split(".")[0] in HEAVY_DEPENDENCIES]
+
+
+def test_websocket_usage_does_not_load_bleak():
+    code = "import pydglab_ws; pydglab_ws.DGLabWSClient; pydglab_ws.DGLabShardedWSServer; pydglab_ws.Channel"
+    times = _import_times(_run(code).stderr)
+    assert "websockets" in times and "pydantic" in times
+    assert not [name for name in times if name.split(".")[0] == "bleak"]
+
+
+def test_import_footprint():
+    """延迟导入的模块数远少于导入全部名称时的模块数，比较模块数而不是耗时，结果不受机器负载影响"""
+    lazy = _import_times(_run("import pydglab_ws").stderr)
+    eager = _import_times(_run("from pydglab_ws import *").stderr)
+    assert set(lazy) < set(eager)
+    assert len(lazy) * 2 < len(eager)
+
+
+@pytest.mark.parametrize("package", PACKAGES)
+def test_names_resolve(package):
+    module = importlib.import_module(package)
+    for name in module.__all__:
+        assert getattr(module, name) is not None
+        assert name in dir(module)
+    with pytest.raises(AttributeError):
+        getattr(module, "NotExists")
+
+
+@pytest.mark.parametrize(
+    "package,submodules",
+    [
+        ("pydglab_ws.client", ("base", "conflate", "stream", "connect", "local", "ws", "telemetry", "ble", "manager")),
+        ("pydglab_ws.server", ("server", "sharded", "ble_compat", "ble_multi", "backends")),
+        ("pydglab_ws", ("codec", "enums", "exceptions", "models", "typing", "utils", "pulse_library")),
+        ("pydglab_ws.ble", ("cache", "enums", "exceptions", "models", "protocol", "scanner", "transport", "utils")),
+    ]
+)
+def test_exports_match_submodules(package, submodules):
+    module = importlib.import_module(package)
+    for submodule_name in submodules:
+        submodule = importlib.import_module(f"{package}.{submodule_name}")
+        for name in submodule.__all__:
+            assert getattr(module, name) is getattr(submodule, name)
+
+
+def test_public_names_unchanged():
+    from pydglab_ws.ble.scanner import YCYScanner
+    from pydglab_ws.client.ble import YCYBLEClient
+    from pydglab_ws.server.server import DGLabWSServer
+
+    for package in "pydglab_ws.client", "pydglab_ws.server", "pydglab_ws.ble":
+        module = importlib.import_module(package)
+        assert set(module.__all__) <= set(pydglab_ws.__all__)
+    assert pydglab_ws.YCYScanner is YCYScanner
+    assert pydglab_ws.YCYBLEClient is YCYBLEClient
+    assert pydglab_ws.server.DGLabWSServer is pydglab_ws.DGLabWSServer is DGLabWSServer
+    assert isinstance(pydglab_ws.__version__, str)
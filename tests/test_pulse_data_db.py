@@ -0,0 +1,137 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from scripts import pulse_data_db
+from scripts.pulse_data_db import (
+    read_pulse_data_from_json, generate_result_from_pulse_data, compile_pulse_datas, ramp, pack, main, build, watch
+)
+
+FIXTURE_DIR = Path(__file__).parent / "fixtures" / "pulse_data"
+PULSE_DATAS = read_pulse_data_from_json(FIXTURE_DIR / "appPulseData.json")
+with (FIXTURE_DIR / "expected.json").open(encoding="utf-8") as f:
+    EXPECTED = json.load(f)
+"""改为数组运算前的脚本对每条波形的输出"""
+
+
+def _as_json(value):
+    return json.loads(json.dumps(value))
+
+
+@pytest.mark.parametrize("pulse_data", PULSE_DATAS, ids=[pulse_data.BG_pluseID for pulse_data in PULSE_DATAS])
+def test_matches_previous_output(pulse_data):
+    assert _as_json(generate_result_from_pulse_data(pulse_data)) == EXPECTED[pulse_data.BG_waveName]
+
+
+@pytest.mark.parametrize(
+    "length,start,end,expected",
+    [
+        (0, 10, 20, [20]),
+        (-3, 10, 20, [20]),
+        (1, 10, 20, [20]),
+        (4, 10, 20, [10, 12, 15, 20]),
+        (5, 100, 0, [100, 80, 60, 40, 0]),
+    ]
+)
+def test_ramp(length, start, end, expected):
+    assert ramp(length, start, end) == expected
+
+
+def test_pack():
+    assert pack(list(range(10))) == [(0, 1, 2, 3), (4, 5, 6, 7), (8, 9)]
+    assert pack([]) == []
+
+
+def test_process_pool(monkeypatch):
+    monkeypatch.setattr(pulse_data_db, "PARALLEL_THRESHOLD", 0)
+    assert _as_json(compile_pulse_datas(PULSE_DATAS, workers=2)) == EXPECTED
+
+
+def test_main(tmp_path):
+    main(["--input", str(FIXTURE_DIR / "appPulseData.json"), "--output-dir", str(tmp_path), "--workers", "1"])
+    with (tmp_path / "customPulseData.json").open(encoding="utf-8") as f:
+        assert json.load(f) == EXPECTED
+    for name, result in EXPECTED.items():
+        with (tmp_path / f"{name}.json").open(encoding="utf-8") as f:
+            assert json.load(f) == result
+
+
+def _read_json(path: Path):
+    with path.open(encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "appPulseData.json"
+    path.write_text((FIXTURE_DIR / "appPulseData.json").read_text(encoding="utf-8"), encoding="utf-8")
+    return path
+
+
+def _edit(path: Path, edit):
+    records = _read_json(path)
+    edit(records)
+    path.write_text(json.dumps(records, ensure_ascii=False), encoding="utf-8")
+
+
+def test_incremental_build(source, tmp_path):
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    first = build(source, output_dir, workers=1)
+    assert len(first.compiled) == len(EXPECTED) and not first.reused
+    custom = (output_dir / "customPulseData.json").read_bytes()
+    assert _read_json(output_dir / "customPulseData.json") == EXPECTED
+
+    # 未改变时不重新编译，也不重写合并的输出
+    second = build(source, output_dir, workers=1)
+    assert second.compiled == [] and len(second.reused) == len(EXPECTED) and not second.changed
+    assert (output_dir / "customPulseData.json").read_bytes() == custom
+
+    # 修改一条、删除一条、改名一条
+    def edit(records):
+        records[0]["BG_L"] = 100
+        records[0]["BG_bg_updateTime"] = "2099-01-01 00:00:00"
+        records[1]["BG_waveName"] = "改名"
+        del records[2]
+
+    _edit(source, edit)
+    names = list(EXPECTED)
+    third = build(source, output_dir, workers=1)
+    assert third.compiled == [names[0], "改名"]
+    assert sorted(third.removed) == sorted([names[1], names[2]])
+    assert not (output_dir / f"{names[2]}.json").exists()
+    custom = _read_json(output_dir / "customPulseData.json")
+    assert list(custom) == [names[0], "改名", *names[3:]]
+    assert custom[names[0]] == _read_json(output_dir / f"{names[0]}.json") != EXPECTED[names[0]]
+    assert custom["改名"] == EXPECTED[names[1]]
+    assert all(custom[name] == EXPECTED[name] for name in names[3:])
+    assert not list(output_dir.glob("*.tmp"))
+
+
+def test_missing_output_and_force(source, tmp_path):
+    build(source, tmp_path, workers=1)
+    name = next(iter(EXPECTED))
+    (tmp_path / f"{name}.json").unlink()
+    assert build(source, tmp_path, workers=1).compiled == [name]
+    assert _read_json(tmp_path / f"{name}.json") == EXPECTED[name]
+    assert len(build(source, tmp_path, workers=1, force=True).compiled) == len(EXPECTED)
+
+
+def test_watch(source, tmp_path):
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    results = []
+
+    def on_build(result):
+        results.append(result)
+        if len(results) == 1:
+            # 第一次生成后修改源数据，等待下一次生成
+            _edit(source, lambda records: records[0].update(BG_L=0))
+            stat = source.stat()
+            os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    watch(source, output_dir, workers=1, interval=0.01, should_stop=lambda: len(results) >= 2, on_build=on_build)
+    assert len(results[0].compiled) == len(EXPECTED)
+    assert results[1].compiled == [next(iter(EXPECTED))]
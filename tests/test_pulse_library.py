@@ -0,0 +1,139 @@
+import json
+import random
+import timeit
+
+import pytest
+
+from pydglab_ws.ble.utils import convert_pulse
+from pydglab_ws.enums import Channel
+from pydglab_ws.exceptions import InvalidPulseOperation
+from pydglab_ws.pulse_library import PulseLibrary, write_pulse_library, main
+from pydglab_ws.utils import dump_add_pulses_chunked, dump_add_pulses
+
+PULSES = {
+    "呼吸": [
+        ((10, 10, 10, 10), (0, 0, 0, 0)), ((10, 10, 10, 10), (0, 5, 10, 20)),
+        ((10, 10, 10, 10), (20, 25, 30, 40)), ((0, 0, 0, 0), (0, 0, 0, 0))
+    ],
+    "快速按捏": [
+        ((10, 10, 10, 10), (0, 0, 0, 0)), ((10, 10, 10, 10), (100, 100, 100, 100)),
+    ],
+    "空": [],
+    "Wave": [((240, 200, 100, 10), (1, 2, 3, 4))] * 150,
+}
+
+
+@pytest.fixture
+def library_path(tmp_path):
+    path = tmp_path / "pulses.dgpl"
+    write_pulse_library(path, PULSES)
+    return path
+
+
+def test_round_trip(library_path):
+    with PulseLibrary(library_path) as library:
+        assert list(library) == list(PULSES) and len(library) == len(PULSES)
+        assert "呼吸" in library and "missing" not in library
+        for name, pulses in PULSES.items():
+            assert library.pulse_count(name) == len(pulses)
+            data = library[name]
+            assert len(data) == 8 * len(pulses)
+            assert [(tuple(f), tuple(s)) for f, s in library.operations(name)] == pulses
+            del data
+        with pytest.raises(KeyError):
+            library["missing"]
+
+
+def test_zero_copy_slices(library_path):
+    with PulseLibrary(library_path) as library:
+        data = library["Wave"]
+        assert data.readonly and isinstance(data.obj, type(library._mmap))
+        # 可直接用于 WebSocket 下发波形与役次元波形转换
+        assert dump_add_pulses_chunked(Channel.A, data) == dump_add_pulses_chunked(Channel.A, PULSES["Wave"])
+        operations = library.operations("呼吸")
+        assert dump_add_pulses(Channel.B, *operations) == dump_add_pulses(Channel.B, *PULSES["呼吸"])
+        assert [convert_pulse(operation) for operation in operations] == [
+            convert_pulse(pulse) for pulse in PULSES["呼吸"]
+        ]
+        del data, operations
+
+
+def test_close_with_exported_slices(library_path):
+    library = PulseLibrary(library_path)
+    data = library["Wave"]
+    with pytest.raises(BufferError):
+        library.close()
+    del data
+    library.close()
+    library.close()
+
+
+@pytest.mark.parametrize(
+    "content",
+    [b"", b"DGPL", b"XXXX" + bytes(12), b"DGPL\x02\x00" + bytes(10)]
+)
+def test_invalid_file(tmp_path, content):
+    path = tmp_path / "invalid.dgpl"
+    path.write_bytes(content)
+    with pytest.raises(ValueError):
+        PulseLibrary(path)
+
+
+def test_corrupted_index(library_path):
+    content = bytearray(library_path.read_bytes())
+    # 第一条索引的波形操作条数
+    content[16 + 12:16 + 16] = (10 ** 6).to_bytes(4, "little")
+    library_path.write_bytes(content)
+    with pytest.raises(ValueError):
+        PulseLibrary(library_path)
+
+
+def test_invalid_pulses_not_written(tmp_path):
+    path = tmp_path / "pulses.dgpl"
+    with pytest.raises(InvalidPulseOperation):
+        write_pulse_library(path, {"bad": [((10, 10, 10), (0, 0, 0, 0))]})
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_cli_converter(tmp_path, capsys):
+    source = tmp_path / "customPulseData.json"
+    source.write_text(json.dumps(PULSES, ensure_ascii=False), encoding="utf-8")
+    output = tmp_path / "pulses.dgpl"
+    main([str(source), str(output)])
+    assert "4 waves, 156 pulse operations" in capsys.readouterr().out
+    with PulseLibrary(output) as library:
+        assert [(tuple(f), tuple(s)) for f, s in library.operations("Wave")] == PULSES["Wave"]
+
+
+@pytest.mark.benchmark
+def test_load_benchmark(tmp_path):
+    """加载较大的波形库并取出所有波形：JSON 解析为元组 vs 内存映射"""
+    rng = random.Random(0)
+    pulses = {
+        f"wave-{i}": [
+            (tuple(rng.randrange(10, 241) for _ in range(4)), tuple(rng.randrange(101) for _ in range(4)))
+            for _ in range(2000)
+        ]
+        for i in range(100)
+    }
+    json_path = tmp_path / "customPulseData.json"
+    json_path.write_text(json.dumps(pulses), encoding="utf-8")
+    library_path = tmp_path / "pulses.dgpl"
+    write_pulse_library(library_path, pulses)
+
+    def load_json():
+        with json_path.open(encoding="utf-8") as f:
+            return {
+                name: [(tuple(frequency), tuple(strength)) for frequency, strength in operations]
+                for name, operations in json.load(f).items()
+            }
+
+    def load_library():
+        with PulseLibrary(library_path) as library:
+            total = sum(len(library[name]) for name in library)
+        return total
+
+    assert load_library() == 8 * 2000 * 100
+    json_time = min(timeit.repeat(load_json, number=1, repeat=3))
+    library_time = min(timeit.repeat(load_library, number=1, repeat=3))
+    assert library_time < json_time
@@ -0,0 +1,341 @@
+import asyncio
+import functools
+import os
+import shutil
+import sys
+import tempfile
+from typing import Tuple
+
+import pytest
+from websockets import ConnectionClosedOK
+from websockets.client import connect
+from websockets.frames import Close
+
+from pydglab_ws.client import DGLabWSConnect, DGLabWSClient
+from pydglab_ws.enums import MessageType, RetCode, StrengthOperationType, Channel
+from pydglab_ws.models import StrengthData, WebSocketMessage
+from pydglab_ws.server.server import DGLabWSServer, SendQueuePolicy, _scan_route, _SendQueue
+from pydglab_ws.server.sharded import _ShardWorkerServer, DGLabShardedWSServer
+from tests.app_simulator import DGLabAppSimulator
+
+WEBSOCKET_HOST = "127.0.0.1"
+RELAY_PORT = 5679
+RELAY_URI = f"ws://{WEBSOCKET_HOST}:{RELAY_PORT}"
+SHARD_PORTS = (5680, 5681)
+SHARD_URIS = tuple(f"ws://{WEBSOCKET_HOST}:{port}" for port in SHARD_PORTS)
+SHARDED_PORT = 5682
+SHARDED_URI = f"ws://{WEBSOCKET_HOST}:{SHARDED_PORT}"
+
+
+@pytest.mark.parametrize(
+    "raw_message,expected",
+    [
+        (
+                '{"type":"msg","clientId":"a","targetId":"b","message":"strength-1+1+1"}',
+                ("msg", "a", "b")
+        ),
+        (
+                '{"message":"feedback-0", "targetId" : "b", "clientId": "a", "type": "msg"}',
+                ("msg", "a", "b")
+        ),
+        ('{"type":"msg","clientId":"a","message":"clear-1"}', None),
+        ('{"type":"msg","clientId":"a","clientId":"c","targetId":"b","message":""}', None),
+        ('[{"type":"msg","clientId":"a","targetId":"b","message":""}]', None),
+        (b'{"type":"msg","clientId":"a","targetId":"b","message":""}', None),
+    ]
+)
+def test_scan_route(raw_message, expected: Tuple[str, str, str]):
+    assert _scan_route(raw_message) == expected
+
+
+@pytest.mark.asyncio
+async def test_relay_mode_forwards_raw_frame():
+    async with DGLabWSServer(WEBSOCKET_HOST, RELAY_PORT, relay_mode=True) as server:
+        assert server.relay_mode is True
+        async with DGLabWSConnect(RELAY_URI) as client:  # type: DGLabWSClient
+            async with connect(RELAY_URI) as websocket:
+                app = DGLabAppSimulator(websocket)
+                await app.register()
+                await app.bind(client.client_id)
+                assert await client.bind() == RetCode.SUCCESS
+
+                # 非紧凑格式的消息应被原样转发
+                raw_message = (
+                    f'{{"type": "msg", "clientId": "{client.client_id}", '
+                    f'"targetId": "{app.target_id}", "message": "strength-10+20+100+200"}}'
+                )
+                await websocket.send(raw_message)
+                assert await client.websocket.recv() == raw_message
+
+                await client.set_strength(Channel.A, StrengthOperationType.SET_TO, 10)
+                message = await app.recv_msg_type_data()
+                assert message.message == "strength-1+2+10"
+
+                # 注册回调函数后，回到完整的解析流程
+                received = []
+                server.add_receive_callback(MessageType.MSG, lambda x, y: received.append((x, y)))
+                await app.send_strength(StrengthData(a=1, b=2, a_limit=3, b_limit=4))
+                assert await asyncio.wait_for(client.recv_data(), 1) == StrengthData(a=1, b=2, a_limit=3, b_limit=4)
+                assert len(received) == 1 and received[0][1] is True
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_sweep():
+    async with DGLabWSServer(WEBSOCKET_HOST, RELAY_PORT, heartbeat_interval=0.2) as server:
+        assert server.last_heartbeat_stats is None
+        async with DGLabWSConnect(RELAY_URI) as client:  # type: DGLabWSClient
+            async with connect(RELAY_URI) as websocket:
+                app = DGLabAppSimulator(websocket)
+                await app.register()
+                await app.bind(client.client_id)
+                await client.bind()
+
+                while True:
+                    raw_message = await client.websocket.recv()
+                    if '"heartbeat"' in raw_message:
+                        break
+                assert raw_message == WebSocketMessage(
+                    type=MessageType.HEARTBEAT,
+                    client_id=client.client_id,
+                    target_id=app.target_id,
+                    message=RetCode.SUCCESS
+                ).model_dump_json(by_alias=True, context={"separators": (",", ":")})
+                assert await app.recv_heartbeat() == RetCode.SUCCESS
+                await asyncio.sleep(0.05)
+
+                stats = server.last_heartbeat_stats
+                assert stats is not None
+                assert stats.connections == stats.sent == 2
+                assert stats.timed_out == stats.failed == 0
+                assert 0 <= stats.duration < server.heartbeat_interval
+
+
+@pytest.fixture
+def shard_bus_dir():
+    bus_dir = tempfile.mkdtemp(prefix="pydglab-ws-test-")
+    yield bus_dir
+    shutil.rmtree(bus_dir, ignore_errors=True)
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(sys.platform == "win32", reason="Unix socket is not available")
+async def test_sharded_ws_client(shard_bus_dir):
+    """终端与 App 连接到不同的 worker"""
+    async with _ShardWorkerServer(0, 2, shard_bus_dir, WEBSOCKET_HOST, SHARD_PORTS[0]) as server_0, \
+            _ShardWorkerServer(1, 2, shard_bus_dir, WEBSOCKET_HOST, SHARD_PORTS[1]) as server_1:
+        received = []
+        server_0.add_receive_callback(MessageType.MSG, lambda x, y: received.append((x, y)))
+        server_1.add_receive_callback(MessageType.MSG, lambda x, y: received.append((x, y)))
+        async with DGLabWSConnect(SHARD_URIS[0]) as client:  # type: DGLabWSClient
+            async with connect(SHARD_URIS[1]) as websocket:
+                app = DGLabAppSimulator(websocket)
+                await app.register()
+                assert client.client_id.bytes[0] == 0 and app.target_id.bytes[0] == 1
+                await app.bind(client.client_id)
+                assert await asyncio.wait_for(client.bind(), 1) == RetCode.SUCCESS
+
+                await client.set_strength(Channel.A, StrengthOperationType.SET_TO, 10)
+                message = await asyncio.wait_for(app.recv_msg_type_data(), 1)
+                assert message.message == "strength-1+2+10"
+                assert server_0.client_id_to_target_id == server_1.client_id_to_target_id \
+                       == {client.client_id: app.target_id}
+
+                await app.send_strength(StrengthData(a=1, b=2, a_limit=3, b_limit=4))
+                assert await asyncio.wait_for(client.recv_data(), 1) == StrengthData(a=1, b=2, a_limit=3, b_limit=4)
+                # 回调函数只在终端所在的 worker 中调用
+                assert len(received) == 2 and all(success for _, success in received)
+
+            assert await asyncio.wait_for(client.recv_data(), 1) == RetCode.CLIENT_DISCONNECTED
+            assert not server_0.client_id_to_target_id and not server_1.client_id_to_target_id
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(sys.platform == "win32", reason="Unix socket is not available")
+async def test_sharded_local_client(shard_bus_dir):
+    """本地终端与连接到其他 worker 的 App"""
+    async with _ShardWorkerServer(0, 2, shard_bus_dir, WEBSOCKET_HOST, SHARD_PORTS[0]) as server_0, \
+            _ShardWorkerServer(1, 2, shard_bus_dir, WEBSOCKET_HOST, SHARD_PORTS[1]):
+        bind_results = []
+        server_0.add_receive_callback(MessageType.BIND, lambda x, y: bind_results.append(y))
+        client = server_0.new_local_client()
+        async with connect(SHARD_URIS[1]) as websocket:
+            app = DGLabAppSimulator(websocket)
+            await app.register()
+            await app.bind(client.client_id)
+            assert await asyncio.wait_for(client.bind(), 1) == RetCode.SUCCESS
+            assert bind_results == [True]
+
+            await client.add_pulses(Channel.B, ((10, 10, 10, 10), (0, 0, 0, 0)))
+            message = await asyncio.wait_for(app.recv_msg_type_data(), 1)
+            assert message.message.startswith("pulse-B:")
+
+            # 已绑定的 App 不能再绑定其他终端
+            other_client = server_0.new_local_client()
+            await app.bind(other_client.client_id)
+            assert await asyncio.wait_for(other_client.bind(), 1) == RetCode.ID_ALREADY_BOUND
+            assert bind_results == [True, False]
+
+            assert await server_0.remove_local_client(client.client_id)
+            assert await asyncio.wait_for(app.recv_disconnect(), 1) == RetCode.CLIENT_DISCONNECTED
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(sys.platform == "win32", reason="Unix socket is not available")
+async def test_sharded_bind_timeout_rollback(shard_bus_dir, monkeypatch):
+    """终端所在的 worker 在超时后才完成绑定时撤销该绑定"""
+    async with _ShardWorkerServer(0, 2, shard_bus_dir, WEBSOCKET_HOST, SHARD_PORTS[0]) as server_0, \
+            _ShardWorkerServer(1, 2, shard_bus_dir, WEBSOCKET_HOST, SHARD_PORTS[1], bind_timeout=0.2) as server_1:
+        handle_bus_bind = server_0._handle_bus_bind
+
+        async def slow_handle_bus_bind(*args):
+            await asyncio.sleep(0.4)
+            await handle_bus_bind(*args)
+
+        monkeypatch.setattr(server_0, "_handle_bus_bind", slow_handle_bus_bind)
+        async with DGLabWSConnect(SHARD_URIS[0]) as client:  # type: DGLabWSClient
+            async with connect(SHARD_URIS[1]) as websocket:
+                app = DGLabAppSimulator(websocket)
+                await app.register()
+                await app.bind(client.client_id)
+                assert (await asyncio.wait_for(app._recv(), 1)).message == RetCode.SERVER_INTERNAL_ERROR
+
+                # 终端先收到迟到的绑定成功，随后收到撤销
+                assert await asyncio.wait_for(client.bind(), 1) == RetCode.SUCCESS
+                assert await asyncio.wait_for(client.recv_data(), 1) == RetCode.CLIENT_DISCONNECTED
+                assert not server_0.client_id_to_target_id and not server_1.client_id_to_target_id
+
+                monkeypatch.setattr(server_0, "_handle_bus_bind", handle_bus_bind)
+                await app.bind(client.client_id)
+                assert (await asyncio.wait_for(app._recv(), 1)).message == RetCode.SUCCESS
+                assert server_0.client_id_to_target_id == server_1.client_id_to_target_id \
+                       == {client.client_id: app.target_id}
+
+
+async def _slow_worker_setup(marker_dir: str, server: _ShardWorkerServer):
+    """在 worker 进程中运行，较慢地完成设置后留下标记"""
+    await asyncio.sleep(0.3)
+    with open(os.path.join(marker_dir, str(server.index)), "w"):
+        pass
+
+
+async def _failing_worker_setup(server: _ShardWorkerServer):
+    raise RuntimeError("setup failed")
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(sys.platform == "win32", reason="Unix socket is not available")
+async def test_sharded_server_processes(shard_bus_dir):
+    """worker 进程全部完成设置后才返回，终端与 App 通过进程间总线绑定"""
+    setup = functools.partial(_slow_worker_setup, shard_bus_dir)
+    async with DGLabShardedWSServer(WEBSOCKET_HOST, SHARDED_PORT, workers=2, worker_setup=setup) as server:
+        assert sorted(os.listdir(shard_bus_dir)) == ["0", "1"]
+        assert all(process.is_alive() for process in server.processes)
+        async with DGLabWSConnect(SHARDED_URI) as client:  # type: DGLabWSClient
+            async with connect(SHARDED_URI) as websocket:
+                app = DGLabAppSimulator(websocket)
+                await app.register()
+                await app.bind(client.client_id)
+                assert await asyncio.wait_for(client.bind(), 5) == RetCode.SUCCESS
+                await client.set_strength(Channel.A, StrengthOperationType.SET_TO, 10)
+                message = await asyncio.wait_for(app.recv_msg_type_data(), 5)
+                assert message.message == "strength-1+2+10"
+    assert not server.processes
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(sys.platform == "win32", reason="Unix socket is not available")
+async def test_sharded_server_worker_startup_failure():
+    """worker 在启动中退出时立即失败，不等待启动超时"""
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    server = DGLabShardedWSServer(WEBSOCKET_HOST, SHARDED_PORT, workers=2, worker_setup=_failing_worker_setup)
+    with pytest.raises(RuntimeError, match="exited during startup"):
+        async with server:
+            pass
+    assert loop.time() - start < 15
+    assert not server.processes
+
+
+class _SlowWebSocket:
+    """发送需要手动放行的连接"""
+
+    def __init__(self):
+        self.sent = []
+        self.closed = False
+        self.release = asyncio.Event()
+
+    async def send(self, raw_message: str):
+        await self.release.wait()
+        if self.closed:
+            raise ConnectionClosedOK(Close(1000, ""), Close(1000, ""))
+        self.sent.append(raw_message)
+
+    async def close(self):
+        self.closed = True
+
+
+def _strength_frame(a: int) -> str:
+    return f'{{"type":"msg","clientId":"","targetId":"","message":"strength-{a}+0+200+200"}}'
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "policy,expected_sent,expected_dropped,expected_coalesced",
+    [
+        (SendQueuePolicy.DROP_OLDEST, ["pulse-1", _strength_frame(2), _strength_frame(3), "pulse-2"], 2, 0),
+        (SendQueuePolicy.COALESCE_STRENGTH, ["pulse-0", "pulse-1", _strength_frame(3), "pulse-2"], 0, 2),
+    ]
+)
+async def test_send_queue_policy(policy, expected_sent, expected_dropped, expected_coalesced):
+    websocket = _SlowWebSocket()
+    send_queue = _SendQueue(websocket, 4, policy)
+    for frame in "pulse-0", _strength_frame(1), "pulse-1", _strength_frame(2), _strength_frame(3), "pulse-2":
+        send_queue.put(frame)
+    stats = send_queue.stats
+    assert stats.depth == len(expected_sent) and stats.max_size == 4
+    assert stats.dropped == expected_dropped and stats.coalesced == expected_coalesced
+
+    websocket.release.set()
+    await asyncio.sleep(0.01)
+    assert websocket.sent == expected_sent
+    assert send_queue.stats.sent == len(expected_sent) and send_queue.stats.depth == 0
+    send_queue.close()
+
+
+@pytest.mark.asyncio
+async def test_send_queue_disconnect():
+    websocket = _SlowWebSocket()
+    send_queue = _SendQueue(websocket, 2, SendQueuePolicy.DISCONNECT)
+    for i in range(3):
+        send_queue.put(f"pulse-{i}")
+    send_queue.put("pulse-3")
+    assert send_queue.stats.dropped == 4 and send_queue.stats.depth == 1
+
+    websocket.release.set()
+    await asyncio.sleep(0.01)
+    assert websocket.closed
+    assert [WebSocketMessage.model_validate_json(frame).message for frame in websocket.sent] \
+           == [RetCode.SERVER_DELAY]
+
+
+@pytest.mark.asyncio
+async def test_send_queue_stats():
+    async with DGLabWSServer(WEBSOCKET_HOST, RELAY_PORT, send_queue_size=8) as server:
+        async with DGLabWSConnect(RELAY_URI) as client:  # type: DGLabWSClient
+            async with connect(RELAY_URI) as websocket:
+                app = DGLabAppSimulator(websocket)
+                await app.register()
+                await app.bind(client.client_id)
+                await client.bind()
+                await app.send_strength(StrengthData(a=1, b=2, a_limit=3, b_limit=4))
+                await asyncio.wait_for(client.recv_data(), 1)
+
+                stats = server.send_queue_stats
+                assert stats.keys() == {client.client_id, app.target_id}
+                # 终端：ID 下发, 绑定结果, 强度数据；App：ID 下发, 绑定结果
+                assert stats[client.client_id].sent == 3 and stats[app.target_id].sent == 2
+                assert all(item.depth == item.dropped == 0 for item in stats.values())
+
+    async with DGLabWSServer(WEBSOCKET_HOST, RELAY_PORT, send_queue_size=None) as server:
+        async with DGLabWSConnect(RELAY_URI):
+            assert server.send_queue_stats == {}
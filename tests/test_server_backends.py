@@ -0,0 +1,164 @@
+import asyncio
+import os
+import subprocess
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from pydglab_ws.ble.enums import YCYChannel
+from pydglab_ws.ble.scanner import SERVICE_UUID
+from pydglab_ws.client import YCYBLEClient
+from pydglab_ws.enums import Channel, StrengthOperationType
+from pydglab_ws.server import DGLabServer, DGLabWSServer, DGLabBLEServer, DGLabBLEMultiServer, SERVER_BACKEND_ENV, \
+    register_server_backend, get_server_backend, server_backends
+from pydglab_ws.server import backends as backends_module
+from tests.ble.device_simulator import SimulatedYCYDevice
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+@pytest.fixture(autouse=True)
+def restore_backends(monkeypatch):
+    monkeypatch.delenv(SERVER_BACKEND_ENV, raising=False)
+    monkeypatch.setattr(backends_module, "_backends", dict(backends_module._backends))
+
+
+def test_default_backend():
+    server = DGLabServer(scan_timeout=1, device_cache=False)
+    assert isinstance(server, DGLabBLEServer)
+    assert server.heartbeat_interval is None
+
+
+def test_ws_backend():
+    server = DGLabServer("127.0.0.1", 5678, 30, backend="ws")
+    assert isinstance(server, DGLabWSServer)
+    assert server.heartbeat_interval == 30
+
+
+def test_ble_multi_backend():
+    server = DGLabServer("0.0.0.0", 5678, 60, backend="ble-multi", addresses=["AA:BB:CC:DD:EE:FF"])
+    assert isinstance(server, DGLabBLEMultiServer)
+    assert not server.manager.scanning
+    with pytest.raises(RuntimeError):
+        server.new_local_client()
+    # 拼写错误的参数不会被静默忽略
+    with pytest.raises(TypeError):
+        DGLabServer("0.0.0.0", 5678, 60, backend="ble-multi", device_conut=2)
+
+
+@pytest.mark.parametrize("backend", server_backends())
+def test_same_arguments_for_every_backend(monkeypatch, backend):
+    """同一个 DGLabWSServer 风格的调用，通过环境变量切换到任意后端都得到可用的服务端"""
+    monkeypatch.setenv(SERVER_BACKEND_ENV, backend)
+    server = DGLabServer("0.0.0.0", 5678, 60)
+    assert isinstance(server, get_server_backend(backend))
+    assert callable(server.new_local_client)
+    assert hasattr(server, "__aenter__") and hasattr(server, "__aexit__")
+    assert server.heartbeat_interval in (60, None)
+
+
+class _AdvertisingScanner:
+    """启动时发现给定地址的设备"""
+
+    def __init__(self, callback, addresses):
+        self.callback = callback
+        self.addresses = addresses
+
+    async def start(self):
+        self.stopped = False
+        for address in self.addresses:
+            self.callback(
+                SimpleNamespace(address=address, name="YCY"),
+                SimpleNamespace(service_uuids=[SERVICE_UUID], rssi=-50)
+            )
+
+    async def stop(self):
+        self.stopped = True
+
+
+@pytest.mark.asyncio
+async def test_ble_multi_local_clients():
+    """启动时连接设备，每个本地终端对应一台设备"""
+    addresses = ("00:00:00:00:00:01", "00:00:00:00:00:02")
+    devices = {address: SimulatedYCYDevice() for address in addresses}
+    server = DGLabServer(
+        "0.0.0.0", 5678, 60,
+        backend="ble-multi",
+        device_count=2,
+        scan_timeout=1,
+        scanner_factory=lambda callback: _AdvertisingScanner(callback, addresses),
+        client_factory=lambda device: YCYBLEClient(
+            device.address, transport_factory=devices[device.address].transport_factory
+        )
+    )
+    async with server:
+        clients = [server.new_local_client() for _ in addresses]
+        with pytest.raises(RuntimeError):
+            server.new_local_client()
+        assert len({client.client_id for client in clients}) == 2
+        for client in clients:
+            assert await client.set_strength(Channel.A, StrengthOperationType.SET_TO, 50, wait=True)
+        assert all(device.channels[YCYChannel.A].enabled for device in devices.values())
+    assert not any(device.connected for device in devices.values())
+
+
+@pytest.mark.asyncio
+async def test_ble_multi_start_cancelled():
+    """启动被取消时停止扫描器"""
+    scanners = []
+    server = DGLabServer(
+        backend="ble-multi",
+        device_count=1,
+        scanner_factory=lambda callback: scanners.append(_AdvertisingScanner(callback, ())) or scanners[-1]
+    )
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(server.__aenter__(), 0.05)
+    assert not server.manager.scanning
+    assert scanners[0].stopped
+
+
+def test_env_backend(monkeypatch):
+    monkeypatch.setenv(SERVER_BACKEND_ENV, "ws")
+    assert get_server_backend() is DGLabWSServer
+    # 参数优先于环境变量
+    assert get_server_backend("ble") is DGLabBLEServer
+
+
+def test_unknown_backend(monkeypatch):
+    with pytest.raises(ValueError, match="ble-multi"):
+        DGLabServer(backend="serial")
+    monkeypatch.setenv(SERVER_BACKEND_ENV, "serial")
+    with pytest.raises(ValueError):
+        get_server_backend()
+
+
+def test_register_backend():
+    created = []
+    register_server_backend("fake", lambda *args, **kwargs: created.append((args, kwargs)) or "server")
+    assert "fake" in server_backends()
+    assert DGLabServer(1, backend="fake", a=2) == "server"
+    assert created == [((1,), {"a": 2})]
+
+    register_server_backend("dotted", "pydglab_ws.server.server:DGLabWSServer")
+    assert get_server_backend("dotted") is DGLabWSServer
+
+
+@pytest.mark.parametrize(
+    "backend,environment,imported,not_imported",
+    [
+        ("'ws'", {}, "pydglab_ws.server.server", "bleak"),
+        ("None", {SERVER_BACKEND_ENV: "ws"}, "pydglab_ws.server.server", "bleak"),
+        ("'ble'", {}, "bleak", "pydglab_ws.server.server"),
+        ("None", {SERVER_BACKEND_ENV: "ble-multi"}, "pydglab_ws.server.ble_multi", "pydglab_ws.server.server"),
+    ]
+)
+def test_unused_backends_not_imported(backend, environment, imported, not_imported):
+    code = (
+        "import sys; from pydglab_ws import DGLabServer; "
+        f"DGLabServer('127.0.0.1', 5678, backend={backend}); "
+        f"assert {imported!r} in sys.modules; assert {not_imported!r} not in sys.modules"
+    )
+    env = {key: value for key, value in os.environ.items() if key != SERVER_BACKEND_ENV}
+    subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, env={**env, **environment}, check=True)
@@ -0,0 +1,124 @@
+import asyncio
+import json
+from uuid import uuid4
+
+import pytest
+
+from pydglab_ws.client import DGLabClient, PulseStream
+from pydglab_ws.client import stream as stream_module
+from pydglab_ws.enums import Channel
+from pydglab_ws.models import WebSocketMessage
+
+OPERATION_DURATION = 0.01
+
+
+class _RecordingClient(DGLabClient):
+    """记录发送的消息及其时间"""
+
+    def __init__(self):
+        super().__init__(uuid4(), uuid4())
+        self.sent = []
+
+    async def _recv(self) -> WebSocketMessage:
+        await asyncio.Future()
+
+    async def _send(self, message: WebSocketMessage):
+        self.sent.append((asyncio.get_running_loop().time(), message.message))
+
+    def pulse_batches(self):
+        return [json.loads(message.split(":", 1)[1]) for _, message in self.sent if message.startswith("pulse-")]
+
+
+def _pulse(i: int):
+    return (10, 10, 10, 10), (i % 101, 0, 0, 0)
+
+
+@pytest.fixture
+def fast_playback(monkeypatch):
+    monkeypatch.setattr(stream_module, "PULSE_OPERATION_DURATION", OPERATION_DURATION)
+
+
+@pytest.mark.asyncio
+async def test_pulse_stream_keeps_queue_topped_up(fast_playback):
+    client = _RecordingClient()
+    stream = PulseStream(client, Channel.A, [_pulse(i) for i in range(60)],
+                         buffer_time=0.1, refill_interval=0.02, batch_size=4)
+    assert stream.estimated_depth == 0
+    stream.start()
+    await asyncio.wait_for(stream.wait(), 5)
+
+    batches = client.pulse_batches()
+    assert sum(len(batch) for batch in batches) == 60
+    assert all(0 < len(batch) <= 4 for batch in batches)
+    # 首次补充至目标长度，之后按播放进度补充
+    assert sum(len(batch) for batch in batches[:3]) == 10
+    stats = stream.stats
+    assert stats.sent == 60 and stats.batches == len(batches)
+    assert stats.underruns == stats.overruns == 0
+    assert 0 < stats.estimated_depth <= 10
+
+
+@pytest.mark.asyncio
+async def test_pulse_stream_underrun(fast_playback):
+    async def slow_source():
+        for i in range(6):
+            await asyncio.sleep(OPERATION_DURATION * 5)
+            yield _pulse(i)
+
+    client = _RecordingClient()
+    stream = PulseStream(client, Channel.B, slow_source(), buffer_time=0.1, refill_interval=0.02)
+    stream.start()
+    await asyncio.wait_for(stream.wait(), 5)
+    assert stream.stats.sent == 6
+    assert stream.stats.underruns > 0
+
+
+@pytest.mark.asyncio
+async def test_pulse_stream_replace(fast_playback):
+    def endless(strength: int):
+        while True:
+            yield (10, 10, 10, 10), (strength, strength, strength, strength)
+
+    client = _RecordingClient()
+    async with PulseStream(client, Channel.A, endless(1), buffer_time=0.1, refill_interval=0.02) as stream:
+        await asyncio.sleep(0.05)
+        await stream.replace(endless(2))
+        assert stream.running
+        await asyncio.sleep(0.05)
+
+    messages = [message for _, message in client.sent]
+    first_clear = messages.index("clear-1")
+    assert first_clear > 0 and all("01010101" in message for message in messages[:first_clear])
+    assert len(messages) > first_clear + 2
+    assert all("02020202" in message for message in messages[first_clear + 1:-1])
+    assert messages[-1] == "clear-1"
+    assert not stream.running and stream.estimated_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_pulse_stream_resume(fast_playback):
+    """在从异步生成器读取数据时停止，之后从中断处继续下发"""
+    async def slow_source():
+        for i in range(6):
+            await asyncio.sleep(OPERATION_DURATION * 5)
+            yield _pulse(i)
+
+    client = _RecordingClient()
+    stream = PulseStream(client, Channel.A, slow_source(), buffer_time=0.1, refill_interval=0.02)
+    stream.start()
+    while stream.stats.sent < 2:
+        await asyncio.sleep(OPERATION_DURATION)
+    await stream.stop(clear=False)
+    assert not stream.running
+    stream.start()
+    await asyncio.wait_for(stream.wait(), 5)
+
+    pulses = [pulse for batch in client.pulse_batches() for pulse in batch]
+    assert [int(pulse[8:10], 16) for pulse in pulses] == list(range(6))
+    assert "clear-1" not in [message for _, message in client.sent]
+
+def test_pulse_stream_invalid_arguments():
+    with pytest.raises(ValueError):
+        PulseStream(_RecordingClient(), Channel.A, buffer_time=1.0, refill_interval=1.0)
+    with pytest.raises(ValueError):
+        PulseStream(_RecordingClient(), Channel.A, batch_size=1000)
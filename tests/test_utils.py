@@ -1,13 +1,16 @@
+import json
+import timeit
+from array import array
 from uuid import uuid4
 
 import pytest
 
 from pydglab_ws.enums import FeedbackButton, Channel, StrengthOperationType
-from pydglab_ws.exceptions import InvalidStrengthData, InvalidFeedbackData
-from pydglab_ws.models import StrengthData
+from pydglab_ws.exceptions import InvalidStrengthData, InvalidFeedbackData, InvalidPulseOperation, PulseDataTooLong
+from pydglab_ws.models import StrengthData, WebSocketMessage, WS_MESSAGE_MAX_LENGTH
 from pydglab_ws.typing import PulseOperation
 from pydglab_ws.utils import parse_strength_data, parse_feedback_data, dump_strength_operation, dump_clear_pulses, \
-    dump_pulse_operation, dump_add_pulses, dg_lab_client_qrcode
+    dump_pulse_operation, dump_add_pulses, dump_add_pulses_chunked, dg_lab_client_qrcode, PULSE_DATA_MAX_LENGTH
 
 
 @pytest.mark.parametrize(
@@ -49,6 +52,21 @@ def test_feedback_data(data: str, expected):
         assert ret == expected
 
 
+@pytest.mark.parametrize(
+    "pulse",
+    [
+        ((0, 0, 0, 256), (0, 0, 0, 0)),
+        ((0, 0, 0, -1), (0, 0, 0, 0)),
+        ((0, 0, 0, 0.5), (0, 0, 0, 0)),
+        ("abcd", (0, 0, 0, 0)),
+        None,
+    ]
+)
+def test_dump_pulse_operation_invalid(pulse):
+    with pytest.raises(InvalidPulseOperation):
+        dump_pulse_operation(pulse)
+
+
 @pytest.mark.parametrize(
     "args,expected",
     [
@@ -137,6 +155,87 @@ def test_dump_add_pulses(args, expected):
     assert dump_add_pulses(*args) == expected
 
 
+def _legacy_dump_add_pulses(channel: Channel, *pulses: PulseOperation) -> str:
+    """逐字节生成的旧实现，用于对比"""
+    return (f"pulse-{channel.name}:" + json.dumps(
+        [bytes().join(value.to_bytes(1, "big") for operation in pulse for value in operation).hex()
+         for pulse in pulses],
+        separators=(",", ":")
+    ))
+
+
+PULSES = [((10 + i % 200, 20, 30, 240), (i % 101, 50, 0, 100)) for i in range(500)]
+
+
+@pytest.mark.parametrize(
+    "pulses",
+    [
+        PULSES,
+        iter(PULSES),
+        [(*frequency, *strength) for frequency, strength in PULSES],
+        bytes(value for frequency, strength in PULSES for value in (*frequency, *strength)),
+        array("B", (value for frequency, strength in PULSES for value in (*frequency, *strength))),
+    ]
+)
+def test_dump_add_pulses_chunked(pulses):
+    messages = dump_add_pulses_chunked(Channel.B, pulses)
+    assert len(messages) == -(-len(PULSES) // PULSE_DATA_MAX_LENGTH)
+    for index, message in enumerate(messages):
+        chunk = PULSES[index * PULSE_DATA_MAX_LENGTH:(index + 1) * PULSE_DATA_MAX_LENGTH]
+        assert message == _legacy_dump_add_pulses(Channel.B, *chunk) == dump_add_pulses(Channel.B, *chunk)
+        raw_message = WebSocketMessage(
+            type="msg",
+            client_id=uuid4(),
+            target_id=uuid4(),
+            message=message
+        ).model_dump_json(by_alias=True, context={"separators": (",", ":")})
+        assert len(raw_message) <= WS_MESSAGE_MAX_LENGTH
+
+
+@pytest.mark.parametrize(
+    "pulses",
+    [
+        [((0, 0, 0, 0), (0, 0, 0, 0)), ((0, 0, 0, 0), (0, 0, 0, 300))],
+        [((0, 0, 0, 0), (0, 0, 0))],
+        [(0, 0, 0, 0, 0, 0, 0)],
+        b"\x00" * 9,
+        [None],
+    ]
+)
+def test_dump_add_pulses_chunked_invalid(pulses):
+    with pytest.raises(InvalidPulseOperation):
+        dump_add_pulses_chunked(Channel.A, pulses)
+
+
+def test_dump_add_pulses_chunked_arguments():
+    assert dump_add_pulses_chunked(Channel.A, []) == []
+    assert dump_add_pulses_chunked(Channel.A, PULSES[:5], chunk_size=2) == [
+        dump_add_pulses(Channel.A, *PULSES[:2]),
+        dump_add_pulses(Channel.A, *PULSES[2:4]),
+        dump_add_pulses(Channel.A, *PULSES[4:5]),
+    ]
+    with pytest.raises(PulseDataTooLong):
+        dump_add_pulses_chunked(Channel.A, PULSES, chunk_size=PULSE_DATA_MAX_LENGTH + 1)
+
+
+@pytest.mark.benchmark
+def test_dump_add_pulses_benchmark():
+    """批量编码与逐字节编码的耗时对比"""
+    number = 20
+    legacy = min(timeit.repeat(
+        lambda: [_legacy_dump_add_pulses(Channel.A, *PULSES[i:i + PULSE_DATA_MAX_LENGTH])
+                 for i in range(0, len(PULSES), PULSE_DATA_MAX_LENGTH)],
+        number=number,
+        repeat=3
+    )) / number * 1e3
+    chunked = min(timeit.repeat(
+        lambda: dump_add_pulses_chunked(Channel.A, PULSES),
+        number=number,
+        repeat=3
+    )) / number * 1e3
+    assert chunked < legacy
+
+
 @pytest.mark.parametrize(
     "args,expected",
     [